@@ -1,17 +1,47 @@
 from django.urls import path
 
+from transactions.async_views import (
+    AsyncAvailabilityView,
+    AsyncIssuesView,
+    AsyncProfitView,
+    AsyncTopView,
+)
 from transactions.views import (
     SupplyAPIView,
     AvailabilityAPIView,
+    AvailabilitySeriesAPIView,
     SalesAPIView,
     FlushAPIView,
     IssuesAPIView,
+    ProfitAPIView,
+    TopAPIView,
+    BatchAPIView,
+    MetricsAPIView,
+    SummaryAPIView,
 )
 
 urlpatterns = [
     path("supply/", SupplyAPIView.as_view(), name="supply"),
     path("sales/", SalesAPIView.as_view(), name="sales"),
     path("availability/", AvailabilityAPIView.as_view(), name="availability"),
+    path(
+        "availability/series/",
+        AvailabilitySeriesAPIView.as_view(),
+        name="availability-series",
+    ),
     path("issues/", IssuesAPIView.as_view(), name="issues"),
+    path("profit/", ProfitAPIView.as_view(), name="profit"),
+    path("top/", TopAPIView.as_view(), name="top"),
+    path("summary/", SummaryAPIView.as_view(), name="summary"),
+    path("batches/<int:pk>/", BatchAPIView.as_view(), name="batch"),
+    path(
+        "async/availability/",
+        AsyncAvailabilityView.as_view(),
+        name="async-availability",
+    ),
+    path("async/issues/", AsyncIssuesView.as_view(), name="async-issues"),
+    path("async/profit/", AsyncProfitView.as_view(), name="async-profit"),
+    path("async/top/", AsyncTopView.as_view(), name="async-top"),
     path("flush/", FlushAPIView.as_view(), name="flush"),
+    path("metrics/", MetricsAPIView.as_view(), name="metrics"),
 ]
@@ -0,0 +1,23 @@
+"""
+Throwaway database of the benchmarks, never the configured one: benchmarks
+change the schema, insert synthetic rows and flush the tables.
+"""
+
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def test_database():
+    """
+    Creates a test database on the configured server, migrated to the latest
+    schema, and destroys it afterwards
+    """
+    old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+
+    try:
+        yield
+
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,134 @@
+"""
+Query plans and latencies of the transaction queries before and after the indexes,
+on a test database created for the run.
+
+Usage: python -m benchmarks.query_plans --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.tests.settings")
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from benchmarks.database import test_database  # noqa: E402
+from transactions.models import Transaction, TypeChoices  # noqa: E402
+from transactions.services.custom import get_querysets  # noqa: E402
+
+BEFORE = "0006_sku_stats"
+AFTER = "0007_transaction_indexes"
+START = datetime(2024, 1, 1)
+
+
+def populate(rows: int, skus: int):
+    """
+    Inserts random supplies and sales spread over a year
+    :param rows: Number of transactions
+    :param skus: Number of SKUs
+    """
+    table = Transaction._meta.db_table
+    sql = (
+        f'INSERT INTO "{table}" (transaction_type, sku, qty, price, "when") '
+        f"VALUES (%s, %s, %s, %s, %s)"
+    )
+    chunk = []
+
+    with connection.cursor() as cursor:
+        for idx in range(rows):
+            chunk.append(
+                (
+                    random.choice(TypeChoices.values),
+                    f"SKU-{random.randrange(skus)}",
+                    random.randint(1, 10),
+                    random.randint(100, 10000) / 100,
+                    START + timedelta(seconds=random.randrange(365 * 24 * 3600)),
+                )
+            )
+
+            if len(chunk) == 10000 or idx == rows - 1:
+                cursor.executemany(sql, chunk)
+                chunk = []
+
+        cursor.execute("ANALYZE")
+
+
+def get_queries() -> dict:
+    """
+    Queries issued by the replay and the ledger
+    :return: {name: queryset}
+    """
+    date_to = START + timedelta(days=180)
+    supplies, sales = get_querysets(None, date_to)
+
+    return {
+        "replay supplies, first 1000 rows": supplies.values_list("id")[:1000],
+        "replay sales, full scan": sales.values_list("id"),
+        "replay tail after a checkpoint": sales.filter(
+            when__gt=date_to - timedelta(days=1)
+        ).values_list("id"),
+        "sku history": Transaction.objects.filter(sku="SKU-42").values_list("id"),
+        "ledger rewind": Transaction.objects.filter(
+            sku="SKU-42", transaction_type=TypeChoices.SALE, when__gt=date_to
+        ).values_list("id"),
+    }
+
+
+def explain(sql: str, params) -> str:
+    """
+    Query plan of a query on SQLite or PostgreSQL
+    :param sql: SQL
+    :param params: Parameters of the query
+    :return: Plan on one line
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return "; ".join(row[-1] for row in cursor.fetchall())
+
+        cursor.execute(f"EXPLAIN {sql}", params)
+        return "; ".join(row[0].strip() for row in cursor.fetchall())
+
+
+def measure(label: str):
+    print(f"\n== {label}")
+
+    for name, queryset in get_queries().items():
+        plan = explain(*queryset.query.sql_with_params())
+
+        started = time.perf_counter()
+        count = len(list(queryset))
+        elapsed = (time.perf_counter() - started) * 1000
+
+        print(f"{name}: {count} rows in {elapsed:.1f} ms")
+        print(f"    {plan}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skus", type=int, default=1000)
+    args = parser.parse_args()
+
+    if connection.vendor not in ("sqlite", "postgresql"):
+        parser.exit(1, f"Query plans of {connection.vendor} are not supported\n")
+
+    with test_database():
+        call_command("migrate", "transactions", BEFORE, verbosity=0)
+        populate(args.rows, args.skus)
+        measure(f"without indexes, {args.rows} rows")
+
+        call_command("migrate", "transactions", AFTER, verbosity=0)
+        connection.cursor().execute("ANALYZE")
+        measure(f"with indexes, {args.rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Benchmarks of the API on a synthetic workload: batch ingestion, availability at
+several dates, issues over several windows and flush. Results are written as
+JSON, and compared with a previous run when one is given.
+
+Usage: python -m benchmarks.run --skus 100 --rows 20000 --output results.json
+       python -m benchmarks.run --compare results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.tests.settings")
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from benchmarks.database import test_database  # noqa: E402
+from benchmarks.workload import START, generate, get_end, iter_batches  # noqa: E402
+from transactions.services import cache  # noqa: E402
+
+FORMAT_VERSION = 1
+AVAILABILITY_POINTS = (0.25, 0.5, 0.75, 1.0)
+ISSUES_WINDOWS = (1, 7, 30, None)
+
+
+def summarize(runs: list, rows: int = None) -> dict:
+    """
+    Statistics of the timings of a benchmark
+    :param runs: Timings in ms
+    :param rows: Number of rows processed by all the runs together
+    :return: {unit, runs, min, median, mean, max[, rows, rows_per_second]}
+    """
+    result = {
+        "unit": "ms",
+        "runs": [round(run, 3) for run in runs],
+        "min": round(min(runs), 3),
+        "median": round(statistics.median(runs), 3),
+        "mean": round(statistics.fmean(runs), 3),
+        "max": round(max(runs), 3),
+    }
+
+    if rows is not None:
+        result["rows"] = rows
+        result["rows_per_second"] = round(rows / (sum(runs) / 1000), 1)
+
+    return result
+
+
+def measure(func, repeat: int) -> list:
+    """
+    Times a request, each run computed from scratch
+    :param func: Request to time
+    :param repeat: Number of runs
+    :return: Timings in ms
+    """
+    runs = []
+
+    for _ in range(repeat):
+        cache.clear()
+        started = time.perf_counter()
+        response = func()
+        runs.append((time.perf_counter() - started) * 1000)
+
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.status_code}: {response.content[:200]}")
+
+    return runs
+
+
+def run(args) -> dict:
+    """
+    Runs every benchmark on a fresh test database
+    :param args: Parsed arguments
+    :return: {name: summary}
+    """
+    client = APIClient()
+    items = generate(
+        skus=args.skus,
+        rows=args.rows,
+        sale_ratio=args.sale_ratio,
+        out_of_order=args.out_of_order,
+        days=args.days,
+        seed=args.seed,
+    )
+    end = get_end(items)
+    results = {}
+
+    supply_runs, sale_runs = [], []
+    supply_rows = sale_rows = 0
+
+    for supplies, sales in iter_batches(items, args.batch_size):
+        if supplies:
+            supply_runs += measure(
+                lambda: client.post(
+                    reverse("api:supply"), {"data": supplies}, format="json"
+                ),
+                1,
+            )
+            supply_rows += len(supplies)
+
+        if sales:
+            sale_runs += measure(
+                lambda: client.post(
+                    reverse("api:sales"), {"data": sales}, format="json"
+                ),
+                1,
+            )
+            sale_rows += len(sales)
+
+    results["ingest supplies"] = summarize(supply_runs, supply_rows)
+    results["ingest sales"] = summarize(sale_runs, sale_rows)
+
+    for point in AVAILABILITY_POINTS:
+        date_to = START + (end - START) * point
+        results[f"availability to={point:.0%}"] = summarize(
+            measure(
+                lambda: client.get(
+                    reverse("api:availability"), {"to": date_to.isoformat()}
+                ),
+                args.repeat,
+            )
+        )
+
+    for days in ISSUES_WINDOWS:
+        params = {"to": end.isoformat()}
+
+        if days:
+            params["from"] = (end - timedelta(days=days)).isoformat()
+
+        results[f"issues window={days or 'all'}{'d' if days else ''}"] = summarize(
+            measure(lambda: client.get(reverse("api:issues"), params), args.repeat)
+        )
+
+    results["flush"] = summarize(
+        measure(lambda: client.delete(reverse("api:flush")), 1), len(items)
+    )
+
+    return results
+
+
+def compare(results: dict, previous: dict):
+    """
+    Prints the median of every benchmark next to the one of a previous run
+    :param results: Benchmarks of this run
+    :param previous: Benchmarks of the previous run
+    """
+    print(f"\n{'benchmark':<28}{'before':>12}{'after':>12}{'ratio':>8}")
+
+    for name, result in results.items():
+        before = previous.get(name, {}).get("median")
+        after = result["median"]
+        ratio = f"{after / before:.2f}x" if before else "-"
+        print(f"{name:<28}{before or '-':>12}{after:>12}{ratio:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--skus", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--sale-ratio", type=float, default=0.4)
+    parser.add_argument("--out-of-order", type=float, default=0.05)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file for the results")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    # add_sales logs every sale with an issue
+    logging.disable(logging.ERROR)
+    setup_test_environment()
+    started = datetime.now()
+
+    with test_database():
+        results = run(args)
+
+    report = {
+        "version": FORMAT_VERSION,
+        "created": started.isoformat(timespec="seconds"),
+        "params": {key: value for key, value in vars(args).items()},
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "platform": platform.platform(),
+        },
+        "benchmarks": results,
+    }
+    output = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file)["benchmarks"])
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Synthetic workloads for the benchmarks: supplies and sales of SKUs with skewed
+popularity, in arrival order, with a share of late arrivals.
+"""
+
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+
+START = datetime(2024, 1, 1)
+MAX_DELAY = timedelta(days=7)
+
+
+def generate(
+    skus: int = 100,
+    rows: int = 10000,
+    sale_ratio: float = 0.4,
+    out_of_order: float = 0.0,
+    days: int = 90,
+    seed: int = 0,
+) -> list:
+    """
+    Generates transactions in the order they reach the API
+    :param skus: Number of SKUs, picked with Zipf-like popularity
+    :param rows: Number of transactions
+    :param sale_ratio: Share of sales among the transactions
+    :param out_of_order: Share of transactions sent up to MAX_DELAY after their date
+    :param days: Length of the history
+    :param seed: Random seed, the same arguments give the same workload
+    :return: list of {type, when, sku, qty, price}
+    """
+    rng = random.Random(seed)
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(skus)))
+    costs = [rng.randint(100, 10000) / 100 for _ in range(skus)]
+    span = days * 24 * 3600
+    items = []
+
+    for _ in range(rows):
+        idx = rng.choices(range(skus), cum_weights=cum_weights)[0]
+        when = START + timedelta(seconds=rng.randrange(span))
+        arrival = when
+
+        if rng.random() < out_of_order:
+            arrival += MAX_DELAY * rng.random()
+
+        if rng.random() < sale_ratio:
+            item_type, markup = "sale", rng.uniform(1.1, 1.6)
+
+        else:
+            item_type, markup = "supply", rng.uniform(0.9, 1.1)
+
+        item = {
+            "type": item_type,
+            "when": when.isoformat(),
+            "sku": f"SKU-{idx}",
+            "qty": rng.randint(1, 10),
+            "price": round(costs[idx] * markup, 2),
+        }
+        items.append((arrival, item))
+
+    items.sort(key=lambda pair: pair[0])
+
+    return [item for _, item in items]
+
+
+def iter_batches(items: list, batch_size: int):
+    """
+    Splits transactions into the request bodies sent by a client
+    :param items: Transactions in arrival order
+    :param batch_size: Number of transactions per window
+    :return: generator of [supplies, sales] of each window
+    """
+    items = iter(items)
+
+    while window := list(islice(items, batch_size)):
+        yield (
+            [get_body(item) for item in window if item["type"] == "supply"],
+            [get_body(item) for item in window if item["type"] == "sale"],
+        )
+
+
+def get_body(item: dict) -> dict:
+    """
+    Item as sent to the API
+    :param item: Generated transaction
+    :return: {when, sku, qty, price}
+    """
+    return {key: item[key] for key in ("when", "sku", "qty", "price")}
+
+
+def get_end(items: list) -> datetime:
+    """
+    Date of the latest transaction
+    :param items: Generated transactions
+    :return: datetime
+    """
+    return max(datetime.fromisoformat(item["when"]) for item in items)
@@ -0,0 +1,21 @@
+import os
+
+
+def get_postgres_database(**extra) -> dict:
+    """
+    PostgreSQL database configured by POSTGRES_* environment variables
+    :param extra: Additional database settings
+    :return: Database settings or None when POSTGRES_DB is not set
+    """
+    if not os.environ.get("POSTGRES_DB"):
+        return None
+
+    return {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ["POSTGRES_DB"],
+        "USER": os.environ.get("POSTGRES_USER", "postgres"),
+        "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+        "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+        "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        **extra,
+    }
@@ -0,0 +1,41 @@
+import os
+
+from ..databases import get_postgres_database
+from ..settings import *
+
+SECRET_KEY = os.environ.get("SECRET_KEY", SECRET_KEY)
+
+DEBUG = os.environ.get("DEBUG") == "1"
+
+REQUEST_PROFILING = os.environ.get("REQUEST_PROFILING") == "1"
+
+ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "*").split(",")
+
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", ARCHIVE_DIR)
+
+
+# WAL lets readers run next to a writer, IMMEDIATE transactions take the write
+# lock up front instead of failing when a reader upgrades to a writer.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # KiB
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+DATABASES = {
+    "default": get_postgres_database(CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True)
+    or {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+        "CONN_MAX_AGE": None,
+        "OPTIONS": {
+            "init_command": "".join(
+                f"PRAGMA {name}={value};" for name, value in SQLITE_PRAGMAS.items()
+            ),
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
+    }
+}
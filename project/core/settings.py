@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "transactions.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -128,3 +129,34 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Transactions
+
+# Number of replayed transactions between two availability checkpoints
+SNAPSHOT_INTERVAL = 1000
+
+# Number of rows per INSERT statement when transactions are created in bulk
+BULK_CREATE_BATCH_SIZE = 1000
+
+# Worker processes for replays of the whole history, partitioned by SKU
+REPLAY_WORKERS = 1
+
+# Number of API responses kept in memory per process, 0 disables the response cache
+RESPONSE_CACHE_SIZE = 256
+
+# Alias of a Django cache shared between processes that backs the in-memory one
+RESPONSE_CACHE_ALIAS = None
+
+# Threads that compute responses of the async read endpoints
+ASYNC_READ_WORKERS = 4
+
+# Days of history before the latest transaction left open to late transactions
+# when compact_ledger runs without a watermark
+COMPACTION_KEEP_DAYS = 90
+
+# Directory of the columnar files of archived transactions
+ARCHIVE_DIR = BASE_DIR / "archive"
+
+# Answer requests with ?profile=1 or X-Profile: 1 with a cProfile report
+REQUEST_PROFILING = DEBUG
@@ -1,8 +1,10 @@
+from ..databases import get_postgres_database
 from ..settings import *
 
 
 DATABASES = {
-    "default": {
+    "default": get_postgres_database()
+    or {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",
     }
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.backends.signals import connection_created
 
 
 class TransactionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "transactions"
+
+    def ready(self):
+        from transactions.metrics import install_query_recorder
+
+        connection_created.connect(install_query_recorder)
+
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(None, connection)
@@ -0,0 +1,168 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.convert import exception_to_response_data
+from transactions.serializers import TopQuerySerializer
+from transactions.services import cache
+from transactions.services.custom import aget_profit
+from transactions.views import (
+    AvailabilityAPIView,
+    IssuesAPIView,
+    ProfitAPIView,
+    TopAPIView,
+)
+
+_executor = None
+_in_flight = {}
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Threads shared by the async views, bounded by ASYNC_READ_WORKERS
+    :return: ThreadPoolExecutor
+    """
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_READ_WORKERS, thread_name_prefix="reads"
+        )
+
+    return _executor
+
+
+async def single_flight(key: tuple, func):
+    """
+    Runs the function in the executor, concurrent calls with the same key
+    wait for the computation that is already running instead of starting one
+    :param key: Hashable key
+    :param func: Callable without arguments
+    :return: Result of the function
+    """
+    future = _in_flight.get(key)
+
+    if future is None:
+        loop = asyncio.get_running_loop()
+        # The context carries the stats of the request to the executor thread
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(get_executor(), context.run, _run, func)
+        _in_flight[key] = future
+        future.add_done_callback(lambda _: _in_flight.pop(key, None))
+
+    # A cancelled request must not cancel the computation of the others
+    return await asyncio.shield(future)
+
+
+def _run(func):
+    try:
+        return func()
+
+    finally:
+        close_old_connections()
+
+
+def parse_dates(request) -> [datetime, datetime]:
+    date_from = request.GET.get("from")
+    date_to = request.GET.get("to")
+
+    if date_from:
+        date_from = datetime.fromisoformat(date_from)
+
+    if date_to:
+        date_to = datetime.fromisoformat(date_to)
+
+    return date_from or None, date_to or None
+
+
+class AsyncReadView(View):
+    """
+    Read endpoint for ASGI servers. The response is computed in the executor,
+    once for all concurrent identical requests and only when it is not cached.
+    """
+
+    endpoint = None
+
+    async def respond(self, func, date_from=None, date_to=None, **params):
+        version, last_when = await cache.aget_version()
+        key = cache.get_key(
+            self.endpoint, version, last_when, date_from, date_to, **params
+        )
+        compute = partial(
+            cache.get_or_compute,
+            self.endpoint,
+            func,
+            date_from=date_from,
+            date_to=date_to,
+            **params,
+        )
+
+        response = await single_flight(key, compute)
+
+        return JsonResponse(response, encoder=JSONEncoder)
+
+
+class AsyncAvailabilityView(AsyncReadView):
+    endpoint = "availability"
+
+    async def get(self, request, *args, **kwargs):
+        _, to = parse_dates(request)
+        to = to or datetime.now()
+
+        return await self.respond(
+            partial(AvailabilityAPIView.get_response, to), date_to=to
+        )
+
+
+class AsyncIssuesView(AsyncReadView):
+    endpoint = "issues"
+
+    async def get(self, request, *args, **kwargs):
+        date_from, date_to = parse_dates(request)
+
+        return await self.respond(
+            partial(IssuesAPIView.get_response, date_from, date_to),
+            date_from=date_from,
+            date_to=date_to,
+        )
+
+
+class AsyncProfitView(View):
+    async def get(self, request, *args, **kwargs):
+        profit = await aget_profit(*parse_dates(request))
+
+        return JsonResponse(ProfitAPIView.get_response(profit), encoder=JSONEncoder)
+
+
+class AsyncTopView(AsyncReadView):
+    endpoint = "top"
+
+    async def get(self, request, *args, **kwargs):
+        date_from, date_to = parse_dates(request)
+
+        query = TopQuerySerializer(data=request.GET)
+
+        if not query.is_valid():
+            # Same body and status as exception_handler_ext gives the sync view
+            error = serializers.ValidationError(query.errors)
+            return JsonResponse(
+                exception_to_response_data(error), status=422, encoder=JSONEncoder
+            )
+
+        return await self.respond(
+            partial(
+                TopAPIView.get_response, date_from, date_to, **query.validated_data
+            ),
+            date_from=date_from,
+            date_to=date_to,
+            **query.validated_data,
+        )
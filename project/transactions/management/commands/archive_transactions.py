@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.services import archive, snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves transactions of the months before a cutoff to memory-mapped "
+        "columnar files that replays read. Only compacted history is archived."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cutoff",
+            type=datetime.fromisoformat,
+            help="Months that end by this date are archived, the watermark by default",
+        )
+
+    def handle(self, *args, **options):
+        watermark = snapshots.get_watermark()
+        cutoff = options["cutoff"] or watermark
+
+        if watermark is None:
+            raise CommandError("The ledger is not compacted, run compact_ledger first")
+
+        if cutoff > watermark:
+            raise CommandError(
+                f"The cutoff must not be after the watermark {watermark.isoformat()}"
+            )
+
+        result = archive.archive(cutoff)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {result['transactions']} transactions of "
+                f"{result['months']} months"
+            )
+        )
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from transactions.models import Checkpoint
+from transactions.services.custom import AvailabilityRetriever
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreates inventory snapshots of the transactions after the compacted history"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.SNAPSHOT_INTERVAL,
+            help="Number of transactions between two checkpoints",
+        )
+
+    def handle(self, *args, **options):
+        Checkpoint.objects.filter(compacted=False).delete()
+
+        retriever = AvailabilityRetriever(use_snapshots=True)
+        retriever.snapshot_interval = options["interval"]
+        retriever.obtain_available_items()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {Checkpoint.objects.count()} checkpoints")
+        )
@@ -0,0 +1,62 @@
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from transactions.services import compaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Folds the history up to a watermark into opening balances that replays "
+        "start from. Transactions up to the watermark are rejected afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--watermark",
+            type=datetime.fromisoformat,
+            help="Date up to which the history is compacted",
+        )
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=settings.COMPACTION_KEEP_DAYS,
+            help="Without a watermark, days before the latest transaction left open",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Compact again periodically instead of exiting",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=3600.0,
+            help="Seconds between two compactions in watch mode",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            watermark = options["watermark"] or compaction.get_default_watermark(
+                options["keep_days"]
+            )
+
+            if watermark is None:
+                self.stdout.write("No transaction to compact")
+
+            else:
+                result = compaction.compact(watermark)
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Compacted the history of {result['skus']} SKUs up to "
+                        f"{result['watermark'].isoformat()}, deleted "
+                        f"{result['allocations']} allocations"
+                    )
+                )
+
+            if not options["watch"]:
+                break
+
+            time.sleep(options["sleep"])
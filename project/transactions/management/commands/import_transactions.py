@@ -0,0 +1,68 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.models import TypeChoices
+from transactions.services import imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports transactions from a CSV file with a header row or an NDJSON file. "
+        "Items have when, sku, qty, price and optionally type (supply or sale)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import")
+        parser.add_argument(
+            "--format",
+            choices=imports.FORMATS,
+            help="File format, guessed from the extension by default",
+        )
+        parser.add_argument(
+            "--type",
+            choices=TypeChoices.values,
+            help="Type of the items without a type",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=imports.CHUNK_SIZE,
+            help="Number of items inserted and recorded together",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"]
+
+        if file_format is None:
+            extension = os.path.splitext(path)[1].lower()
+            file_format = "csv" if extension == ".csv" else "ndjson"
+
+        invalid = 0
+
+        def on_error(line_num, errors):
+            nonlocal invalid
+            invalid += 1
+            self.stderr.write(f"Line {line_num}: {errors}")
+
+        try:
+            file = open(path, newline="", encoding="utf-8")
+
+        except OSError as exc:
+            raise CommandError(exc)
+
+        with file:
+            counts = imports.import_items(
+                imports.read_items(file, file_format),
+                transaction_type=options["type"],
+                chunk_size=options["chunk_size"],
+                on_error=on_error,
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {counts[TypeChoices.SUPPLY]} supplies and "
+                f"{counts[TypeChoices.SALE]} sales, skipped {invalid} invalid items"
+            )
+        )
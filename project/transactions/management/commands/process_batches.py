@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from transactions.services import batches
+
+
+class Command(BaseCommand):
+    help = "Records sales batches accepted by POST /api/sales?async=1"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Keep waiting for new batches instead of exiting when none is left",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Seconds between two polls in watch mode",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = batches.drain()
+
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f"Processed {processed} batches"))
+
+            if not options["watch"]:
+                break
+
+            time.sleep(options["sleep"])
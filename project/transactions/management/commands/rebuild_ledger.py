@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.models import ArchivedMonth, StockLevel
+from transactions.services import compaction, ledger, snapshots
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the FIFO ledger from all transactions"
+
+    def handle(self, *args, **options):
+        if ArchivedMonth.objects.exists():
+            raise CommandError("Archived transactions cannot be recorded again")
+
+        ledger.rebuild()
+        watermark = snapshots.get_watermark()
+
+        # The rebuild allocates the compacted sales again
+        if watermark is not None:
+            compaction.compact(watermark)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Ledger rebuilt for {StockLevel.objects.count()} SKUs")
+        )
@@ -0,0 +1,380 @@
+import cProfile
+import io
+import pstats
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# name: (type, help, buckets)
+METRICS = {
+    "http_requests_total": ("counter", "Requests by endpoint and status", None),
+    "http_request_duration_seconds": (
+        "histogram",
+        "Time to build the response of a request",
+        LATENCY_BUCKETS,
+    ),
+    "http_request_stage_duration_seconds": (
+        "histogram",
+        "Time spent in a stage of a request",
+        LATENCY_BUCKETS,
+    ),
+    "http_request_queries": (
+        "histogram",
+        "Database queries run by a request",
+        QUERY_BUCKETS,
+    ),
+    "http_request_query_duration_seconds": (
+        "histogram",
+        "Time spent in database queries by a request",
+        LATENCY_BUCKETS,
+    ),
+}
+
+PROFILE_LIMIT = 60
+
+_series = {}
+_lock = Lock()
+_request = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class RequestStats:
+    """
+    What a request spent its time on, filled by timers and database queries run
+    in the context of the request
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.queries = 0
+        self.query_time = 0.0
+
+    def add_stage(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+
+def increment(name: str, **labels):
+    """
+    Increments a counter
+    :param name: Name of a counter of METRICS
+    :param labels: Labels of the series
+    """
+    key = (name, tuple(labels.items()))
+
+    with _lock:
+        _series[key] = _series.get(key, 0) + 1
+
+
+def observe(name: str, value: float, **labels):
+    """
+    Adds an observation to a histogram
+    :param name: Name of a histogram of METRICS
+    :param value: Observed value
+    :param labels: Labels of the series
+    """
+    key = (name, tuple(labels.items()))
+
+    with _lock:
+        histogram = _series.get(key)
+
+        if histogram is None:
+            histogram = _series[key] = Histogram(METRICS[name][2])
+
+        histogram.observe(value)
+
+
+def reset():
+    """
+    Forgets every observation
+    """
+    with _lock:
+        _series.clear()
+
+
+@contextmanager
+def timer(stage: str):
+    """
+    Adds the time spent in the block to a stage of the current request, stages
+    timed several times in a request are summed. No-op outside requests.
+    :param stage: Stage name
+    """
+    stats = _request.get()
+
+    if stats is None:
+        yield
+        return
+
+    started = perf_counter()
+
+    try:
+        yield
+
+    finally:
+        stats.add_stage(stage, perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper that counts the queries of the current request
+    """
+    stats = _request.get()
+
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = perf_counter()
+
+    try:
+        return execute(sql, params, many, context)
+
+    finally:
+        stats.queries += 1
+        stats.query_time += perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created receiver, every connection records the queries of the
+    request it runs for, including connections of executor threads
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def render() -> str:
+    """
+    Every series in the Prometheus text format
+    :return: str
+    """
+    with _lock:
+        series = sorted(
+            (key, value if type(value) is int else _copy(value))
+            for key, value in _series.items()
+        )
+
+    lines = []
+    last_name = None
+
+    for (name, labels), value in series:
+        kind, help_text, buckets = METRICS[name]
+
+        if name != last_name:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            last_name = name
+
+        if kind == "counter":
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+            continue
+
+        count = 0
+
+        for bound, bucket_count in zip((*buckets, "+Inf"), value.counts):
+            count += bucket_count
+            bucket_labels = _format_labels((*labels, ("le", str(bound))))
+            lines.append(f"{name}_bucket{bucket_labels} {count}")
+
+        lines.append(f"{name}_sum{_format_labels(labels)} {value.sum!r}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _copy(histogram: Histogram) -> Histogram:
+    copy = Histogram(histogram.buckets)
+    copy.counts = list(histogram.counts)
+    copy.sum = histogram.sum
+    return copy
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return f"{{{pairs}}}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def get_server_timing(stats: RequestStats, total: float) -> str:
+    """
+    Server-Timing header of a request, shown by browser developer tools
+    :param stats: Stats of the request
+    :param total: Duration of the request in seconds
+    :return: str
+    """
+    timings = [
+        f"{stage.replace(' ', '-')};dur={seconds * 1000:.2f}"
+        for stage, seconds in stats.stages.items()
+    ]
+    timings.append(
+        f'db;dur={stats.query_time * 1000:.2f};desc="{stats.queries} queries"'
+    )
+    timings.append(f"total;dur={total * 1000:.2f}")
+
+    return ", ".join(timings)
+
+
+def wants_profile(request) -> bool:
+    """
+    Whether the request asks for a profile with ?profile=1 or X-Profile: 1,
+    honoured when REQUEST_PROFILING is enabled
+    :param request: HttpRequest
+    :return: bool
+    """
+    return settings.REQUEST_PROFILING and "1" in (
+        request.GET.get("profile"),
+        request.headers.get("X-Profile"),
+    )
+
+
+def get_profile_response(profiler: cProfile.Profile, stats: RequestStats):
+    """
+    Report of a profiled request instead of its response
+    :param profiler: Disabled profiler
+    :param stats: Stats of the request
+    :return: HttpResponse
+    """
+    report = io.StringIO()
+    report.write(f"queries: {stats.queries} in {stats.query_time * 1000:.2f}ms\n")
+
+    for stage, seconds in stats.stages.items():
+        report.write(f"{stage}: {seconds * 1000:.2f}ms\n")
+
+    report.write("\n")
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(
+        PROFILE_LIMIT
+    )
+
+    return HttpResponse(report.getvalue(), content_type="text/plain; charset=utf-8")
+
+
+class MetricsMiddleware:
+    """
+    Times every request: latency per endpoint, time per stage, number and time of
+    database queries, reported in the Server-Timing header and /api/metrics.
+    Requests asking for a profile get a cProfile report instead of their response.
+    The time of a streamed response only covers the first chunk.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = _request.set(stats)
+        profiler = cProfile.Profile() if wants_profile(request) else None
+        started = perf_counter()
+
+        try:
+            if profiler is not None:
+                profiler.enable()
+
+            try:
+                response = self.get_response(request)
+
+                if profiler is not None and response.streaming:
+                    b"".join(response.streaming_content)
+
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+
+        finally:
+            _request.reset(token)
+
+        return self.finish(request, response, stats, perf_counter() - started, profiler)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _request.set(stats)
+        profiler = cProfile.Profile() if wants_profile(request) else None
+        started = perf_counter()
+
+        try:
+            if profiler is not None:
+                profiler.enable()
+
+            try:
+                response = await self.get_response(request)
+
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+
+        finally:
+            _request.reset(token)
+
+        return self.finish(request, response, stats, perf_counter() - started, profiler)
+
+    def process_template_response(self, request, response):
+        # Responses are rendered right after this hook, the post-render callback
+        # closes the render stage
+        stats = _request.get()
+
+        if stats is not None:
+            started = perf_counter()
+            response.add_post_render_callback(
+                lambda _: stats.add_stage("render", perf_counter() - started)
+            )
+
+        return response
+
+    @staticmethod
+    def finish(request, response, stats: RequestStats, total: float, profiler):
+        match = request.resolver_match
+        view = match.url_name if match else "unmatched"
+
+        increment(
+            "http_requests_total",
+            view=view,
+            method=request.method,
+            status=response.status_code,
+        )
+        observe("http_request_duration_seconds", total, view=view)
+        observe("http_request_queries", stats.queries, view=view)
+        observe("http_request_query_duration_seconds", stats.query_time, view=view)
+
+        for stage, seconds in stats.stages.items():
+            observe(
+                "http_request_stage_duration_seconds", seconds, view=view, stage=stage
+            )
+
+        if profiler is not None:
+            return get_profile_response(profiler, stats)
+
+        response["Server-Timing"] = get_server_timing(stats, total)
+        return response
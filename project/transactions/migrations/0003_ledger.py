@@ -0,0 +1,142 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0002_transaction_transaction_type"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockLevel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sku", models.CharField(max_length=128, unique=True)),
+                ("qty", models.IntegerField(default=0)),
+                (
+                    "cost",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("first_supply_when", models.DateTimeField(null=True)),
+                ("last_sale_when", models.DateTimeField(null=True)),
+                ("last_when", models.DateTimeField(db_index=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Lot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sku", models.CharField(max_length=128)),
+                ("when", models.DateTimeField()),
+                ("price", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("qty", models.IntegerField()),
+                ("remaining", models.IntegerField()),
+                (
+                    "supply",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lot",
+                        to="transactions.transaction",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Allocation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("qty", models.IntegerField()),
+                (
+                    "sale",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="allocations",
+                        to="transactions.transaction",
+                    ),
+                ),
+                (
+                    "lot",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="allocations",
+                        to="transactions.lot",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Issue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sku", models.CharField(max_length=128)),
+                ("when", models.DateTimeField()),
+                (
+                    "message",
+                    models.CharField(
+                        choices=[
+                            ("out_of_stock", "Out of stock"),
+                            ("negative_margin", "Negative margin"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                (
+                    "sale",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="issue",
+                        to="transactions.transaction",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["when", "sale"], name="transaction_when_a95ef4_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="lot",
+            index=models.Index(
+                fields=["sku", "when", "id"], name="transaction_sku_d4446f_idx"
+            ),
+        ),
+    ]
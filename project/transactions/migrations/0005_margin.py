@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0004_snapshots"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Margin",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sku", models.CharField(max_length=128)),
+                ("when", models.DateTimeField()),
+                ("revenue", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("cost", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("profit", models.DecimalField(decimal_places=2, max_digits=20)),
+                (
+                    "sale",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="margin",
+                        to="transactions.transaction",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["when"], name="transaction_when_59cad7_idx")
+                ],
+            },
+        ),
+    ]
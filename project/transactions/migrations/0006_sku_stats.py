@@ -0,0 +1,50 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0005_margin"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SkuStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sku", models.CharField(max_length=128)),
+                ("bucket", models.DateTimeField()),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "cost",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "profit",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("qty", models.IntegerField(default=0)),
+                ("issues", models.IntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("bucket", "sku"), name="unique_sku_stats"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0006_sku_stats"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="transaction",
+            options={"ordering": ["when", "id"]},
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["transaction_type", "when", "id"],
+                name="transaction_transac_5a30e6_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["sku", "when", "id"], name="transaction_sku_b722c3_idx"
+            ),
+        ),
+    ]
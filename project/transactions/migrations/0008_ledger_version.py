@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0007_transaction_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LedgerVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.BigIntegerField(default=0)),
+                ("last_when", models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
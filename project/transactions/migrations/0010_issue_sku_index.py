@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0009_batches"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="issue",
+            index=models.Index(
+                fields=["sku", "when", "sale"], name="transaction_sku_a64677_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0010_issue_sku_index"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="lot",
+            name="transaction_sku_d4446f_idx",
+        ),
+        migrations.AddIndex(
+            model_name="lot",
+            index=models.Index(
+                condition=models.Q(("remaining__gt", 0)),
+                fields=["sku", "when", "id"],
+                name="transactions_lot_open_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stocklevel",
+            index=models.Index(
+                fields=["first_supply_when", "id"],
+                name="transaction_first_s_70c364_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0011_stock_level_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="skustats",
+            name="unique_sku_stats",
+        ),
+        migrations.AddField(
+            model_name="skustats",
+            name="granularity",
+            field=models.CharField(
+                choices=[("hour", "Hour"), ("day", "Day"), ("month", "Month")],
+                default="hour",
+                max_length=8,
+            ),
+        ),
+        migrations.AddField(
+            model_name="skustats",
+            name="supplied",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name="skustats",
+            constraint=models.UniqueConstraint(
+                fields=("granularity", "bucket", "sku"), name="unique_sku_stats"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0012_rollups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="checkpoint",
+            name="compacted",
+            field=models.BooleanField(default=False),
+        ),
+    ]
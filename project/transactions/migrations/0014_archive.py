@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_margin_qty(apps, schema_editor):
+    Margin = apps.get_model("transactions", "Margin")
+    Transaction = apps.get_model("transactions", "Transaction")
+    sales = Transaction.objects.filter(pk=OuterRef("sale_id"))
+    Margin.objects.update(qty=Subquery(sales.values("qty")[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0013_checkpoint_compacted"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedMonth",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateTimeField(unique=True)),
+                ("file_name", models.CharField(max_length=255)),
+                ("rows", models.IntegerField()),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="margin",
+            name="qty",
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_margin_qty, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="margin",
+            name="sale",
+            field=models.OneToOneField(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="margin",
+                to="transactions.transaction",
+            ),
+        ),
+    ]
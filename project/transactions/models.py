@@ -6,9 +6,206 @@ class TypeChoices(models.TextChoices):
     SALE = "sale", "Sale"
 
 
+class IssueChoices(models.TextChoices):
+    OUT_OF_STOCK = "out_of_stock", "Out of stock"
+    NEGATIVE_MARGIN = "negative_margin", "Negative margin"
+
+
+class GranularityChoices(models.TextChoices):
+    HOUR = "hour", "Hour"
+    DAY = "day", "Day"
+    MONTH = "month", "Month"
+
+
 class Transaction(models.Model):
     transaction_type = models.CharField(max_length=16, choices=TypeChoices.choices)
     sku = models.CharField(max_length=128)
     qty = models.IntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     when = models.DateTimeField()
+
+    class Meta:
+        # Transactions with the same timestamp are replayed in insertion order
+        ordering = ["when", "id"]
+        indexes = [
+            models.Index(fields=["transaction_type", "when", "id"]),
+            models.Index(fields=["sku", "when", "id"]),
+        ]
+
+
+class Lot(models.Model):
+    """Supply lot of the FIFO ledger with the quantity that is not sold yet"""
+
+    supply = models.OneToOneField(
+        Transaction, on_delete=models.CASCADE, related_name="lot"
+    )
+    sku = models.CharField(max_length=128)
+    when = models.DateTimeField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    qty = models.IntegerField()
+    remaining = models.IntegerField()
+
+    class Meta:
+        # Only lots that are not sold out are read back, so sold out lots leave
+        # the index and reading the open lots of a SKU does not grow with history
+        indexes = [
+            models.Index(
+                fields=["sku", "when", "id"],
+                condition=models.Q(remaining__gt=0),
+                name="transactions_lot_open_idx",
+            )
+        ]
+
+
+class Allocation(models.Model):
+    """Quantity of a lot consumed by a sale, kept to rewind the ledger"""
+
+    sale = models.ForeignKey(
+        Transaction, on_delete=models.CASCADE, related_name="allocations"
+    )
+    lot = models.ForeignKey(Lot, on_delete=models.CASCADE, related_name="allocations")
+    qty = models.IntegerField()
+
+
+class Issue(models.Model):
+    sale = models.OneToOneField(
+        Transaction, on_delete=models.CASCADE, related_name="issue"
+    )
+    sku = models.CharField(max_length=128)
+    when = models.DateTimeField()
+    message = models.CharField(max_length=32, choices=IssueChoices.choices)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["when", "sale"]),
+            models.Index(fields=["sku", "when", "sale"]),
+        ]
+
+
+class StockLevel(models.Model):
+    """Running FIFO totals of a SKU after every transaction in the ledger"""
+
+    sku = models.CharField(max_length=128, unique=True)
+    qty = models.IntegerField(default=0)
+    cost = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    first_supply_when = models.DateTimeField(null=True)
+    last_sale_when = models.DateTimeField(null=True)
+    last_when = models.DateTimeField(null=True, db_index=True)
+
+    class Meta:
+        # Current availability is read in this order
+        indexes = [models.Index(fields=["first_supply_when", "id"])]
+
+
+class Checkpoint(models.Model):
+    """
+    Point in time with inventory snapshots of every transaction up to it.
+    A compacted checkpoint is the opening balance of the history after it,
+    transactions up to it are no longer accepted.
+    """
+
+    when = models.DateTimeField(unique=True)
+    compacted = models.BooleanField(default=False)
+
+
+class Snapshot(models.Model):
+    checkpoint = models.ForeignKey(
+        Checkpoint, on_delete=models.CASCADE, related_name="snapshots"
+    )
+    sku = models.CharField(max_length=128)
+    qty = models.IntegerField()
+    cost = models.DecimalField(max_digits=20, decimal_places=2)
+    lots = models.JSONField(default=list)
+
+
+class Margin(models.Model):
+    """Realized margin of a sale matched against FIFO lots"""
+
+    # Margins outlive the sales moved to the archive, so they keep the quantity
+    # of the sale and do not constrain its id
+    sale = models.OneToOneField(
+        Transaction,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="margin",
+    )
+    sku = models.CharField(max_length=128)
+    when = models.DateTimeField()
+    qty = models.IntegerField()
+    revenue = models.DecimalField(max_digits=20, decimal_places=2)
+    cost = models.DecimalField(max_digits=20, decimal_places=2)
+    profit = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        indexes = [models.Index(fields=["when"])]
+
+
+class SkuStats(models.Model):
+    """
+    Supplies and sales of a SKU within an hour, a day or a month, combined to
+    rank SKUs and summarize windows
+    """
+
+    sku = models.CharField(max_length=128)
+    granularity = models.CharField(
+        max_length=8,
+        choices=GranularityChoices.choices,
+        default=GranularityChoices.HOUR,
+    )
+    bucket = models.DateTimeField()
+    supplied = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    profit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    qty = models.IntegerField(default=0)
+    issues = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "bucket", "sku"], name="unique_sku_stats"
+            )
+        ]
+
+
+class ArchivedMonth(models.Model):
+    """Transactions of a month moved from the transactions table to a columnar file"""
+
+    month = models.DateTimeField(unique=True)
+    # In ARCHIVE_DIR, every archival of the month writes a new file
+    file_name = models.CharField(max_length=255)
+    rows = models.IntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+
+
+class LedgerVersion(models.Model):
+    """Single row changed by every write, cached responses are keyed by its version"""
+
+    version = models.BigIntegerField(default=0)
+    last_when = models.DateTimeField(null=True)
+
+
+class BatchStatusChoices(models.TextChoices):
+    PENDING = "pending", "Pending"
+    DONE = "done", "Done"
+    FAILED = "failed", "Failed"
+
+
+class Batch(models.Model):
+    """Sales accepted by the API and recorded later by the batch worker"""
+
+    status = models.CharField(
+        max_length=16,
+        choices=BatchStatusChoices.choices,
+        default=BatchStatusChoices.PENDING,
+    )
+    payload = models.JSONField(default=list)
+    size = models.IntegerField(default=0)
+    success = models.IntegerField(null=True)
+    issues = models.IntegerField(null=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    processed = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "id"])]
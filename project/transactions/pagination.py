@@ -0,0 +1,26 @@
+import base64
+import json
+
+
+def encode_cursor(*values) -> str:
+    """
+    Opaque cursor that points after the last item of a page
+    :param values: JSON-serializable sort key of the item
+    :return: str
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+    Sort key of a cursor
+    :param cursor: Cursor from encode_cursor
+    :return: [values]
+    :raises ValueError: The cursor is malformed
+    """
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+    if not isinstance(values, list):
+        raise ValueError("Cursor must encode a list")
+
+    return values
@@ -1,5 +1,14 @@
+from datetime import datetime, timedelta
+
 from rest_framework import serializers
 
+from transactions.models import GranularityChoices
+from transactions.pagination import decode_cursor
+from transactions.services.stats import METRICS
+
+MAX_PAGE_SIZE = 10000
+MAX_SERIES_POINTS = 10000
+
 
 class SupplySerializer(serializers.Serializer):
     when = serializers.DateTimeField()
@@ -45,6 +54,80 @@ class SaleSerializer(serializers.Serializer):
         return value
 
 
+class SkuQuerySerializer(serializers.Serializer):
+    sku = serializers.ListField(child=serializers.CharField(), required=False)
+    sku_prefix = serializers.CharField(required=False)
+
+
+class PageQuerySerializer(SkuQuerySerializer):
+    limit = serializers.IntegerField(
+        min_value=1, max_value=MAX_PAGE_SIZE, required=False
+    )
+    cursor = serializers.CharField(required=False)
+
+    def validate_cursor(self, value: str):
+        try:
+            return self.parse_cursor(*decode_cursor(value))
+
+        except (TypeError, ValueError):
+            raise serializers.ValidationError("Cursor is invalid")
+
+
+class AvailabilityPageQuerySerializer(PageQuerySerializer):
+    def parse_cursor(self, sku: str):
+        if not isinstance(sku, str):
+            raise TypeError("SKU must be a string")
+        return sku
+
+
+class AvailabilitySeriesQuerySerializer(SkuQuerySerializer):
+    to = serializers.ListField(child=serializers.DateTimeField())
+    step = serializers.DurationField(min_value=timedelta(seconds=1), required=False)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["from"] = serializers.DateTimeField(required=False)
+        return fields
+
+    def validate(self, data: dict) -> dict:
+        points = sorted(set(data["to"]))
+
+        if "step" in data:
+            if "from" not in data or len(points) != 1:
+                raise serializers.ValidationError(
+                    "A step needs one from and one to date"
+                )
+
+            date_from, date_to, step = data["from"], points[0], data["step"]
+            count = (date_to - date_from) // step + 1 if date_from <= date_to else 0
+
+            if count > MAX_SERIES_POINTS:
+                points = None
+
+            else:
+                points = [date_from + step * idx for idx in range(count)]
+
+        elif "from" in data:
+            raise serializers.ValidationError("A from date needs a step")
+
+        if points is None or len(points) > MAX_SERIES_POINTS:
+            raise serializers.ValidationError(
+                f"At most {MAX_SERIES_POINTS} dates are allowed"
+            )
+
+        if not points:
+            raise serializers.ValidationError("No dates in the range")
+
+        return {**data, "points": points}
+
+
+class IssuesPageQuerySerializer(PageQuerySerializer):
+    def parse_cursor(self, when: str, sale_id: int):
+        if not isinstance(sale_id, int):
+            raise TypeError("Sale id must be an integer")
+        return datetime.fromisoformat(when), sale_id
+
+
 class AvailabilityResponseSerializer(serializers.Serializer):
     sku = serializers.CharField()
     qty = serializers.IntegerField()
@@ -57,3 +140,50 @@ class IssuesResponseSerializer(serializers.Serializer):
     qty = serializers.IntegerField()
     price = serializers.FloatField()
     message = serializers.CharField()
+
+
+class ProfitResponseSerializer(serializers.Serializer):
+    revenue = serializers.FloatField()
+    cost = serializers.FloatField()
+    profit = serializers.FloatField()
+
+
+class TopQuerySerializer(serializers.Serializer):
+    top = serializers.IntegerField(min_value=1, default=100)
+    by = serializers.ChoiceField(choices=METRICS, default="profit")
+
+
+class TopResponseSerializer(serializers.Serializer):
+    sku = serializers.CharField()
+    profit = serializers.FloatField()
+    revenue = serializers.FloatField()
+    qty = serializers.IntegerField()
+    issues = serializers.IntegerField()
+
+
+class SummaryQuerySerializer(SkuQuerySerializer):
+    granularity = serializers.ChoiceField(
+        choices=GranularityChoices.choices, default=GranularityChoices.DAY
+    )
+
+
+class SummaryResponseSerializer(serializers.Serializer):
+    bucket = serializers.DateTimeField()
+    sku = serializers.CharField()
+    supplied = serializers.IntegerField()
+    qty = serializers.IntegerField()
+    revenue = serializers.FloatField()
+    cost = serializers.FloatField()
+    profit = serializers.FloatField()
+    issues = serializers.IntegerField()
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.CharField()
+    size = serializers.IntegerField()
+    success = serializers.IntegerField()
+    issues = serializers.IntegerField()
+    error = serializers.CharField()
+    created = serializers.DateTimeField()
+    processed = serializers.DateTimeField()
@@ -0,0 +1,344 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import uuid
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
+from heapq import merge
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Exists, Min, OuterRef, Q
+
+from transactions.models import (
+    Allocation,
+    ArchivedMonth,
+    Issue,
+    Lot,
+    Transaction,
+    TypeChoices,
+)
+from transactions.services.rows import iter_rows, with_cents
+
+MAGIC = b"TXNCOL01"
+
+# Magic, byte order, number of rows, size of the SKU dictionary
+HEADER = struct.Struct("<8s8sQQ")
+
+# Columns in file order with their array type codes. Rows are sorted in replay
+# order, by (when, is_sale, id), so a window is found by bisecting ``when``.
+COLUMNS = (
+    ("when", "q"),
+    ("is_sale", "b"),
+    ("id", "q"),
+    ("sku", "i"),
+    ("qty", "q"),
+    ("price", "q"),
+)
+
+ALIGNMENT = 8
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+OPEN_FILES = 64
+
+
+def get_month(when: datetime) -> datetime:
+    """
+    Start of the month of the date
+    :param when: Date
+    :return: datetime
+    """
+    return when.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def get_next_month(month: datetime) -> datetime:
+    """
+    Start of the month after the month
+    :param month: Month start
+    :return: datetime
+    """
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def to_micros(when: datetime) -> int:
+    return (when - EPOCH) // MICROSECOND
+
+
+def from_micros(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _padding(size: int) -> bytes:
+    return b"\0" * (-size % ALIGNMENT)
+
+
+def write_month(path: Path, rows: list):
+    """
+    Writes rows to a columnar file, in the byte order of the machine. SKUs are
+    stored once in a dictionary and rows only keep their index in it.
+    :param path: File to create
+    :param rows: (when, is_sale, id, sku, qty, price in cents) in replay order
+    """
+    codes = {}
+    columns = [array(code) for _, code in COLUMNS]
+    when, is_sale, ids, skus, qty, price = columns
+
+    for row_when, row_is_sale, pk, sku, row_qty, row_price in rows:
+        when.append(to_micros(row_when))
+        is_sale.append(row_is_sale)
+        ids.append(pk)
+        skus.append(codes.setdefault(sku, len(codes)))
+        qty.append(row_qty)
+        price.append(row_price)
+
+    dictionary = json.dumps(list(codes)).encode()
+    byteorder = sys.byteorder.encode()
+
+    with open(path, "xb") as file:
+        file.write(HEADER.pack(MAGIC, byteorder, len(rows), len(dictionary)))
+        file.write(dictionary + _padding(len(dictionary)))
+
+        for column in columns:
+            data = column.tobytes()
+            file.write(data + _padding(len(data)))
+
+        file.flush()
+        os.fsync(file.fileno())
+
+
+@lru_cache(maxsize=OPEN_FILES)
+def open_month(path: Path) -> [list, dict]:
+    """
+    Maps a columnar file in memory. Files are never changed once written, so
+    they stay mapped and their pages are shared with the page cache.
+    :param path: File
+    :return: [SKU dictionary, {column name: memoryview}]
+    """
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+    magic, byteorder, rows, size = HEADER.unpack_from(view)
+
+    if magic != MAGIC or byteorder.rstrip(b"\0").decode() != sys.byteorder:
+        raise ValueError(f"{path} is not an archive of this machine")
+
+    offset = HEADER.size
+    skus = json.loads(bytes(view[offset : offset + size]))
+    offset += size + len(_padding(size))
+    columns = {}
+
+    for name, code in COLUMNS:
+        length = rows * array(code).itemsize
+        columns[name] = view[offset : offset + length].cast(code)
+        offset += length + len(_padding(length))
+
+    return skus, columns
+
+
+def iter_month(
+    path: Path,
+    after: datetime = None,
+    until: datetime = None,
+    skus: list = None,
+    sku_prefix: str = None,
+):
+    """
+    Streams rows of a columnar file
+    :param path: File
+    :param after: Only rows dated after the date
+    :param until: Only rows dated up to the date
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: generator of (when, is_sale, id, sku, qty, price in cents)
+    """
+    dictionary, columns = open_month(path)
+    when = columns["when"]
+    start = 0 if after is None else bisect_right(when, to_micros(after))
+    end = len(when) if until is None else bisect_right(when, to_micros(until))
+    codes = None
+
+    if skus is not None or sku_prefix:
+        codes = {
+            code
+            for code, sku in enumerate(dictionary)
+            if (skus is None or sku in skus)
+            and (not sku_prefix or sku.startswith(sku_prefix))
+        }
+
+    rows = zip(*(columns[name][start:end] for name, _ in COLUMNS))
+
+    for row_when, is_sale, pk, code, qty, price in rows:
+        if codes is not None and code not in codes:
+            continue
+
+        yield from_micros(row_when), is_sale, pk, dictionary[code], qty, price
+
+
+def get_path(name: str) -> Path:
+    return Path(settings.ARCHIVE_DIR) / name
+
+
+def get_months(after: datetime = None, until: datetime = None) -> list:
+    """
+    Archived months with transactions in a window
+    :param after: Start of the window, excluded
+    :param until: End of the window, included
+    :return: [ArchivedMonth] in time order
+    """
+    months = ArchivedMonth.objects.order_by("month")
+
+    if after is not None:
+        months = months.filter(month__gte=get_month(after))
+
+    if until is not None:
+        months = months.filter(month__lte=until)
+
+    return list(months)
+
+
+def iter_archived(
+    months: list,
+    after: datetime = None,
+    until: datetime = None,
+    skus: list = None,
+    sku_prefix: str = None,
+):
+    """
+    Streams archived transactions of a window in replay order
+    :param months: Archived months of the window, in time order
+    :param after: Only transactions dated after the date
+    :param until: Only transactions dated up to the date
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: generator of (when, is_sale, id, sku, qty, price in cents)
+    """
+    for month in months:
+        yield from iter_month(get_path(month.file_name), after, until, skus, sku_prefix)
+
+
+def get_archivable(month: datetime, end: datetime):
+    """
+    Transactions of a month that the ledger no longer reads: supplies whose
+    lots are sold out and not allocated to sales that can be rewound, and sales
+    without an issue, which is listed with its sale
+    :param month: Month start
+    :param end: Next month start
+    :return: Transaction queryset
+    """
+    allocated = Allocation.objects.filter(lot=OuterRef("pk"))
+    kept_lots = Lot.objects.filter(Q(remaining__gt=0) | Exists(allocated))
+
+    return (
+        Transaction.objects.filter(when__gte=month, when__lt=end)
+        .exclude(id__in=kept_lots.values("supply_id"))
+        .exclude(Exists(Issue.objects.filter(sale=OuterRef("pk"))))
+    )
+
+
+def archive_month(month: datetime) -> int:
+    """
+    Moves the transactions of a month that the ledger no longer reads to its
+    columnar file, with those archived before. The file is written first and
+    registered in the database transaction that deletes the rows, so the rows
+    are always either in the table or in a registered file.
+    :param month: Month start
+    :return: Number of archived transactions
+    """
+    queryset = with_cents(get_archivable(month, get_next_month(month)))
+    queryset = queryset.values_list(
+        "when", "transaction_type", "id", "sku", "qty", "cents"
+    )
+    rows = [
+        (
+            when,
+            int(transaction_type == TypeChoices.SALE),
+            pk,
+            sku,
+            qty,
+            int(cents),
+        )
+        for when, transaction_type, pk, sku, qty, cents in iter_rows(queryset)
+    ]
+
+    if not rows:
+        return 0
+
+    current = ArchivedMonth.objects.filter(month=month).first()
+    ids = [row[2] for row in rows]
+
+    if current is not None:
+        rows = list(merge(sorted(rows), iter_archived([current])))
+
+    else:
+        rows.sort()
+
+    name = f"transactions-{month:%Y-%m}-{uuid.uuid4().hex[:12]}.bin"
+    path = get_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_month(path, rows)
+
+    try:
+        with db_transaction.atomic():
+            batch_size = settings.BULK_CREATE_BATCH_SIZE
+
+            # Margins are kept, lots of the supplies are sold out
+            for start in range(0, len(ids), batch_size):
+                Transaction.objects.filter(
+                    id__in=ids[start : start + batch_size]
+                ).delete()
+
+            ArchivedMonth.objects.update_or_create(
+                month=month, defaults={"file_name": name, "rows": len(rows)}
+            )
+
+            if current is not None:
+                old = get_path(current.file_name)
+                db_transaction.on_commit(lambda: old.unlink(missing_ok=True))
+
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+
+    return len(ids)
+
+
+def archive(cutoff: datetime) -> dict:
+    """
+    Moves transactions of the months before the cutoff to columnar files, one
+    month at a time. Only compacted history can be archived: the cutoff must not
+    be after the compaction watermark.
+    :param cutoff: Date, only months that end by it are archived
+    :return: {months, transactions}
+    """
+    end = get_month(cutoff)
+    first = Transaction.objects.filter(when__lt=end).aggregate(first=Min("when"))
+    month = first["first"] and get_month(first["first"])
+    months = transactions = 0
+
+    while month is not None and month < end:
+        archived = archive_month(month)
+
+        if archived:
+            months += 1
+            transactions += archived
+
+        month = get_next_month(month)
+
+    return {"months": months, "transactions": transactions}
+
+
+def remove(paths: list):
+    """
+    Deletes archive files, once their months are deleted
+    :param paths: Files
+    """
+    open_month.cache_clear()
+
+    for path in paths:
+        path.unlink(missing_ok=True)
@@ -0,0 +1,77 @@
+import logging
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from transactions.models import Batch, BatchStatusChoices
+from transactions.serializers import SaleSerializer
+from transactions.services.crud import add_sales
+from transactions.validation import validate_batch
+
+
+def enqueue(sales: list) -> Batch:
+    """
+    Stores validated sales to be recorded by the batch worker
+    :param sales: Request data of the sales, as sent
+    :return: Batch
+    """
+    return Batch.objects.create(payload=sales, size=len(sales))
+
+
+def process_next() -> Batch:
+    """
+    Records the oldest pending batch. The sales and the batch status are saved
+    in one database transaction, so a batch is never recorded twice.
+    :return: Processed batch or None when no batch is pending
+    """
+    with db_transaction.atomic():
+        batch = (
+            Batch.objects.select_for_update()
+            .filter(status=BatchStatusChoices.PENDING)
+            .order_by("id")
+            .first()
+        )
+
+        if batch is None:
+            return None
+
+        try:
+            sales = validate_batch(batch.payload, SaleSerializer)
+
+        except ValidationError as exc:
+            batch.status = BatchStatusChoices.FAILED
+            batch.error = str(exc.detail)
+
+        else:
+            try:
+                with db_transaction.atomic():
+                    batch.success, batch.issues = add_sales(sales)
+                    batch.status = BatchStatusChoices.DONE
+
+            except Exception as exc:
+                logging.exception(f"Batch {batch.id} failed")
+                batch.status = BatchStatusChoices.FAILED
+                batch.error = str(exc)
+
+        batch.processed = timezone.now()
+        batch.save()
+
+    return batch
+
+
+def drain(limit: int = None) -> int:
+    """
+    Records pending batches in the order they were accepted
+    :param limit: Maximum number of batches
+    :return: Number of processed batches
+    """
+    processed = 0
+
+    while limit is None or processed < limit:
+        if process_next() is None:
+            break
+
+        processed += 1
+
+    return processed
@@ -0,0 +1,162 @@
+import hashlib
+import random
+from collections import OrderedDict
+from datetime import datetime
+from functools import cache
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Greatest
+
+from transactions.models import LedgerVersion
+
+VERSION_ID = 1
+LATEST = "latest"
+
+_responses = OrderedDict()
+_lock = Lock()
+
+
+def get_version() -> [int, datetime]:
+    """
+    Current ledger version. Read on every cached request, so the query is
+    compiled once and runs on a raw cursor.
+    :return: [version or None before the first write, date of the latest transaction]
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(*_get_version_query())
+        row = cursor.fetchone()
+
+    return row or (None, None)
+
+
+async def aget_version() -> [int, datetime]:
+    """
+    Async version of get_version
+    :return: [version or None before the first write, date of the latest transaction]
+    """
+    queryset = LedgerVersion.objects.filter(pk=VERSION_ID)
+    return await queryset.values_list("version", "last_when").afirst() or (None, None)
+
+
+def bump(when: datetime = None):
+    """
+    Changes the ledger version. Runs in the database transaction of the write,
+    so the version only changes if the write is committed.
+    :param when: Latest date of the written transactions, None when all are deleted
+    """
+    # Random instead of incremented, so a rolled back write never reuses a version
+    version = random.getrandbits(63)
+    fields = {"version": version, "last_when": None}
+
+    if when is not None:
+        fields["last_when"] = Greatest(Coalesce("last_when", Value(when)), Value(when))
+
+    versions = LedgerVersion.objects.filter(pk=VERSION_ID)
+
+    if versions.update(**fields):
+        return
+
+    _, created = LedgerVersion.objects.get_or_create(
+        pk=VERSION_ID, defaults={"version": version, "last_when": when}
+    )
+
+    if not created:
+        versions.update(**fields)
+
+
+def get_key(
+    endpoint: str,
+    version: int,
+    last_when: datetime,
+    date_from: datetime = None,
+    date_to: datetime = None,
+    **params,
+) -> tuple:
+    """
+    Key of a response. Dates after the latest transaction give the same
+    response, so they share a key.
+    :param endpoint: Endpoint name
+    :param version: Ledger version
+    :param last_when: Date of the latest transaction
+    :param date_from: Date from
+    :param date_to: Date to, None for all transactions
+    :param params: Other query parameters
+    :return: Hashable key
+    """
+    if date_to is None or last_when is None or date_to >= last_when:
+        date_to = LATEST
+
+    return endpoint, version, date_from, date_to, *sorted(params.items())
+
+
+def get_or_compute(
+    endpoint: str,
+    compute,
+    date_from: datetime = None,
+    date_to: datetime = None,
+    **params,
+):
+    """
+    Returns the cached response of an endpoint or computes and caches it.
+    Responses are keyed by the ledger version, so a write makes all of them miss.
+    :param endpoint: Endpoint name
+    :param compute: Callable that returns the response data
+    :param date_from: Date from
+    :param date_to: Date to, None for all transactions
+    :param params: Other query parameters
+    :return: Response data
+    """
+    if not settings.RESPONSE_CACHE_SIZE:
+        return compute()
+
+    version, last_when = get_version()
+
+    key = get_key(endpoint, version, last_when, date_from, date_to, **params)
+
+    with _lock:
+        if key in _responses:
+            _responses.move_to_end(key)
+            return _responses[key]
+
+    shared = _get_shared_cache()
+    shared_key = "responses:" + hashlib.sha1(repr(key).encode()).hexdigest()
+    data = shared.get(shared_key) if shared else None
+
+    if data is None:
+        data = compute()
+
+        # A write committed during the computation may be partially included
+        if get_version()[0] != version:
+            return data
+
+        if shared:
+            shared.set(shared_key, data)
+
+    with _lock:
+        _responses[key] = data
+
+        while len(_responses) > settings.RESPONSE_CACHE_SIZE:
+            _responses.popitem(last=False)
+
+    return data
+
+
+def clear():
+    """Drops responses cached in this process"""
+    with _lock:
+        _responses.clear()
+
+
+@cache
+def _get_version_query() -> tuple:
+    queryset = LedgerVersion.objects.filter(pk=VERSION_ID)
+    return queryset.values_list("version", "last_when").query.sql_with_params()
+
+
+def _get_shared_cache():
+    alias = settings.RESPONSE_CACHE_ALIAS
+    return caches[alias] if alias else None
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Max
+from rest_framework import serializers
+
+from transactions.models import Allocation, Checkpoint, StockLevel
+from transactions.services import snapshots
+from transactions.services.custom import AvailabilityRetriever
+
+
+def get_default_watermark(keep_days: int = None) -> datetime:
+    """
+    Watermark that leaves the last days before the latest transaction open to
+    late transactions
+    :param keep_days: Days kept, COMPACTION_KEEP_DAYS by default
+    :return: datetime or None when there is no transaction
+    """
+    if keep_days is None:
+        keep_days = settings.COMPACTION_KEEP_DAYS
+
+    last_when = StockLevel.objects.aggregate(last_when=Max("last_when"))["last_when"]
+    return last_when and last_when - timedelta(days=keep_days)
+
+
+def compact(watermark: datetime) -> dict:
+    """
+    Folds the history up to the watermark into an opening balance: a compacted
+    checkpoint with the remaining lots, qty and cost of every SKU. Replays of
+    later dates start from it and transactions up to it are rejected, so the
+    balances and the issues of the history never change again. Allocations of
+    its sales, only kept to rewind them, are deleted.
+    A watermark up to the current one only deletes allocations again, such as
+    after a rebuild.
+    :param watermark: Date
+    :return: {watermark, skus, allocations}
+    """
+    skus = 0
+
+    with db_transaction.atomic():
+        current = snapshots.get_watermark()
+
+        if current is None or watermark > current:
+            retriever = AvailabilityRetriever(watermark, use_snapshots=True)
+            last_when, books, supplies, sales = retriever.start_replay(watermark)
+            retriever.replay(supplies, sales, last_when, books)
+
+            # A checkpoint saved at the watermark before is the same balance
+            snapshots.save(watermark, books)
+            Checkpoint.objects.filter(when=watermark).update(compacted=True)
+            skus = len(books)
+
+        else:
+            watermark = current
+
+        allocations, _ = Allocation.objects.filter(sale__when__lte=watermark).delete()
+
+    return {"watermark": watermark, "skus": skus, "allocations": allocations}
+
+
+def get_watermark_errors(item: dict, watermark: datetime) -> dict:
+    """
+    Errors of a validated transaction dated up to the watermark
+    :param item: {sku; qty; price; when}
+    :param watermark: Date of the latest compacted checkpoint or None
+    :return: {when: [message]} or {}
+    """
+    if watermark is None or item["when"] > watermark:
+        return {}
+
+    message = f"Date must be after {watermark.isoformat()}, the history is compacted"
+    return {"when": [message]}
+
+
+def check_watermark(items: list):
+    """
+    Rejects transactions dated up to the watermark
+    :param items: list of {sku; qty; price; when}
+    :raises ValidationError: with the errors of every item, {} for valid items
+    """
+    if not items:
+        return
+
+    watermark = snapshots.get_watermark()
+    errors = [get_watermark_errors(item, watermark) for item in items]
+
+    if any(errors):
+        raise serializers.ValidationError(errors)
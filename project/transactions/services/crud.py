@@ -1,10 +1,64 @@
 import logging
-from datetime import datetime
-
-import pytest
-
-from transactions.models import Transaction
-from transactions.services.custom import get_available_items
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connection, transaction as db_transaction
+
+from transactions.models import (
+    Allocation,
+    ArchivedMonth,
+    Batch,
+    Checkpoint,
+    Issue,
+    Lot,
+    Margin,
+    SkuStats,
+    Snapshot,
+    StockLevel,
+    Transaction,
+    TypeChoices,
+)
+from transactions.services import archive, cache, ledger
+from transactions.services.compaction import check_watermark
+
+# Everything a flush empties, all derived from transactions except batches and
+# the list of archived months
+FLUSHED_MODELS = (
+    Allocation,
+    Margin,
+    Issue,
+    Lot,
+    Snapshot,
+    Checkpoint,
+    StockLevel,
+    SkuStats,
+    Batch,
+    ArchivedMonth,
+    Transaction,
+)
+
+
+def bulk_create(transaction_type: str, items: list) -> list:
+    """
+    Creates transactions with multi-row inserts
+    :param transaction_type: supply | sale
+    :param items: list of {sku; qty; price; when}
+    :return: created transactions in the order of items
+    """
+    return Transaction.objects.bulk_create(
+        (
+            Transaction(
+                transaction_type=transaction_type,
+                sku=item["sku"],
+                qty=item["qty"],
+                price=item["price"],
+                when=item["when"],
+            )
+            for item in items
+        ),
+        batch_size=settings.BULK_CREATE_BATCH_SIZE,
+    )
 
 
 def add_supplies(supplies: list) -> int:
@@ -13,15 +67,13 @@ def add_supplies(supplies: list) -> int:
     :param supplies: list of {sku; qty; price; when}
     :return: number of insertions
     """
+    check_watermark(supplies)
+
+    with db_transaction.atomic():
+        ledger.record(bulk_create(TypeChoices.SUPPLY, supplies))
 
-    for supply in supplies:
-        Transaction.objects.create(
-            transaction_type="supply",
-            sku=supply["sku"],
-            qty=supply["qty"],
-            price=supply["price"],
-            when=supply["when"],
-        )
+        if supplies:
+            cache.bump(max(supply["when"] for supply in supplies))
 
     return len(supplies)
 
@@ -32,22 +84,44 @@ def add_sales(sales: list) -> [int, int]:
     :param sales: list of {sku; qty; price; when}
     :return: [number of successful insertions, number of failed insertions]
     """
+    check_watermark(sales)
 
-    issues = 0
+    # A sale is checked against the sales sent before it. When the sales of a sku
+    # are in time order that is the time-ordered replay of the whole batch,
+    # otherwise the sales of the sku are recorded one by one.
+    by_sku = defaultdict(list)
 
-    for sale in sales:
-        items = get_available_items(sale["when"])
+    for idx, sale in enumerate(sales):
+        by_sku[sale["sku"]].append(idx)
 
-        Transaction.objects.create(
-            transaction_type="sale",
-            sku=sale["sku"],
-            qty=sale["qty"],
-            price=sale["price"],
-            when=sale["when"],
-        )
+    ordered, unordered = [], []
 
-        item = items.get(sale["sku"], {})
-        item_qty = item.get("qty", 0)
+    for indexes in by_sku.values():
+        whens = [sales[idx]["when"] for idx in indexes]
+        is_ordered = all(prev <= curr for prev, curr in zip(whens, whens[1:]))
+        (ordered if is_ordered else unordered).extend(indexes)
+
+    ordered.sort()
+    transactions = {}
+
+    with db_transaction.atomic():
+        created = bulk_create(TypeChoices.SALE, [sales[idx] for idx in ordered])
+        transactions.update(zip(ordered, created))
+        available = ledger.record(created)
+
+        for idx in unordered:
+            transaction = bulk_create(TypeChoices.SALE, [sales[idx]])[0]
+            transactions[idx] = transaction
+            available.update(ledger.record([transaction]))
+
+        if sales:
+            cache.bump(max(sale["when"] for sale in sales))
+
+    issues = 0
+
+    for idx, sale in enumerate(sales):
+        # Available items right before the sale
+        item_qty, item_price = available[transactions[idx].id]
 
         # Check if there is enough quantity
         if sale["qty"] > item_qty:
@@ -57,8 +131,6 @@ def add_sales(sales: list) -> [int, int]:
 
         total_price = sale.get("price", 0) * sale.get("qty", 0)
 
-        item_price = item.get("cost", 0)
-
         # Check if there is enough price
         if total_price > item_price:
             logging.error(f"Insufficient price for {sale['sku']}")
@@ -66,3 +138,26 @@ def add_sales(sales: list) -> [int, int]:
             continue
 
     return len(sales) - issues, issues
+
+
+def flush() -> int:
+    """
+    Deletes every transaction with the batches and the ledger state in one
+    database transaction, then the files of the archived transactions. Tables
+    are emptied with DELETE FROM on SQLite and TRUNCATE on PostgreSQL instead of
+    the deletion collector, which loads and deletes rows by chunks of primary keys.
+    :return: number of deleted transactions, archived ones included
+    """
+    tables = [model._meta.db_table for model in FLUSHED_MODELS]
+
+    with db_transaction.atomic():
+        deleted = Transaction.objects.count()
+        months = list(ArchivedMonth.objects.values_list("file_name", "rows"))
+        deleted += sum(rows for _, rows in months)
+        connection.ops.execute_sql_flush(connection.ops.sql_flush(no_style(), tables))
+        cache.bump()
+
+    archive.remove([archive.get_path(file_name) for file_name, _ in months])
+    cache.clear()
+
+    return deleted
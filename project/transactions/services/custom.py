@@ -1,24 +1,44 @@
-from collections import defaultdict
-from copy import deepcopy
+from bisect import bisect_right
 from datetime import datetime
+from decimal import Decimal
 from functools import cached_property
-from typing import List
-
-import pytest
-from django.db import models
-from django.db.models import QuerySet
-
-from transactions.models import Transaction
-
-
-def get_querysets(date_from: datetime, date_to: datetime) -> [QuerySet, QuerySet]:
+from heapq import merge
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import Q, QuerySet, Sum
+
+from transactions import metrics
+from transactions.models import (
+    IssueChoices,
+    Issue,
+    Margin,
+    Transaction,
+    TypeChoices,
+)
+from transactions.services import archive, ledger, parallel, snapshots
+from transactions.services.fifo import OpenLot, SkuBook, from_cents
+from transactions.services.filters import expand_prefix, filter_skus
+from transactions.services.rows import iter_rows, with_cents
+
+
+def get_querysets(
+    date_from: datetime,
+    date_to: datetime,
+    skus: list = None,
+    sku_prefix: str = None,
+) -> [QuerySet, QuerySet]:
     """
     Returns supply and sale querysets
     :param date_from: Date from
     :param date_to: Date to
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
     :return: [supply_queryset, sale_queryset]
     """
-    queryset = Transaction.objects.all().order_by("when")
+    queryset = Transaction.objects.all()
+    skus, sku_prefix = expand_prefix(queryset, skus, sku_prefix)
+    queryset = filter_skus(queryset, skus, sku_prefix).order_by("when", "id")
 
     if date_to:
         queryset = queryset.filter(when__lte=date_to)
@@ -32,26 +52,61 @@ def get_querysets(date_from: datetime, date_to: datetime) -> [QuerySet, QuerySet
     return supplies, sales
 
 
-def group_by_sku(queryset: models.QuerySet) -> dict:
+def stream_rows(queryset: QuerySet, is_sale: int):
     """
-    Group queryset by sku
-    :param queryset: Queryset
-    :return: {sku: [items]}
+    Streams transactions as plain tuples, without model instances
+    :param queryset: Supply or sale queryset ordered by (when, id)
+    :param is_sale: 0 for supplies, 1 for sales
+    :return: generator of (when, is_sale, id, sku, qty, price in cents)
     """
-    result = defaultdict(list)
+    rows = with_cents(queryset).values_list("when", "id", "sku", "qty", "cents")
+
+    for when, pk, sku, qty, cents in iter_rows(rows):
+        yield when, is_sale, pk, sku, qty, int(cents)
 
-    for item in queryset:
-        result[item.sku].append(item)
 
-    return result
+def get_items(books: dict) -> dict:
+    """
+    Available items of replayed books
+    :param books: {sku: SkuBook} in cents
+    :return: {sku: {qty, cost}}
+    """
+    return {
+        sku: {"qty": book.qty, "cost": from_cents(book.cost)}
+        for sku, book in books.items()
+    }
 
 
 class AvailabilityRetriever:
-    def __init__(self, date_to: datetime = None):
+    def __init__(
+        self,
+        date_to: datetime = None,
+        use_snapshots: bool = False,
+        workers: int = 1,
+        skus: list = None,
+        sku_prefix: str = None,
+    ):
+        """
+        :param date_to: Date to
+        :param use_snapshots: Start from the nearest snapshot and save new ones on the way,
+            issues are then only reported for the replayed tail
+        :param workers: Replay SKU partitions in that many processes when the whole
+            history is replayed
+        :param skus: Only replay these SKUs
+        :param sku_prefix: Only replay SKUs that start with the prefix
+        """
         self.date_to = date_to
-        self.supplies, self.sales = get_querysets(None, date_to)
-        self.supplies_dict = group_by_sku(self.supplies)
-        self.total_supplies = {}
+        self.use_snapshots = use_snapshots
+        self.workers = workers
+        self.skus = skus
+        self.sku_prefix = sku_prefix
+        # Snapshots of some SKUs only would be incomplete checkpoints
+        self.saves_snapshots = use_snapshots and not (skus or sku_prefix)
+        self.snapshot_interval = settings.SNAPSHOT_INTERVAL
+
+        with metrics.timer("querysets"):
+            self.supplies, self.sales = get_querysets(None, date_to, skus, sku_prefix)
+
         self.__available_items = None
         self.__issues = []
 
@@ -60,114 +115,377 @@ class AvailabilityRetriever:
         if isinstance(self.__available_items, dict):
             return self.__available_items
 
-        self.obtain_total_supplies()
         self.obtain_available_items()
         return self.__available_items
 
     def get_issues(self, date_from: datetime = None):
-        if isinstance(self.__available_items, dict):
-            issues = self.__issues
-
-        else:
-            self.obtain_total_supplies()
+        if not isinstance(self.__available_items, dict):
             self.obtain_available_items()
-            issues = self.__issues
+
+        issues = [
+            [
+                Transaction(
+                    id=pk,
+                    transaction_type=TypeChoices.SALE,
+                    sku=sku,
+                    qty=qty,
+                    price=from_cents(price),
+                    when=when,
+                ),
+                message,
+            ]
+            for (when, pk, sku, qty, price), message in self.__issues
+        ]
 
         if date_from:
             issues = [issue for issue in issues if issue[0].when >= date_from]
 
         return issues
 
-    def obtain_total_supplies(self):
-        for supply in self.supplies:
-            total_qty = self.total_supplies.get(supply.sku, {}).get("qty", 0)
-            cost = self.total_supplies.get(supply.sku, {}).get("cost", 0)
-
-            self.total_supplies[supply.sku] = {
-                "qty": total_qty + supply.qty,
-                "cost": cost + (supply.price * supply.qty),
-            }
-
     def obtain_available_items(self):
         """
-        Get available items by date
+        Replays supplies and sales in time order, a sale only takes lots supplied before it
         :return: {sku: {qty, cost}}
         """
         if self.__available_items:
             return self.__available_items
 
-        total_supplies = deepcopy(self.total_supplies)
-        supplies_dict = deepcopy(self.supplies_dict)
+        last_when, books, supplies, sales = self.start_replay(self.date_to)
 
-        for sale in self.sales:
-            supplies = supplies_dict.get(sale.sku, [])
+        # Workers only read the transactions table
+        if (
+            not last_when
+            and self.saves_snapshots
+            and self.workers > 1
+            and parallel.can_run_in_parallel()
+            and not archive.get_months(None, self.date_to)
+        ):
+            return self.obtain_in_parallel()
 
-            if not supplies:
-                self.__issues.append([sale, "out_of_stock"])
-                continue
+        # Reading rows is timed on its own as "fetch", within the replay
+        with metrics.timer("replay"):
+            self.replay(supplies, sales, last_when, books)
 
-            if total_supplies[sale.sku]["qty"] < sale.qty:
-                self.__issues.append([sale, "out_of_stock"])
-                continue
+        self.__available_items = get_items(books)
+        return self.__available_items
 
-            affected_supplies = []
-            sale_qty = sale.qty
-            total_supply_cost = 0
+    def obtain_series(self, points: list) -> list:
+        """
+        Replays supplies and sales once and takes the available items at every
+        point on the way
+        :param points: Dates in ascending order, the last one is date_to
+        :return: [{sku: {qty, cost}}], one per point
+        """
+        last_when, books, supplies, sales = self.start_replay(points[0])
+        series = []
 
-            for idx, supply in enumerate(supplies):
-                affected_supplies.append(supply)
-                total_supply_cost += supply.price * min(supply.qty, sale_qty)
+        with metrics.timer("replay"):
+            self.replay(
+                supplies,
+                sales,
+                last_when,
+                books,
+                points,
+                lambda: series.append(get_items(books)),
+            )
 
-                if supply.qty >= sale_qty:
-                    break
+        while len(series) < len(points):
+            series.append(get_items(books))
 
-                sale_qty -= supply.qty
+        return series
 
-            total_sale_cost = sale.qty * sale.price
+    def start_replay(self, date_from: datetime) -> [datetime, dict, QuerySet, QuerySet]:
+        """
+        Starts a replay from the nearest snapshot before the date, when snapshots are used
+        :param date_from: Earliest date the replay is needed for
+        :return: [snapshot date or None, {sku: SkuBook}, supplies and sales after the snapshot]
+        """
+        books = {}
+        supplies, sales = self.supplies, self.sales
+        last_when = None
+
+        if self.use_snapshots:
+            with metrics.timer("snapshots"):
+                last_when, books = snapshots.load(date_from, self.skus, self.sku_prefix)
+
+            if last_when:
+                supplies = supplies.filter(when__gt=last_when)
+                sales = sales.filter(when__gt=last_when)
+
+        return last_when, books, supplies, sales
+
+    def replay(
+        self,
+        supplies: QuerySet,
+        sales: QuerySet,
+        last_when,
+        books: dict,
+        marks: list = (),
+        take=None,
+    ):
+        """
+        Applies supplies and sales to the books in time order, with the archived
+        ones of the window
+        :param supplies: Supply queryset
+        :param sales: Sale queryset
+        :param last_when: Date the books are at
+        :param books: {sku: SkuBook}, updated
+        :param marks: Dates in ascending order
+        :param take: Called with the books at each mark, once every transaction up
+            to the mark is applied
+        """
+        replayed = 0
 
-            if total_supply_cost > total_sale_cost:
-                self.__issues.append([sale, "negative_margin"])
-                continue
+        # Rows are (when, is_sale, id, sku, qty, price in cents), so tuple order is replay order
+        rows = merge(stream_rows(supplies, 0), stream_rows(sales, 1))
+
+        months = archive.get_months(last_when, self.date_to)
+
+        if months:
+            archived = archive.iter_archived(
+                months, last_when, self.date_to, self.skus, self.sku_prefix
+            )
+            rows = merge(rows, archived)
+
+        marks = iter(marks)
+        mark = next(marks, None)
+
+        for when, is_sale, pk, sku, qty, price in rows:
+            while mark is not None and when > mark:
+                take()
+                mark = next(marks, None)
+
+            if (
+                self.saves_snapshots
+                and replayed >= self.snapshot_interval
+                and when != last_when
+            ):
+                snapshots.save(last_when, books)
+                replayed = 0
+
+            replayed += 1
+            last_when = when
+
+            if not is_sale:
+                book = books.get(sku)
 
-            last_affected_supply = affected_supplies[-1]
-            supplies_to_delete_amount = len(affected_supplies[:-1])
+                if book is None:
+                    book = books[sku] = SkuBook()
 
-            if last_affected_supply.qty == sale.qty:
-                supplies_to_delete_amount += 1
+                book.supply(OpenLot(pk, when, price, qty))
+                continue
+
+            book = books.get(sku)
+            message = IssueChoices.OUT_OF_STOCK
 
-            else:
-                last_affected_supply.qty -= sale.qty
+            if book is not None:
+                message, _, _ = book.sell(qty, price)
 
-            if supplies_to_delete_amount:
-                supplies_dict[sale.sku] = supplies_dict[sale.sku][
-                    supplies_to_delete_amount:
-                ]
+            if message:
+                self.__issues.append([(when, pk, sku, qty, price), message])
 
-            total_supplies[sale.sku]["qty"] -= sale.qty
-            total_supplies[sale.sku]["cost"] -= total_supply_cost
+    def obtain_in_parallel(self):
+        """
+        Replays SKU partitions in worker processes
+        :return: {sku: {qty, cost}}
+        """
+        with metrics.timer("parallel replay"):
+            items, self.__issues = parallel.replay(self.date_to, self.workers)
 
-        self.__available_items = total_supplies
+        self.__available_items = {
+            sku: {"qty": qty, "cost": from_cents(cost)} for sku, qty, cost in items
+        }
         return self.__available_items
 
 
-def get_available_items(date_to: datetime = None) -> dict:
+def get_available_items(
+    date_to: datetime = None, skus: list = None, sku_prefix: str = None
+) -> dict:
     """
     Get available items by date
+    :param date_to: Date to
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
     :return: {sku: {qty, cost}}
     """
-    retriever = AvailabilityRetriever(date_to)
+    if ledger.is_current(date_to):
+        with metrics.timer("stock levels"):
+            return ledger.get_stock_levels(skus, sku_prefix)
+
+    retriever = AvailabilityRetriever(
+        date_to,
+        use_snapshots=True,
+        workers=settings.REPLAY_WORKERS,
+        skus=skus,
+        sku_prefix=sku_prefix,
+    )
     return retriever.available_items
 
 
-def get_issues(from_date: datetime, to_date: datetime):
+def get_available_series(
+    points: list, skus: list = None, sku_prefix: str = None
+) -> list:
+    """
+    Get available items at several dates with a single replay
+    :param points: Dates in ascending order
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: [{sku: {qty, cost}}], one per point
+    """
+    retriever = AvailabilityRetriever(
+        points[-1], use_snapshots=True, skus=skus, sku_prefix=sku_prefix
+    )
+    return retriever.obtain_series(points)
+
+
+def get_available_page(
+    date_to: datetime = None,
+    sku_after: str = None,
+    limit: int = None,
+    skus: list = None,
+    sku_prefix: str = None,
+) -> list:
+    """
+    Get available items by date ordered by SKU. The ledger reads only the page,
+    a historical date replays all SKUs and then takes the page.
+    :param date_to: Date to
+    :param sku_after: Only SKUs after this one
+    :param limit: Maximum number of items
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: [(sku, {qty, cost})]
+    """
+    if ledger.is_current(date_to):
+        return ledger.get_stock_level_page(sku_after, limit, skus, sku_prefix)
+
+    items = sorted(get_available_items(date_to, skus, sku_prefix).items())
+
+    if sku_after is not None:
+        items = items[bisect_right(items, sku_after, key=itemgetter(0)) :]
+
+    return items[:limit]
+
+
+def get_issues(
+    from_date: datetime,
+    to_date: datetime,
+    skus: list = None,
+    sku_prefix: str = None,
+):
     """
     Get issues by date
     :param from_date: Date from
     :param to_date: Date to
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
     :return: [[Transaction, "out_of_stock"], [Transaction, "negative_margin"] ... [...]]
     """
-    retriever = AvailabilityRetriever(to_date)
-    return retriever.get_issues(from_date)
+    queryset = get_issue_queryset(from_date, to_date, skus, sku_prefix)
+    queryset = queryset.select_related("sale")
+
+    return [[issue.sale, issue.message] for issue in queryset]
+
+
+def iter_issues(
+    from_date: datetime,
+    to_date: datetime,
+    after: tuple = None,
+    limit: int = None,
+    skus: list = None,
+    sku_prefix: str = None,
+):
+    """
+    Streams issues by date as plain rows, without model instances
+    :param from_date: Date from
+    :param to_date: Date to
+    :param after: Only issues after this (when, sale id)
+    :param limit: Maximum number of issues
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: generator of (when, sale id, sku, qty, price in cents, message)
+    """
+    queryset = get_issue_queryset(from_date, to_date, skus, sku_prefix)
+
+    if after is not None:
+        when, sale_id = after
+        queryset = queryset.filter(Q(when__gt=when) | Q(when=when, sale_id__gt=sale_id))
+
+    # Annotations come last in the raw rows
+    rows = with_cents(queryset, "sale__price").values_list(
+        "when", "sale_id", "sku", "sale__qty", "message", "cents"
+    )
+
+    for when, sale_id, sku, qty, message, cents in iter_rows(rows[:limit]):
+        yield when, sale_id, sku, qty, int(cents), message
+
+
+def get_issue_queryset(
+    from_date: datetime,
+    to_date: datetime,
+    skus: list = None,
+    sku_prefix: str = None,
+) -> QuerySet:
+    """
+    Get issues by date in time order
+    :param from_date: Date from
+    :param to_date: Date to
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: Issue queryset
+    """
+    queryset = filter_skus(Issue.objects.all(), skus, sku_prefix)
+    queryset = queryset.order_by("when", "sale_id")
+
+    if to_date:
+        queryset = queryset.filter(when__lte=to_date)
+
+    if from_date:
+        queryset = queryset.filter(when__gte=from_date)
 
+    return queryset
+
+
+def get_margins(from_date: datetime, to_date: datetime) -> QuerySet:
+    """
+    Get margins of sales by date
+    :param from_date: Date from
+    :param to_date: Date to
+    :return: Margin queryset
+    """
+    queryset = Margin.objects.all()
+
+    if to_date:
+        queryset = queryset.filter(when__lte=to_date)
+
+    if from_date:
+        queryset = queryset.filter(when__gte=from_date)
+
+    return queryset
+
+
+def get_profit(from_date: datetime, to_date: datetime) -> dict:
+    """
+    Get realized profit of sales by date
+    :param from_date: Date from
+    :param to_date: Date to
+    :return: {revenue, cost, profit}
+    """
+    totals = get_margins(from_date, to_date).aggregate(
+        revenue=Sum("revenue"), cost=Sum("cost"), profit=Sum("profit")
+    )
+
+    return {key: value or Decimal(0) for key, value in totals.items()}
+
+
+async def aget_profit(from_date: datetime, to_date: datetime) -> dict:
+    """
+    Async version of get_profit
+    :param from_date: Date from
+    :param to_date: Date to
+    :return: {revenue, cost, profit}
+    """
+    totals = await get_margins(from_date, to_date).aaggregate(
+        revenue=Sum("revenue"), cost=Sum("cost"), profit=Sum("profit")
+    )
 
-def get_profit(from_date: datetime, to_date: datetime): ...
+    return {key: value or Decimal(0) for key, value in totals.items()}
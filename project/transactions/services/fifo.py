@@ -0,0 +1,164 @@
+from collections import deque
+from decimal import Decimal
+from typing import Iterable
+
+from transactions.models import IssueChoices, TypeChoices
+
+
+def sort_key(transaction) -> tuple:
+    """
+    Replay order of transactions: by time, supplies before sales, then by id
+    :param transaction: Transaction
+    :return: (when, 0 | 1, id)
+    """
+    is_sale = transaction.transaction_type == TypeChoices.SALE
+    return transaction.when, int(is_sale), transaction.id
+
+
+def to_cents(value) -> int:
+    """
+    Converts a money amount to integer cents
+    :param value: Decimal, int or str
+    :return: int
+    """
+    return int(Decimal(value).scaleb(2).to_integral_value())
+
+
+def from_cents(value: int) -> Decimal:
+    """
+    Converts integer cents to a money amount
+    :param value: int
+    :return: Decimal with two decimal places
+    """
+    return Decimal(value).scaleb(-2)
+
+
+class OpenLot:
+    """In-memory supply lot for replays that are not backed by the ledger"""
+
+    __slots__ = ("id", "when", "price", "remaining")
+
+    def __init__(self, id, when, price, remaining):
+        self.id = id
+        self.when = when
+        self.price = price
+        self.remaining = remaining
+
+
+class SkuBook:
+    """
+    FIFO state of a single SKU.
+
+    Prices and costs may be Decimal amounts or integer cents, as long as the
+    lots and the sales use the same unit.
+
+    Available lots are kept in (when, id) order. They are taken from ``source``
+    lazily, so only the lots a sale touches are loaded. Lots dated after the
+    current replay time wait in ``pending`` until ``advance`` reaches them.
+    Lots only need ``price``, ``remaining`` and, when pending, ``when``.
+    """
+
+    def __init__(
+        self,
+        qty: int = 0,
+        cost: Decimal = 0,
+        source: Iterable = (),
+        pending: Iterable = (),
+    ):
+        """
+        :param qty: Quantity of the lots in source
+        :param cost: Cost of the lots in source
+        :param source: Available lots in FIFO order
+        :param pending: Lots that are not available yet, ordered by (when, id)
+        """
+        self.qty = qty
+        self.cost = cost
+        self._head = deque()
+        self._head_qty = 0
+        self._source = iter(source)
+        self._tail = deque()
+        self._pending = iter(pending)
+        self._upcoming = next(self._pending, None)
+
+    def advance(self, when):
+        """
+        Makes lots supplied up to the date available
+        :param when: Replay time
+        """
+        while self._upcoming is not None and self._upcoming.when <= when:
+            self.supply(self._upcoming)
+            self._upcoming = next(self._pending, None)
+
+    def supply(self, lot):
+        """
+        Adds a lot after all available lots
+        :param lot: Lot with price and remaining
+        """
+        self._tail.append(lot)
+        self.qty += lot.remaining
+        self.cost += lot.price * lot.remaining
+
+    def sell(self, qty: int, price: Decimal) -> [str, list, Decimal]:
+        """
+        Sells from the oldest lots
+        :param qty: Sold quantity
+        :param price: Price of a sold item
+        :return: [issue message or None, [(lot, qty)], cost of goods sold]
+        """
+        if self.qty < qty:
+            return IssueChoices.OUT_OF_STOCK, [], 0
+
+        self._fill(qty)
+
+        allocations = []
+        cost = 0
+        needed = qty
+
+        for lot in self._head:
+            taken = min(lot.remaining, needed)
+            allocations.append((lot, taken))
+            cost += lot.price * taken
+            needed -= taken
+
+            if not needed:
+                break
+
+        if cost > qty * price:
+            return IssueChoices.NEGATIVE_MARGIN, [], cost
+
+        for lot, taken in allocations:
+            lot.remaining -= taken
+
+        while self._head and not self._head[0].remaining:
+            self._head.popleft()
+
+        self._head_qty -= qty
+        self.qty -= qty
+        self.cost -= cost
+
+        return None, allocations, cost
+
+    def lots(self) -> list:
+        """
+        Available lots with remaining quantity in FIFO order
+        :return: [lot]
+        """
+        for lot in self._source:
+            self._head.append(lot)
+            self._head_qty += lot.remaining
+
+        return [lot for lot in [*self._head, *self._tail] if lot.remaining]
+
+    def _fill(self, qty: int):
+        """Loads lots into the head until they cover the quantity"""
+        while self._head_qty < qty:
+            lot = next(self._source, None)
+
+            if lot is None:
+                if not self._tail:
+                    break
+
+                lot = self._tail.popleft()
+
+            self._head.append(lot)
+            self._head_qty += lot.remaining
@@ -0,0 +1,91 @@
+import functools
+
+from django.db import connections
+from django.db.models import QuerySet
+
+MAX_CODE_POINT = 0x10FFFF
+
+# Database collations that compare strings code point by code point
+BINARY_COLLATIONS = {"C", "POSIX", "C.UTF-8", "C.utf8", "ucs_basic"}
+
+# Largest SKU list a prefix is expanded to, see expand_prefix
+MAX_EXPANDED_SKUS = 1000
+
+
+@functools.cache
+def compares_by_code_point(alias: str) -> bool:
+    """
+    Checks whether the database compares SKUs code point by code point, like
+    SQLite. Under a linguistic collation, the PostgreSQL default, "A-10" sorts
+    before "A." when punctuation is ignored, so a prefix range would drop SKUs.
+    :param alias: Database alias
+    :return: bool
+    """
+    connection = connections[alias]
+
+    if connection.vendor == "sqlite":
+        return True
+
+    if connection.vendor != "postgresql":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT datcollate FROM pg_database WHERE datname = current_database()"
+        )
+        (collation,) = cursor.fetchone()
+
+    return collation in BINARY_COLLATIONS
+
+
+def filter_skus(queryset: QuerySet, skus: list = None, sku_prefix: str = None):
+    """
+    Narrows a queryset with a ``sku`` field to some SKUs
+    :param queryset: Queryset
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: Queryset
+    """
+    if skus is not None:
+        queryset = queryset.filter(sku__in=skus)
+
+    if sku_prefix:
+        queryset = queryset.filter(sku__startswith=sku_prefix)
+
+        # The range lets the database use a sku index, it only holds every SKU
+        # with the prefix when SKUs compare code point by code point
+        if compares_by_code_point(queryset.db):
+            queryset = queryset.filter(sku__gte=sku_prefix)
+            last = ord(sku_prefix[-1])
+
+            if last < MAX_CODE_POINT:
+                queryset = queryset.filter(sku__lt=sku_prefix[:-1] + chr(last + 1))
+
+    return queryset
+
+
+def expand_prefix(
+    queryset: QuerySet, skus: list = None, sku_prefix: str = None
+) -> [list, str]:
+    """
+    Replaces a SKU prefix with the list of matching SKUs of the queryset.
+    Databases rarely pick the sku index for a prefix range when the rows are
+    also ordered by another index, while a short list of SKUs is always looked
+    up through it. Prefixes that match too many SKUs are kept as they are.
+    :param queryset: Queryset with a ``sku`` field
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: [skus, sku_prefix]
+    """
+    if not sku_prefix:
+        return skus, sku_prefix
+
+    matching = filter_skus(queryset.order_by(), skus, sku_prefix)
+    matching = list(
+        matching.values_list("sku", flat=True).distinct()[: MAX_EXPANDED_SKUS + 1]
+    )
+
+    if len(matching) > MAX_EXPANDED_SKUS:
+        return skus, sku_prefix
+
+    return matching, None
@@ -0,0 +1,100 @@
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction as db_transaction
+
+from transactions.models import TypeChoices
+from transactions.services import cache, ledger, snapshots
+from transactions.services.compaction import get_watermark_errors
+from transactions.services.crud import bulk_create
+from transactions.validation import SERIALIZERS, validate_transaction
+
+FORMATS = ("csv", "ndjson")
+CHUNK_SIZE = 10000
+
+
+def read_items(file, file_format: str):
+    """
+    Reads transactions from a text file one at a time
+    :param file: Text file
+    :param file_format: csv (with a header row) | ndjson
+    :return: generator of (line number, item)
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(file)
+
+        for item in reader:
+            yield reader.line_num, item
+
+        return
+
+    for line_num, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            yield line_num, json.loads(line)
+
+        except json.JSONDecodeError as exc:
+            yield line_num, str(exc)
+
+
+def import_items(
+    items,
+    transaction_type: str = None,
+    chunk_size: int = CHUNK_SIZE,
+    on_error=None,
+) -> dict:
+    """
+    Validates and records transactions by chunks. Every chunk is inserted and
+    applied to the FIFO ledger in its own database transaction, so memory stays
+    bounded and an interrupted import keeps the chunks recorded before.
+    :param items: Iterable of (line number, item)
+    :param transaction_type: Type of items without a ``type`` field
+    :param chunk_size: Number of items per chunk
+    :param on_error: Called with (line number, errors) for every invalid item
+    :return: {supply: number of imported supplies, sale: number of imported sales}
+    """
+    items = iter(items)
+    appender = ledger.Appender()
+    counts = {TypeChoices.SUPPLY: 0, TypeChoices.SALE: 0}
+    watermark = snapshots.get_watermark()
+
+    while chunk := list(islice(items, chunk_size)):
+        valid = {TypeChoices.SUPPLY: [], TypeChoices.SALE: []}
+
+        for line_num, item in chunk:
+            item_type = transaction_type
+
+            if isinstance(item, dict):
+                item_type = item.get("type") or transaction_type
+
+            if item_type not in SERIALIZERS:
+                errors = {"type": [f"Type must be one of {list(SERIALIZERS)}"]}
+
+            else:
+                data, errors = validate_transaction(item, SERIALIZERS[item_type])
+                errors = errors or get_watermark_errors(data, watermark)
+
+            if errors:
+                if on_error:
+                    on_error(line_num, errors)
+
+                continue
+
+            valid[item_type].append(data)
+
+        with db_transaction.atomic():
+            created = []
+
+            for item_type, rows in valid.items():
+                created += bulk_create(item_type, rows)
+                counts[item_type] += len(rows)
+
+            appender.record(created)
+
+            if created:
+                cache.bump(max(item.when for item in created))
+
+    return counts
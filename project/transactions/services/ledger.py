@@ -0,0 +1,486 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import models, transaction as db_transaction
+from django.db.models import F, Max, Q, Sum
+
+from transactions import metrics
+from transactions.models import (
+    Allocation,
+    Checkpoint,
+    Issue,
+    Lot,
+    Margin,
+    SkuStats,
+    StockLevel,
+    Transaction,
+    TypeChoices,
+)
+from transactions.services import snapshots, stats
+from transactions.services.filters import filter_skus
+from transactions.services.fifo import SkuBook, sort_key
+from transactions.services.rows import update_rows
+
+LOTS_CHUNK_SIZE = 100
+LOAD_CHUNK_SIZE = 500
+
+
+def iter_open_lots(sku: str, date_from: datetime = None, date_to: datetime = None):
+    """
+    Iterates lots of the sku that are not sold out, in FIFO order.
+    Lots are fetched by chunks, so only the lots that are consumed get loaded.
+    :param sku: SKU
+    :param date_from: Only lots supplied after the date
+    :param date_to: Only lots supplied up to the date
+    :return: Lot generator
+    """
+    queryset = Lot.objects.filter(sku=sku, remaining__gt=0).order_by("when", "id")
+
+    if date_from:
+        queryset = queryset.filter(when__gt=date_from)
+
+    if date_to:
+        queryset = queryset.filter(when__lte=date_to)
+
+    last = None
+
+    while True:
+        chunk = queryset
+
+        if last:
+            chunk = chunk.filter(
+                Q(when__gt=last.when) | Q(when=last.when, id__gt=last.id)
+            )
+
+        chunk = list(chunk[:LOTS_CHUNK_SIZE])
+        yield from chunk
+
+        if len(chunk) < LOTS_CHUNK_SIZE:
+            return
+
+        last = chunk[-1]
+
+
+def record(transactions: list) -> dict:
+    """
+    Applies saved transactions to the FIFO ledger.
+    Only the SKUs of the transactions are touched. A transaction dated before
+    already recorded sales rewinds its SKU to that date and replays the sales after it.
+    :param transactions: Saved transactions
+    :return: {sale id: (qty, cost)} available right before each sale
+    """
+    grouped = defaultdict(list)
+
+    for item in transactions:
+        grouped[item.sku].append(item)
+
+    available = {}
+
+    with metrics.timer("ledger"), db_transaction.atomic():
+        if transactions:
+            snapshots.invalidate(min(item.when for item in transactions))
+
+        for sku, items in grouped.items():
+            available.update(_record_sku(sku, items))
+
+    return available
+
+
+def _record_sku(sku: str, transactions: list) -> dict:
+    transactions = sorted(transactions, key=sort_key)
+    first = transactions[0]
+
+    stock, _ = StockLevel.objects.get_or_create(sku=sku)
+
+    ids = {item.id for item in transactions}
+    replayed = _rewind(stock, first, ids)
+    book = _open_book(stock, first.when)
+
+    changes = Changes()
+    available, buckets = _replay(
+        stock, book, sorted(transactions + replayed, key=sort_key), ids, changes
+    )
+
+    changes.save()
+    stats.refresh(sku, buckets)
+    stats.add([], [], changes.lots)
+    _update_dates(stock, transactions)
+    stock.save()
+
+    return available
+
+
+def _replay(
+    stock: StockLevel, book: SkuBook, transactions: list, ids: set, changes
+) -> [dict, set]:
+    """
+    Applies transactions of the sku in replay order to its book
+    :param stock: Stock level of the sku, its totals are updated
+    :param book: FIFO state of the sku right before the first transaction
+    :param transactions: Transactions ordered by sort_key
+    :param ids: Ids of new transactions
+    :param changes: Changes that collect the rows to save
+    :return: [{sale id: (qty, cost)} for new sales, hour buckets of the sales]
+    """
+    available = {}
+    buckets = set()
+
+    for item in transactions:
+        book.advance(item.when)
+
+        if item.transaction_type == TypeChoices.SUPPLY:
+            lot = Lot(
+                supply=item,
+                sku=stock.sku,
+                when=item.when,
+                price=item.price,
+                qty=item.qty,
+                remaining=item.qty,
+            )
+            changes.lots.append(lot)
+            book.supply(lot)
+
+            stock.qty += lot.qty
+            stock.cost += lot.qty * lot.price
+            stock.first_supply_when = min(
+                filter(None, [stock.first_supply_when, item.when])
+            )
+            continue
+
+        if item.id in ids:
+            available[item.id] = (book.qty, book.cost)
+
+        buckets.add(stats.get_bucket(item.when))
+        message, consumed, cost = book.sell(item.qty, item.price)
+
+        if message:
+            changes.issues.append(
+                Issue(sale=item, sku=stock.sku, when=item.when, message=message)
+            )
+            continue
+
+        revenue = item.qty * item.price
+        changes.margins.append(
+            Margin(
+                sale=item,
+                sku=stock.sku,
+                when=item.when,
+                qty=item.qty,
+                revenue=revenue,
+                cost=cost,
+                profit=revenue - cost,
+            )
+        )
+
+        for lot, qty in consumed:
+            changes.allocations.append(Allocation(sale=item, lot=lot, qty=qty))
+
+            if lot.pk:
+                changes.touched_lots[lot.pk] = lot
+
+        stock.qty -= item.qty
+        stock.cost -= cost
+
+    return available, buckets
+
+
+def _update_dates(stock: StockLevel, transactions: list):
+    """
+    Moves the dates of the stock level to the new transactions
+    :param stock: Stock level of the sku
+    :param transactions: New transactions ordered by sort_key
+    """
+    sales = [item for item in transactions if item.transaction_type == TypeChoices.SALE]
+    stock.last_when = max(filter(None, [stock.last_when, transactions[-1].when]))
+
+    if sales:
+        stock.last_sale_when = max(filter(None, [stock.last_sale_when, sales[-1].when]))
+
+
+class Changes:
+    """Ledger rows created or changed by replays, saved with bulk queries"""
+
+    def __init__(self):
+        self.lots = []
+        self.touched_lots = {}
+        self.allocations = []
+        self.issues = []
+        self.margins = []
+
+    def save(self):
+        batch_size = settings.BULK_CREATE_BATCH_SIZE
+        Lot.objects.bulk_create(self.lots, batch_size=batch_size)
+        update_rows(list(self.touched_lots.values()), ["remaining"])
+        Allocation.objects.bulk_create(self.allocations, batch_size=batch_size)
+        Issue.objects.bulk_create(self.issues, batch_size=batch_size)
+        Margin.objects.bulk_create(self.margins, batch_size=batch_size)
+
+
+class Appender:
+    """
+    Records consecutive chunks of transactions, such as an import, with a few
+    bulk queries per chunk instead of several queries per SKU.
+
+    Books of the SKUs stay in memory between chunks, up to ``max_books`` of them.
+    Transactions dated after everything recorded for their SKU are appended to
+    the book, the others go through ``record`` and the book is reloaded later.
+    """
+
+    max_books = 10000
+
+    def __init__(self):
+        self.stocks = {}
+        self.books = {}
+
+    def record(self, transactions: list):
+        """
+        Applies a chunk of saved transactions to the FIFO ledger
+        :param transactions: Saved transactions
+        """
+        grouped = defaultdict(list)
+
+        for item in transactions:
+            grouped[item.sku].append(item)
+
+        if not grouped:
+            return
+
+        if len(self.books) + len(grouped) > self.max_books:
+            self.stocks.clear()
+            self.books.clear()
+
+        with db_transaction.atomic():
+            snapshots.invalidate(min(item.when for item in transactions))
+            self._load(grouped.keys())
+
+            changes = Changes()
+            new_stocks = []
+            updated_stocks = []
+
+            for sku, items in grouped.items():
+                items.sort(key=sort_key)
+                stock = self.stocks[sku]
+
+                # Late transactions and those replayed before recorded sales
+                # of the SKU go through a rewind
+                if (
+                    stock.last_when is not None and stock.last_when > items[0].when
+                ) or _rewinds(stock, items[0]):
+                    self.stocks.pop(sku)
+                    self.books.pop(sku, None)
+                    _record_sku(sku, items)
+                    continue
+
+                if stock.pk is None:
+                    new_stocks.append(stock)
+
+                else:
+                    updated_stocks.append(stock)
+
+                _replay(stock, self.books[sku], items, set(), changes)
+                _update_dates(stock, items)
+
+            batch_size = settings.BULK_CREATE_BATCH_SIZE
+            changes.save()
+            StockLevel.objects.bulk_create(new_stocks, batch_size=batch_size)
+            update_rows(
+                updated_stocks,
+                ["qty", "cost", "first_supply_when", "last_sale_when", "last_when"],
+            )
+
+            stats.add(changes.margins, changes.issues, changes.lots)
+
+    def _load(self, skus):
+        """
+        Loads stock levels and open lots of the SKUs that are not in memory
+        :param skus: SKUs of the chunk
+        """
+        missing = [sku for sku in skus if sku not in self.stocks]
+
+        for start in range(0, len(missing), LOAD_CHUNK_SIZE):
+            skus = missing[start : start + LOAD_CHUNK_SIZE]
+            lots = defaultdict(list)
+            queryset = Lot.objects.filter(sku__in=skus, remaining__gt=0).order_by(
+                "when", "id"
+            )
+
+            for lot in queryset:
+                lots[lot.sku].append(lot)
+
+            for stock in StockLevel.objects.filter(sku__in=skus):
+                self.stocks[stock.sku] = stock
+
+            for sku in skus:
+                stock = self.stocks.setdefault(sku, StockLevel(sku=sku))
+                self.books[sku] = SkuBook(stock.qty, stock.cost, lots[sku])
+
+
+def _rewinds(stock: StockLevel, first: Transaction) -> bool:
+    """
+    Whether already recorded sales of the sku are replayed after the transaction:
+    sales dated from a supply or after a sale
+    :param stock: Stock level of the sku
+    :param first: Earliest new transaction
+    :return: bool
+    """
+    if stock.last_sale_when is None:
+        return False
+
+    if first.transaction_type == TypeChoices.SUPPLY:
+        return stock.last_sale_when >= first.when
+
+    return stock.last_sale_when > first.when
+
+
+def _rewind(stock: StockLevel, first: Transaction, exclude: set) -> list:
+    """
+    Undoes sales of the sku that are replayed after the transaction
+    :param stock: Stock level of the sku
+    :param first: Earliest new transaction
+    :param exclude: Ids of new transactions
+    :return: Undone sales
+    """
+    if not _rewinds(stock, first):
+        return []
+
+    sales = Transaction.objects.filter(
+        sku=stock.sku, transaction_type=TypeChoices.SALE
+    ).exclude(id__in=exclude)
+
+    if first.transaction_type == TypeChoices.SUPPLY:
+        sales = sales.filter(when__gte=first.when)
+
+    else:
+        sales = sales.filter(when__gt=first.when)
+
+    sales = list(sales.order_by("when", "id"))
+
+    if not sales:
+        return []
+
+    allocations = Allocation.objects.filter(sale__in=sales)
+    consumed = dict(
+        allocations.values_list("lot_id").annotate(qty=Sum("qty")).order_by()
+    )
+    lots = Lot.objects.in_bulk(consumed.keys())
+
+    for lot_id, qty in consumed.items():
+        lot = lots[lot_id]
+        lot.remaining += qty
+        stock.qty += qty
+        stock.cost += qty * lot.price
+
+    Lot.objects.bulk_update(
+        lots.values(), ["remaining"], batch_size=settings.BULK_CREATE_BATCH_SIZE
+    )
+    allocations.delete()
+    Issue.objects.filter(sale__in=sales).delete()
+    Margin.objects.filter(sale__in=sales).delete()
+
+    return sales
+
+
+def _open_book(stock: StockLevel, when: datetime) -> SkuBook:
+    """
+    Creates the FIFO state of the sku at the date
+    :param stock: Stock level of the sku after the rewind
+    :param when: Date of the earliest new transaction
+    :return: SkuBook
+    """
+    if stock.last_when is None or stock.last_when <= when:
+        return SkuBook(stock.qty, stock.cost, iter_open_lots(stock.sku))
+
+    totals = Lot.objects.filter(
+        sku=stock.sku, remaining__gt=0, when__lte=when
+    ).aggregate(
+        qty=Sum("remaining"),
+        cost=Sum(
+            F("remaining") * F("price"),
+            output_field=models.DecimalField(max_digits=20, decimal_places=2),
+        ),
+    )
+
+    return SkuBook(
+        totals["qty"] or 0,
+        totals["cost"] or Decimal(0),
+        iter_open_lots(stock.sku, date_to=when),
+        iter_open_lots(stock.sku, date_from=when),
+    )
+
+
+def is_current(date_to: datetime = None) -> bool:
+    """
+    Checks whether the date is after every recorded transaction
+    :param date_to: Date
+    :return: bool
+    """
+    if date_to is None:
+        return True
+
+    last_when = StockLevel.objects.aggregate(last_when=Max("last_when"))["last_when"]
+    return last_when is None or last_when <= date_to
+
+
+def get_stock_levels(skus: list = None, sku_prefix: str = None) -> dict:
+    """
+    Get available items after every recorded transaction
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: {sku: {qty, cost}}
+    """
+    stock_levels = StockLevel.objects.filter(first_supply_when__isnull=False).order_by(
+        "first_supply_when", "id"
+    )
+    stock_levels = filter_skus(stock_levels, skus, sku_prefix)
+
+    return {stock.sku: {"qty": stock.qty, "cost": stock.cost} for stock in stock_levels}
+
+
+def get_stock_level_page(
+    sku_after: str = None,
+    limit: int = None,
+    skus: list = None,
+    sku_prefix: str = None,
+) -> list:
+    """
+    Get available items after every recorded transaction, ordered by SKU
+    :param sku_after: Only SKUs after this one
+    :param limit: Maximum number of items
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: [(sku, {qty, cost})]
+    """
+    stock_levels = StockLevel.objects.filter(first_supply_when__isnull=False).order_by(
+        "sku"
+    )
+    stock_levels = filter_skus(stock_levels, skus, sku_prefix)
+
+    if sku_after is not None:
+        stock_levels = stock_levels.filter(sku__gt=sku_after)
+
+    return [
+        (sku, {"qty": qty, "cost": cost})
+        for sku, qty, cost in stock_levels.values_list("sku", "qty", "cost")[:limit]
+    ]
+
+
+def reset():
+    """
+    Removes the ledger state that is not deleted with transactions, except the
+    compacted checkpoints that stay valid for the same transactions
+    """
+    StockLevel.objects.all().delete()
+    Checkpoint.objects.filter(compacted=False).delete()
+    SkuStats.objects.all().delete()
+
+
+def rebuild():
+    """Recreates the ledger from all transactions, archived ones excepted"""
+    with db_transaction.atomic():
+        Lot.objects.all().delete()
+        Issue.objects.all().delete()
+        Margin.objects.all().delete()
+        reset()
+        record(list(Transaction.objects.order_by("when", "id")))
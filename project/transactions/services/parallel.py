@@ -0,0 +1,160 @@
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+
+import django
+from django.db import connection
+
+from transactions.models import IssueChoices, Transaction, TypeChoices
+from transactions.services.fifo import OpenLot, SkuBook
+from transactions.services.rows import iter_rows, with_cents
+
+_executor = None
+_executor_workers = 0
+
+
+def can_run_in_parallel() -> bool:
+    """
+    Checks whether worker processes can open the same database
+    :return: bool
+    """
+    return not (connection.vendor == "sqlite" and connection.is_in_memory_db())
+
+
+def get_partitions(date_to: datetime, workers: int) -> list:
+    """
+    Splits SKUs into ranges with about the same number of SKUs
+    :param date_to: Date to
+    :param workers: Number of partitions
+    :return: [(sku from, sku to or None)]
+    """
+    queryset = Transaction.objects.all()
+
+    if date_to:
+        queryset = queryset.filter(when__lte=date_to)
+
+    skus = list(queryset.order_by("sku").values_list("sku", flat=True).distinct())
+
+    if not skus:
+        return []
+
+    size = -(-len(skus) // workers)
+    bounds = skus[::size]
+
+    return list(zip(bounds, [*bounds[1:], None]))
+
+
+def replay_partition(date_to: datetime, sku_from: str, sku_to: str = None) -> list:
+    """
+    Replays the SKUs of a range one after another
+    :param date_to: Date to
+    :param sku_from: First SKU of the range
+    :param sku_to: SKU after the range, None for the last range
+    :return: [[(first supply (when, id), sku, qty, cost in cents)],
+        [((when, id, sku, qty, price in cents), message)] ordered by (when, id)]
+    """
+    queryset = Transaction.objects.filter(sku__gte=sku_from)
+
+    if sku_to is not None:
+        queryset = queryset.filter(sku__lt=sku_to)
+
+    if date_to:
+        queryset = queryset.filter(when__lte=date_to)
+
+    rows = iter_rows(
+        with_cents(queryset)
+        .order_by("sku", "when", "id")
+        .values_list("sku", "when", "transaction_type", "id", "qty", "cents")
+    )
+
+    items = []
+    issues = []
+
+    for sku, history in groupby(rows, key=itemgetter(0)):
+        book = None
+        first = None
+
+        # Rows come in (when, id) order, supplies go before sales of the same time
+        history = sorted(
+            (when, transaction_type == TypeChoices.SALE, pk, qty, int(cents))
+            for _, when, transaction_type, pk, qty, cents in history
+        )
+
+        for when, is_sale, pk, qty, price in history:
+            if not is_sale:
+                if book is None:
+                    book = SkuBook()
+                    first = (when, pk)
+
+                book.supply(OpenLot(pk, when, price, qty))
+                continue
+
+            message = IssueChoices.OUT_OF_STOCK
+
+            if book is not None:
+                message, _, _ = book.sell(qty, price)
+
+            if message:
+                issues.append(((when, pk, sku, qty, price), str(message)))
+
+        if book is not None:
+            items.append((first, sku, book.qty, book.cost))
+
+    issues.sort()
+
+    return [items, issues]
+
+
+def replay(date_to: datetime, workers: int, map_partitions=None) -> list:
+    """
+    Replays SKU partitions in worker processes and merges their results
+    :param date_to: Date to
+    :param workers: Number of worker processes
+    :param map_partitions: map-like callable, the process pool by default
+    :return: [[(sku, qty, cost in cents)] in first supply order,
+        [((when, id, sku, qty, price in cents), message)] in time order]
+    """
+    partitions = get_partitions(date_to, workers)
+
+    if map_partitions is None:
+        map_partitions = get_executor(workers).map
+
+    results = list(
+        map_partitions(
+            replay_partition,
+            [date_to] * len(partitions),
+            *zip(*partitions),
+        )
+    )
+
+    items = sorted(item for partition, _ in results for item in partition)
+    issues = heapq.merge(*(partition for _, partition in results))
+
+    return [[item[1:] for item in items], list(issues)]
+
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool shared by replays. Workers are spawned, so they open their own
+    database connections instead of inheriting the ones of this process, and
+    set Django up from the inherited DJANGO_SETTINGS_MODULE.
+    :param workers: Number of processes
+    :return: ProcessPoolExecutor
+    """
+    global _executor, _executor_workers
+
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown()
+
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        )
+        _executor_workers = workers
+
+    return _executor
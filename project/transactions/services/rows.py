@@ -0,0 +1,69 @@
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models
+from django.db.models import F, QuerySet
+from django.db.models.functions import Round
+
+from transactions import metrics
+
+CHUNK_SIZE = 2000
+
+
+def with_cents(queryset: QuerySet, field: str = "price") -> QuerySet:
+    """
+    Annotates transactions with the price in integer cents
+    :param queryset: Transaction queryset
+    :param field: Price field, may span relations
+    :return: Queryset with ``cents``
+    """
+    return queryset.annotate(
+        cents=Round(F(field) * 100, output_field=models.IntegerField())
+    )
+
+
+def iter_rows(queryset: QuerySet):
+    """
+    Streams raw rows of a values_list queryset by chunks, without field converters.
+    Dates are still datetime objects, the database adapters convert them.
+    :param queryset: values_list queryset
+    :return: generator of tuples
+    """
+    sql, params = queryset.query.sql_with_params()
+
+    with connection.chunked_cursor() as cursor:
+        with metrics.timer("fetch"):
+            cursor.execute(sql, params)
+            rows = cursor.fetchmany(CHUNK_SIZE)
+
+        while rows:
+            yield from rows
+
+            with metrics.timer("fetch"):
+                rows = cursor.fetchmany(CHUNK_SIZE)
+
+
+def update_rows(objects: list, fields: list):
+    """
+    Saves fields of model instances with one parametrized UPDATE run through
+    executemany, cheaper than the CASE expressions built by bulk_update
+    :param objects: Saved instances of one model
+    :param fields: Names of the fields to save
+    """
+    if not objects:
+        return
+
+    db = connections[DEFAULT_DB_ALIAS]
+    meta = objects[0]._meta
+    fields = [meta.get_field(name) for name in fields]
+    quote = db.ops.quote_name
+    sql = "UPDATE {} SET {} WHERE {} = %s".format(
+        quote(meta.db_table),
+        ", ".join(f"{quote(field.column)} = %s" for field in fields),
+        quote(meta.pk.column),
+    )
+    params = [
+        [field.get_db_prep_save(getattr(obj, field.attname), db) for field in fields]
+        + [obj.pk]
+        for obj in objects
+    ]
+
+    with db.cursor() as cursor:
+        cursor.executemany(sql, params)
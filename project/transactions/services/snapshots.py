@@ -0,0 +1,93 @@
+from datetime import datetime
+
+from django.db import transaction as db_transaction
+
+from transactions.models import Checkpoint, Snapshot
+from transactions.services.fifo import OpenLot, SkuBook, from_cents, to_cents
+from transactions.services.filters import filter_skus
+
+
+def load(
+    date_to: datetime = None, skus: list = None, sku_prefix: str = None
+) -> [datetime, dict]:
+    """
+    Loads the nearest snapshots at or before the date
+    :param date_to: Date
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: [checkpoint date or None, {sku: SkuBook} in cents]
+    """
+    checkpoints = Checkpoint.objects.order_by("-when")
+
+    if date_to:
+        checkpoints = checkpoints.filter(when__lte=date_to)
+
+    checkpoint = checkpoints.first()
+
+    if checkpoint is None:
+        return None, {}
+
+    books = {}
+
+    for snapshot in filter_skus(checkpoint.snapshots.order_by("id"), skus, sku_prefix):
+        book = books[snapshot.sku] = SkuBook()
+
+        for lot_id, when, price, remaining in snapshot.lots:
+            book.supply(
+                OpenLot(
+                    lot_id, datetime.fromisoformat(when), to_cents(price), remaining
+                )
+            )
+
+    return checkpoint.when, books
+
+
+def save(when: datetime, books: dict):
+    """
+    Saves snapshots of the books as of the date
+    :param when: Date of the last replayed transaction
+    :param books: {sku: SkuBook} in cents
+    """
+    with db_transaction.atomic():
+        checkpoint, created = Checkpoint.objects.get_or_create(when=when)
+
+        if not created:
+            return
+
+        Snapshot.objects.bulk_create(
+            Snapshot(
+                checkpoint=checkpoint,
+                sku=sku,
+                qty=book.qty,
+                cost=from_cents(book.cost),
+                lots=[
+                    [
+                        lot.id,
+                        lot.when.isoformat(),
+                        str(from_cents(lot.price)),
+                        lot.remaining,
+                    ]
+                    for lot in book.lots()
+                ],
+            )
+            for sku, book in books.items()
+        )
+
+
+def invalidate(date_from: datetime):
+    """
+    Removes snapshots that do not include a transaction dated at the date.
+    Compacted checkpoints are kept, transactions up to them are rejected before
+    they are recorded and a rebuild records the same transactions again.
+    :param date_from: Date of the transaction
+    """
+    Checkpoint.objects.filter(when__gte=date_from, compacted=False).delete()
+
+
+def get_watermark() -> datetime:
+    """
+    Date of the latest compacted checkpoint
+    :return: datetime or None when the ledger is not compacted
+    """
+    checkpoints = Checkpoint.objects.filter(compacted=True).order_by("-when")
+    return checkpoints.values_list("when", flat=True).first()
@@ -0,0 +1,414 @@
+import heapq
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncHour
+
+from transactions.models import (
+    GranularityChoices,
+    Issue,
+    Margin,
+    SkuStats,
+    Transaction,
+    TypeChoices,
+)
+from transactions.services import archive
+from transactions.services.filters import filter_skus
+from transactions.services.rows import update_rows
+
+BUCKET = timedelta(hours=1)
+METRICS = ("profit", "revenue", "qty", "issues")
+
+# Sums kept in every bucket
+FIELDS = ("supplied", "qty", "revenue", "cost", "profit", "issues")
+
+# Coarsest first, every hour bucket is also counted in its day and month
+GRANULARITIES = (
+    GranularityChoices.MONTH,
+    GranularityChoices.DAY,
+    GranularityChoices.HOUR,
+)
+
+
+def get_bucket(when: datetime, granularity: str = GranularityChoices.HOUR) -> datetime:
+    """
+    Start of the bucket of the date
+    :param when: Date
+    :param granularity: hour | day | month
+    :return: Date
+    """
+    when = when.replace(minute=0, second=0, microsecond=0)
+
+    if granularity != GranularityChoices.HOUR:
+        when = when.replace(hour=0)
+
+    if granularity == GranularityChoices.MONTH:
+        when = when.replace(day=1)
+
+    return when
+
+
+def get_next_bucket(bucket: datetime, granularity: str) -> datetime:
+    """
+    Start of the bucket after the bucket
+    :param bucket: Bucket start
+    :param granularity: hour | day | month
+    :return: Date
+    """
+    if granularity == GranularityChoices.HOUR:
+        return bucket + BUCKET
+
+    if granularity == GranularityChoices.DAY:
+        return bucket + timedelta(days=1)
+
+    return (bucket + timedelta(days=32)).replace(day=1)
+
+
+def refresh(sku: str, buckets: set):
+    """
+    Recomputes sales of the sku in the hour buckets from margins and issues,
+    the differences are carried to the day and month buckets
+    :param sku: SKU
+    :param buckets: Hour bucket starts
+    """
+    if not buckets:
+        return
+
+    date_from, date_to = min(buckets), max(buckets) + BUCKET
+
+    margins = (
+        Margin.objects.filter(sku=sku, when__gte=date_from, when__lt=date_to)
+        .annotate(bucket=TruncHour("when"))
+        .values("bucket")
+        .annotate(
+            total_revenue=Sum("revenue"),
+            total_cost=Sum("cost"),
+            total_profit=Sum("profit"),
+            total_qty=Sum("qty"),
+        )
+        .order_by()
+    )
+    issues = (
+        Issue.objects.filter(sku=sku, when__gte=date_from, when__lt=date_to)
+        .annotate(bucket=TruncHour("when"))
+        .values_list("bucket")
+        .annotate(Count("id"))
+        .order_by()
+    )
+
+    stats = {bucket: SkuStats(sku=sku, bucket=bucket) for bucket in buckets}
+
+    for row in margins:
+        if row["bucket"] in buckets:
+            item = stats[row["bucket"]]
+            item.revenue = row["total_revenue"]
+            item.cost = row["total_cost"]
+            item.profit = row["total_profit"]
+            item.qty = row["total_qty"]
+
+    for bucket, count in issues:
+        if bucket in buckets:
+            stats[bucket].issues = count
+
+    saved = SkuStats.objects.filter(
+        sku=sku, granularity=GranularityChoices.HOUR, bucket__in=buckets
+    )
+
+    for item in saved:
+        new = stats[item.bucket]
+
+        for field in FIELDS:
+            setattr(new, field, getattr(new, field) - getattr(item, field))
+
+        new.supplied = 0
+
+    _apply({(sku, bucket): item for bucket, item in stats.items()})
+
+
+def add(margins: list, issues: list, lots: list = ()):
+    """
+    Adds new margins, issues and lots to the stats of their buckets. Only for
+    sales that are not counted yet, such as sales appended after the recorded
+    ones, and for new supplies.
+    :param margins: Created margins
+    :param issues: Created issues
+    :param lots: Created lots
+    """
+    stats = {}
+
+    def get_stats(sku: str, when: datetime) -> SkuStats:
+        bucket = get_bucket(when)
+
+        if (sku, bucket) not in stats:
+            stats[sku, bucket] = SkuStats(sku=sku, bucket=bucket)
+
+        return stats[sku, bucket]
+
+    for margin in margins:
+        item = get_stats(margin.sku, margin.when)
+        item.revenue += margin.revenue
+        item.cost += margin.cost
+        item.profit += margin.profit
+        item.qty += margin.qty
+
+    for issue in issues:
+        get_stats(issue.sku, issue.when).issues += 1
+
+    for lot in lots:
+        get_stats(lot.sku, lot.when).supplied += lot.qty
+
+    _apply(stats)
+
+
+def _apply(increments: dict):
+    """
+    Adds increments of hour buckets to the saved hour, day and month buckets
+    :param increments: {(sku, hour bucket start): SkuStats with the increments}
+    """
+    stats = {}
+
+    for (sku, bucket), increment in increments.items():
+        if not any(getattr(increment, field) for field in FIELDS):
+            continue
+
+        for granularity in GRANULARITIES:
+            key = (granularity, get_bucket(bucket, granularity), sku)
+            item = stats.get(key)
+
+            if item is None:
+                item = stats[key] = SkuStats(
+                    sku=sku, granularity=granularity, bucket=key[1]
+                )
+
+            for field in FIELDS:
+                setattr(item, field, getattr(item, field) + getattr(increment, field))
+
+    if not stats:
+        return
+
+    saved = SkuStats.objects.filter(
+        Q(
+            *(
+                Q(
+                    granularity=granularity,
+                    bucket__in={bucket for g, bucket, _ in stats if g == granularity},
+                )
+                for granularity in GRANULARITIES
+            ),
+            _connector=Q.OR,
+        ),
+        sku__in={sku for _, _, sku in stats},
+    )
+
+    for item in saved:
+        new = stats.get((item.granularity, item.bucket, item.sku))
+
+        if new:
+            new.pk = item.pk
+
+            for field in FIELDS:
+                setattr(new, field, getattr(new, field) + getattr(item, field))
+
+    created = [item for item in stats.values() if item.pk is None]
+    updated = [item for item in stats.values() if item.pk is not None]
+    SkuStats.objects.bulk_create(created, batch_size=settings.BULK_CREATE_BATCH_SIZE)
+    update_rows(updated, FIELDS)
+
+
+def get_segments(
+    date_from: datetime, date_to: datetime, granularities: tuple = GRANULARITIES
+) -> list:
+    """
+    Splits a window into the coarsest buckets it fully covers, finer buckets at
+    its edges and raw rows for what is left of less than an hour
+    :param date_from: Start of the window, None for all dates before date_to
+    :param date_to: End of the window, excluded, None for all dates after date_from
+    :param granularities: Granularities to use, coarsest first
+    :return: [(granularity or None for raw rows, start or None, end or None)]
+    """
+    if date_from and date_to and date_from >= date_to:
+        return []
+
+    if not granularities:
+        return [(None, date_from, date_to)]
+
+    granularity, finer = granularities[0], granularities[1:]
+    first = date_from and get_bucket(date_from, granularity)
+    end = date_to and get_bucket(date_to, granularity)
+
+    if first and first < date_from:
+        first = get_next_bucket(first, granularity)
+
+    if first and end and first >= end:
+        return get_segments(date_from, date_to, finer)
+
+    segments = [(granularity, first, end)]
+
+    if date_from:
+        segments = get_segments(date_from, first, finer) + segments
+
+    if date_to:
+        segments += get_segments(end, date_to, finer)
+
+    return segments
+
+
+def iter_totals(
+    date_from: datetime,
+    date_to: datetime,
+    granularity: str = GranularityChoices.MONTH,
+    skus: list = None,
+    sku_prefix: str = None,
+):
+    """
+    Sums per SKU of the segments of a window, read from the coarsest buckets
+    that cover it
+    :param date_from: Date from, None for the beginning
+    :param date_to: Date to, included, None for the end
+    :param granularity: Coarsest granularity to read
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: generator of (bucket or raw segment start, sku, {FIELDS})
+    """
+    if date_to:
+        # Dates have a microsecond resolution, so this includes date_to
+        date_to += timedelta(microseconds=1)
+
+    granularities = GRANULARITIES[GRANULARITIES.index(granularity) :]
+
+    for source, start, end in get_segments(
+        date_from or None, date_to or None, granularities
+    ):
+        if source is None:
+            yield from _iter_raw_totals(start, end, skus, sku_prefix)
+            continue
+
+        queryset = SkuStats.objects.filter(granularity=source)
+
+        if start is not None:
+            queryset = queryset.filter(bucket__gte=start)
+
+        if end is not None:
+            queryset = queryset.filter(bucket__lt=end)
+
+        queryset = filter_skus(queryset, skus, sku_prefix).order_by()
+
+        for bucket, sku, *values in queryset.values_list("bucket", "sku", *FIELDS):
+            yield bucket, sku, dict(zip(FIELDS, values))
+
+
+def _iter_raw_totals(start: datetime, end: datetime, skus: list, sku_prefix: str):
+    """
+    Sums per SKU of supplies, margins and issues of a window within an hour,
+    archived supplies included
+    :param start: Date from
+    :param end: Date to, excluded
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: generator of (start, sku, {FIELDS})
+    """
+    window = {"when__gte": start, "when__lt": end}
+    totals = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+
+    supplies = Transaction.objects.filter(transaction_type=TypeChoices.SUPPLY, **window)
+    margins = Margin.objects.filter(**window)
+    issues = Issue.objects.filter(**window)
+
+    supplies = filter_skus(supplies, skus, sku_prefix).values_list("sku")
+    for sku, qty in supplies.annotate(Sum("qty")).order_by():
+        totals[sku]["supplied"] += qty
+
+    # Dates have a microsecond resolution, so this is the window
+    after, until = start - timedelta(microseconds=1), end - timedelta(microseconds=1)
+    months = archive.get_months(after, until)
+
+    for _, is_sale, _, sku, qty, _ in archive.iter_archived(
+        months, after, until, skus, sku_prefix
+    ):
+        if not is_sale:
+            totals[sku]["supplied"] += qty
+
+    margins = filter_skus(margins, skus, sku_prefix).values_list("sku")
+    margins = margins.annotate(
+        Sum("qty"), Sum("revenue"), Sum("cost"), Sum("profit")
+    ).order_by()
+
+    for sku, *values in margins:
+        for field, value in zip(("qty", "revenue", "cost", "profit"), values):
+            totals[sku][field] += value
+
+    issues = filter_skus(issues, skus, sku_prefix).values_list("sku")
+    for sku, count in issues.annotate(Count("id")).order_by():
+        totals[sku]["issues"] += count
+
+    for sku, values in totals.items():
+        yield start, sku, values
+
+
+def get_summary(
+    date_from: datetime,
+    date_to: datetime,
+    granularity: str,
+    skus: list = None,
+    sku_prefix: str = None,
+) -> list:
+    """
+    Supplies and sales per SKU and bucket of a window. Buckets at the edges only
+    count the part of the window they cover.
+    :param date_from: Date from, None for the beginning
+    :param date_to: Date to, included, None for the end
+    :param granularity: hour | day | month
+    :param skus: Only these SKUs
+    :param sku_prefix: Only SKUs that start with the prefix
+    :return: [{bucket, sku, supplied, qty, revenue, cost, profit, issues}]
+    """
+    totals = {}
+
+    for bucket, sku, values in iter_totals(
+        date_from, date_to, granularity, skus, sku_prefix
+    ):
+        key = (get_bucket(bucket, granularity), sku)
+        item = totals.get(key)
+
+        if item is None:
+            totals[key] = {"bucket": key[0], "sku": sku, **values}
+            continue
+
+        for field in FIELDS:
+            item[field] += values[field]
+
+    return [totals[key] for key in sorted(totals)]
+
+
+def get_top(date_from: datetime, date_to: datetime, top: int, by: str) -> list:
+    """
+    Get SKUs with the highest sales metric by date
+    :param date_from: Date from
+    :param date_to: Date to
+    :param top: Number of SKUs
+    :param by: One of METRICS
+    :return: [{sku, profit, revenue, qty, issues}]
+    """
+    totals = defaultdict(
+        lambda: {
+            "profit": Decimal(0),
+            "revenue": Decimal(0),
+            "qty": 0,
+            "issues": 0,
+        }
+    )
+
+    for _, sku, values in iter_totals(date_from, date_to):
+        # Buckets with supplies only do not rank a SKU
+        if not values["qty"] and not values["issues"]:
+            continue
+
+        for key, total in totals[sku].items():
+            totals[sku][key] = total + values[key]
+
+    ranking = heapq.nlargest(top, totals.items(), key=lambda item: item[1][by])
+
+    return [{"sku": sku, **values} for sku, values in ranking]
@@ -0,0 +1,89 @@
+import json
+from itertools import islice
+
+from rest_framework.renderers import BaseRenderer
+
+CHUNK_SIZE = 1000
+
+# Same output as the JSON renderer of the API: compact and not ASCII-escaped
+encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def stream_json(items, chunk_size: int = CHUNK_SIZE):
+    """
+    Encodes items as the {"data": [...]} envelope piece by piece, so only one
+    chunk of items is held in memory at a time
+    :param items: Iterable of JSON-serializable items
+    :param chunk_size: Number of items encoded together
+    :return: generator of str
+    """
+    items = iter(items)
+    separator = ""
+
+    yield '{"data":['
+
+    while chunk := list(islice(items, chunk_size)):
+        yield separator + encoder.encode(chunk)[1:-1]
+        separator = ","
+
+    yield "]}"
+
+
+def stream_ndjson(items, chunk_size: int = CHUNK_SIZE):
+    """
+    Encodes items as newline-delimited JSON, one item per line
+    :param items: Iterable of JSON-serializable items
+    :param chunk_size: Number of items encoded together
+    :return: generator of str
+    """
+    items = iter(items)
+
+    while chunk := list(islice(items, chunk_size)):
+        yield "".join(encoder.encode(item) + "\n" for item in chunk)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Lets views accept ``Accept: application/x-ndjson``. Views stream exports
+    themselves, other responses such as errors are rendered here.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        items = [data]
+
+        if isinstance(data, dict) and isinstance(data.get("data"), list):
+            items = data["data"]
+
+        return "".join(stream_ndjson(items)).encode(self.charset)
+
+
+def issue_to_json(row: tuple) -> dict:
+    """
+    Converts a streamed issue to its response item
+    :param row: (when, sale id, sku, qty, price in cents, message)
+    :return: {when, sku, qty, price, message}
+    """
+    when, _, sku, qty, cents, message = row
+
+    return {
+        "when": when.isoformat(),
+        "sku": sku,
+        "qty": qty,
+        "price": cents / 100,
+        "message": message,
+    }
+
+
+def available_item_to_json(item: tuple) -> dict:
+    """
+    Converts an available item to its response item
+    :param item: (sku, {qty, cost})
+    :return: {sku, qty, cost}
+    """
+    sku, values = item
+
+    return {"sku": sku, "qty": values["qty"], "cost": float(values["cost"])}
@@ -3,6 +3,13 @@ from datetime import datetime
 import pytest
 from django.urls import reverse
 
+from transactions.services import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    cache.clear()
+
 
 @pytest.fixture
 def supply_request(api_client):
@@ -24,6 +31,51 @@ def sales_request(api_client):
     return wrapper
 
 
+@pytest.fixture
+def history_request(supply_request, sales_request):
+    def wrapper(supplies, sales):
+        supply_request({"data": supplies})
+        sales_request({"data": sales})
+
+    return wrapper
+
+
+@pytest.fixture
+def batches_request(supply_request, sales_request):
+    def wrapper(batches):
+        for batch in batches:
+            for item_type, request in [
+                ("supply", supply_request),
+                ("sale", sales_request),
+            ]:
+                data = [
+                    dict(item, when=item["when"].isoformat())
+                    for item in batch
+                    if item["type"] == item_type
+                ]
+                request({"data": data})
+
+    return wrapper
+
+
+@pytest.fixture
+def daily_history_factory(history_request):
+    def wrapper():
+        history_request(
+            [
+                {"when": f"2024-10-0{day}T09:00:00", "sku": sku, "qty": 4, "price": 10}
+                for day in range(1, 6)
+                for sku in ["A", "B"]
+            ],
+            [
+                {"when": f"2024-10-0{day}T18:00:00", "sku": "A", "qty": 3, "price": 20}
+                for day in range(1, 6)
+            ],
+        )
+
+    return wrapper
+
+
 @pytest.fixture
 def availability_request(api_client):
     def wrapper(to: datetime = None):
@@ -65,6 +117,39 @@ def issues_request(api_client):
     return wrapper
 
 
+@pytest.fixture
+def profit_request(api_client):
+    def wrapper(from_date=None, to_date=None):
+        params = {}
+        if from_date:
+            params["from"] = from_date.isoformat()
+
+        if to_date:
+            params["to"] = to_date.isoformat()
+
+        url = reverse("api:profit")
+        response = api_client.get(url, params, format="json")
+        return response
+
+    return wrapper
+
+
+@pytest.fixture
+def top_request(api_client):
+    def wrapper(from_date=None, to_date=None, **params):
+        if from_date:
+            params["from"] = from_date.isoformat()
+
+        if to_date:
+            params["to"] = to_date.isoformat()
+
+        url = reverse("api:top")
+        response = api_client.get(url, params, format="json")
+        return response
+
+    return wrapper
+
+
 @pytest.fixture
 def assert_success_crud_response():
     def wrapper(response, status, success, issues):
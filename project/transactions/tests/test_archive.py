@@ -0,0 +1,175 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from transactions.models import ArchivedMonth, Issue, Lot, Transaction
+from transactions.services import archive, compaction
+from transactions.services.custom import (
+    AvailabilityRetriever,
+    get_available_items,
+    get_available_series,
+    get_issues,
+    get_profit,
+)
+from transactions.services.stats import get_summary
+
+WATERMARK = datetime(2024, 3, 15)
+
+DATES = [
+    datetime(2024, 1, 20),
+    datetime(2024, 2, 10, 12, 34),
+    datetime(2024, 2, 29, 23, 59),
+    datetime(2024, 3, 20),
+    datetime(2024, 4, 30),
+]
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(settings, tmp_path):
+    settings.ARCHIVE_DIR = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def history_factory(batches_request):
+    def wrapper():
+        rng = random.Random(1)
+        start = datetime(2024, 1, 5)
+        items = sorted(
+            (
+                {
+                    "type": rng.choice(["supply", "sale"]),
+                    "when": start + timedelta(minutes=rng.randrange(60 * 24 * 105)),
+                    "sku": rng.choice("ABC"),
+                    "qty": rng.randint(1, 5),
+                    "price": rng.randint(20, 40),
+                }
+                for _ in range(200)
+            ),
+            key=lambda item: item["when"],
+        )
+        batches_request([items[:100], items[100:]])
+
+    return wrapper
+
+
+def get_results() -> dict:
+    return {
+        "availability": [AvailabilityRetriever(date).available_items for date in DATES],
+        "snapshots": [get_available_items(date) for date in DATES],
+        "series": get_available_series(DATES),
+        "issues": [
+            [sale.id, sale.qty, sale.price, message]
+            for sale, message in get_issues(None, None)
+        ],
+        "profit": get_profit(datetime(2024, 1, 10), datetime(2024, 2, 20)),
+        "summary": get_summary(
+            datetime(2024, 2, 3, 10, 20), datetime(2024, 3, 20, 10, 40), "day"
+        ),
+    }
+
+
+@pytest.mark.django_db
+def test_archived_history_gives_the_same_results(history_factory):
+    history_factory()
+    compaction.compact(WATERMARK)
+    expected = get_results()
+    total = Transaction.objects.count()
+
+    result = archive.archive(WATERMARK)
+
+    assert result["months"] == 2
+    assert Transaction.objects.count() == total - result["transactions"]
+    assert not Transaction.objects.filter(
+        when__lt=datetime(2024, 3, 1),
+        issue__isnull=True,
+        lot__remaining=0,
+        lot__allocations__isnull=True,
+    ).exists()
+    assert not Transaction.objects.filter(
+        when__lt=datetime(2024, 3, 1), transaction_type="sale", issue__isnull=True
+    ).exists()
+    assert Issue.objects.filter(when__lt=datetime(2024, 3, 1)).exists()
+    assert get_results() == expected
+
+
+@pytest.mark.django_db
+def test_archiving_again_appends_to_month(
+    history_factory, archive_dir, django_capture_on_commit_callbacks
+):
+    history_factory()
+    compaction.compact(WATERMARK)
+    expected = get_results()
+    archive.archive(WATERMARK)
+    files = set(archive_dir.iterdir())
+
+    # Lots of the archived months sold after the watermark are released by a
+    # later compaction
+    compaction.compact(datetime(2024, 4, 30))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        result = archive.archive(WATERMARK)
+
+    assert result["months"] >= 1
+    assert len(set(archive_dir.iterdir())) == 2
+    assert set(archive_dir.iterdir()) != files
+    assert sum(ArchivedMonth.objects.values_list("rows", flat=True)) == sum(
+        1 for _ in archive.iter_archived(archive.get_months())
+    )
+    assert get_results() == expected
+
+
+@pytest.mark.django_db
+def test_flush_removes_archive(history_factory, flush_request, archive_dir):
+    history_factory()
+    compaction.compact(WATERMARK)
+    archive.archive(WATERMARK)
+    assert any(archive_dir.iterdir())
+
+    response = flush_request()
+
+    assert response.data == {"data": {"success": 200}}
+    assert not any(archive_dir.iterdir())
+    assert not ArchivedMonth.objects.exists()
+    assert AvailabilityRetriever().available_items == {}
+
+
+def test_month_file_roundtrip(archive_dir):
+    rows = [
+        (datetime(2024, 1, 1, 10), 0, 1, "A", 5, 1000),
+        (datetime(2024, 1, 1, 10), 1, 3, "B", 1, 1250),
+        (datetime(2024, 1, 2, 10, 0, 0, 7), 0, 2, "AB", 2, 999),
+        (datetime(2024, 1, 3), 1, 4, "A", 3, 1500),
+    ]
+    path = archive_dir / "month.bin"
+    archive.write_month(path, rows)
+
+    assert list(archive.iter_month(path)) == rows
+    assert list(archive.iter_month(path, after=datetime(2024, 1, 1, 10))) == rows[2:]
+    assert list(archive.iter_month(path, until=datetime(2024, 1, 2, 10))) == rows[:2]
+    assert list(archive.iter_month(path, sku_prefix="A")) == [rows[0], *rows[2:]]
+    assert list(archive.iter_month(path, skus=["B"])) == [rows[1]]
+
+
+@pytest.mark.django_db
+def test_archive_command(history_factory):
+    history_factory()
+
+    with pytest.raises(CommandError):
+        call_command("archive_transactions")
+
+    call_command("compact_ledger", watermark=WATERMARK)
+
+    with pytest.raises(CommandError):
+        call_command("archive_transactions", cutoff=datetime(2024, 4, 1))
+
+    call_command("archive_transactions")
+    assert ArchivedMonth.objects.count() == 2
+
+    with pytest.raises(CommandError):
+        call_command("rebuild_ledger")
+
+    assert Lot.objects.filter(supply__when__lt=datetime(2024, 3, 1)).exists()
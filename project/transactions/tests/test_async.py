@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+from django.urls import reverse
+
+from transactions.async_views import single_flight
+
+
+@pytest.fixture
+def history_factory(history_request):
+    def wrapper():
+        history_request(
+            [
+                {"when": "2024-10-28T10:00:00", "sku": "A", "qty": 5, "price": 10},
+                {"when": "2024-10-28T11:00:00", "sku": "B", "qty": 2, "price": 30},
+            ],
+            [
+                {"when": "2024-10-29T10:00:00", "sku": "A", "qty": 3, "price": 5},
+                {"when": "2024-10-29T11:00:00", "sku": "B", "qty": 3, "price": 40},
+                {"when": "2024-10-29T12:00:00", "sku": "B", "qty": 1, "price": 40},
+            ],
+        )
+
+    return wrapper
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize(
+    "name, params",
+    [
+        ("availability", {}),
+        ("availability", {"to": "2024-10-28T10:30:00"}),
+        ("issues", {}),
+        ("issues", {"from": "2024-10-29T10:30:00"}),
+        ("profit", {}),
+        ("top", {"by": "revenue", "top": 1}),
+    ],
+)
+def test_async_views_match_sync_views(api_client, history_factory, name, params):
+    history_factory()
+
+    expected = api_client.get(reverse(f"api:{name}"), params)
+    response = api_client.get(reverse(f"api:async-{name}"), params)
+
+    assert response.status_code == 200
+    assert response.json() == expected.json()
+
+
+@pytest.mark.django_db
+def test_async_top_validates_query(api_client):
+    response = api_client.get(reverse("api:async-top"), {"by": "unknown"})
+    expected = api_client.get(reverse("api:top"), {"by": "unknown"})
+
+    assert response.status_code == expected.status_code == 422
+    assert response.json() == expected.json()
+    assert "by" in response.json()["errors"]
+
+
+@pytest.mark.django_db
+def test_single_flight_coalesces_concurrent_calls():
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.wait(1)
+        return len(calls)
+
+    async def burst():
+        results = asyncio.gather(*(single_flight(("key",), compute) for _ in range(50)))
+        await asyncio.sleep(0.05)
+        started.set()
+        return await results
+
+    assert asyncio.run(burst()) == [1] * 50
+    assert asyncio.run(single_flight(("key",), compute)) == 2
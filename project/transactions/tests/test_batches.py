@@ -0,0 +1,70 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from transactions.models import BatchStatusChoices, Transaction
+
+
+@pytest.fixture
+def async_sales_request(api_client):
+    def wrapper(body):
+        url = reverse("api:sales") + "?async=1"
+        response = api_client.post(url, body, format="json")
+        return response
+
+    return wrapper
+
+
+@pytest.fixture
+def batch_request(api_client):
+    def wrapper(pk):
+        url = reverse("api:batch", kwargs={"pk": pk})
+        response = api_client.get(url, format="json")
+        return response
+
+    return wrapper
+
+
+@pytest.mark.django_db
+def test_async_sales_are_recorded_by_worker(
+    supply_request, async_sales_request, batch_request, availability_request
+):
+    supply_request(
+        {"data": [{"when": "2024-10-28T10:00:00", "sku": "A", "qty": 5, "price": 10}]}
+    )
+
+    response = async_sales_request(
+        {
+            "data": [
+                {"when": "2024-10-29T10:00:00", "sku": "A", "qty": 3, "price": 10},
+                {"when": "2024-10-29T11:00:00", "sku": "A", "qty": 3, "price": 10},
+            ]
+        }
+    )
+
+    assert response.status_code == 202
+    pk = response.data["data"]["batch"]
+
+    assert batch_request(pk).data["data"]["status"] == BatchStatusChoices.PENDING
+    assert Transaction.objects.filter(transaction_type="sale").count() == 0
+
+    call_command("process_batches")
+
+    data = batch_request(pk).data["data"]
+    assert data["status"] == BatchStatusChoices.DONE
+    assert (data["size"], data["success"], data["issues"]) == (2, 1, 1)
+    assert availability_request().data["data"][0]["qty"] == 2
+
+
+@pytest.mark.django_db
+def test_async_sales_are_validated_on_request(async_sales_request):
+    response = async_sales_request(
+        {"data": [{"when": "2024-10-29T10:00:00", "sku": "A", "qty": 0, "price": 20}]}
+    )
+
+    assert response.status_code == 422
+
+
+@pytest.mark.django_db
+def test_unknown_batch(batch_request):
+    assert batch_request(1).status_code == 404
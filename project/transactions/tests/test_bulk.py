@@ -0,0 +1,105 @@
+from datetime import datetime
+
+import pytest
+
+from transactions.models import Issue, Transaction
+from transactions.services import batches, snapshots
+from transactions.services.crud import FLUSHED_MODELS
+
+
+@pytest.mark.django_db
+def test_large_sales_batch(
+    supply_request,
+    sales_request,
+    assert_success_crud_response,
+    django_assert_max_num_queries,
+):
+    supply_request(
+        {
+            "data": [
+                {"when": "2024-10-01T09:00:00", "sku": sku, "qty": 100, "price": 10}
+                for sku in ["A", "B"]
+            ]
+        }
+    )
+    body = {
+        "data": [
+            {
+                "when": f"2024-10-02T{idx // 60:02}:{idx % 60:02}:00",
+                "sku": "AB"[idx % 2],
+                "qty": 1,
+                "price": 10,
+            }
+            for idx in range(300)
+        ]
+    }
+
+    with django_assert_max_num_queries(60):
+        response = sales_request(body)
+
+    assert_success_crud_response(response, 201, 200, 100)
+    assert Transaction.objects.filter(transaction_type="sale").count() == 300
+    assert Issue.objects.count() == 100
+
+
+@pytest.mark.django_db
+def test_unordered_sales_batch(
+    supply_request, sales_request, assert_success_crud_response
+):
+    supply_request(
+        {"data": [{"when": "2024-10-01T09:00:00", "sku": "A", "qty": 2, "price": 10}]}
+    )
+    body = {
+        "data": [
+            {"when": "2024-10-03T09:00:00", "sku": "A", "qty": 2, "price": 10},
+            {"when": "2024-10-02T09:00:00", "sku": "A", "qty": 2, "price": 10},
+        ]
+    }
+
+    response = sales_request(body)
+
+    assert_success_crud_response(response, 201, 2, 0)
+    assert Issue.objects.get().sale.when.day == 3
+
+
+@pytest.mark.django_db
+def test_flush_empties_ledger(
+    supply_request, sales_request, flush_request, django_assert_max_num_queries
+):
+    supply_request(
+        {
+            "data": [
+                {
+                    "when": f"2024-10-01T{hour:02}:00:00",
+                    "sku": "A",
+                    "qty": 2,
+                    "price": 10,
+                }
+                for hour in range(24)
+            ]
+        }
+    )
+    sales_request(
+        {
+            "data": [
+                {
+                    "when": f"2024-10-02T{hour:02}:00:00",
+                    "sku": "A",
+                    "qty": 3,
+                    "price": 20,
+                }
+                for hour in range(24)
+            ]
+        }
+    )
+    snapshots.save(datetime(2024, 10, 2), {})
+    batches.enqueue([])
+    count = Transaction.objects.count()
+
+    # A count, the archived months, a statement per table, the ledger version and
+    # savepoints, whatever the number of rows
+    with django_assert_max_num_queries(len(FLUSHED_MODELS) + 7):
+        response = flush_request()
+
+    assert response.data == {"data": {"success": count}}
+    assert all(not model.objects.exists() for model in FLUSHED_MODELS)
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+from django.db import transaction as db_transaction
+
+from transactions.services import cache
+
+
+@pytest.fixture
+def supply_factory(supply_request):
+    def wrapper(when="2024-10-28T17:41:38", qty=5):
+        body = {"data": [{"when": when, "sku": "A", "qty": qty, "price": 10}]}
+        return supply_request(body)
+
+    return wrapper
+
+
+@pytest.mark.django_db
+def test_repeated_request_is_served_from_cache(
+    availability_request, supply_factory, django_assert_num_queries
+):
+    supply_factory()
+    date_to = datetime(2024, 10, 29)
+
+    response = availability_request(date_to)
+
+    with django_assert_num_queries(1):
+        cached = availability_request(date_to)
+
+    assert cached.data == response.data
+
+
+@pytest.mark.django_db
+def test_dates_after_latest_transaction_share_response(
+    availability_request, issues_request, supply_factory, django_assert_num_queries
+):
+    supply_factory()
+    availability_request(datetime(2024, 10, 29))
+    issues_request(to_date=datetime(2024, 10, 29))
+
+    with django_assert_num_queries(2):
+        availability_request()
+        issues_request()
+
+
+@pytest.mark.django_db
+def test_writes_invalidate_cache(
+    availability_request, sales_request, supply_factory, flush_request
+):
+    supply_factory()
+    assert availability_request().data["data"][0]["qty"] == 5
+
+    supply_factory(when="2024-10-28T18:00:00", qty=2)
+    assert availability_request().data["data"][0]["qty"] == 7
+
+    sales_request(
+        {"data": [{"when": "2024-10-29T10:00:00", "sku": "A", "qty": 3, "price": 20}]}
+    )
+    assert availability_request().data["data"][0]["qty"] == 4
+
+    flush_request()
+    assert availability_request().data["data"] == []
+
+
+@pytest.mark.django_db
+def test_rolled_back_write_keeps_version():
+    with pytest.raises(RuntimeError):
+        with db_transaction.atomic():
+            cache.bump(datetime(2024, 10, 29))
+            raise RuntimeError
+
+    assert cache.get_version() == (None, None)
+
+
+@pytest.mark.django_db
+def test_shared_cache_backs_memory_cache(
+    settings, availability_request, supply_factory, django_assert_num_queries
+):
+    settings.RESPONSE_CACHE_ALIAS = "default"
+    supply_factory()
+    response = availability_request()
+
+    cache.clear()
+
+    with django_assert_num_queries(1):
+        assert availability_request().data == response.data
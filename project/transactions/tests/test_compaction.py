@@ -0,0 +1,127 @@
+from datetime import datetime
+
+import pytest
+from django.core.management import call_command
+
+from transactions.models import Allocation, Checkpoint
+from transactions.services import compaction, imports, ledger, snapshots
+from transactions.services.custom import AvailabilityRetriever, get_available_items
+
+WATERMARK = datetime(2024, 10, 3, 12)
+
+
+@pytest.mark.django_db
+def test_replay_starts_from_opening_balance(daily_history_factory):
+    daily_history_factory()
+
+    result = compaction.compact(WATERMARK)
+
+    assert result == {"watermark": WATERMARK, "skus": 2, "allocations": 3}
+    assert not Allocation.objects.filter(sale__when__lte=WATERMARK).exists()
+    assert Allocation.objects.filter(sale__when__gt=WATERMARK).count() == 4
+
+    balance = Checkpoint.objects.get(compacted=True)
+    snapshot = balance.snapshots.get(sku="A")
+    assert balance.when == WATERMARK
+    assert (snapshot.qty, snapshot.cost, len(snapshot.lots)) == (6, 60, 2)
+
+    Checkpoint.objects.filter(compacted=False).delete()
+    retriever = AvailabilityRetriever(datetime(2024, 10, 5), use_snapshots=True)
+    last_when, _, supplies, sales = retriever.start_replay(datetime(2024, 10, 5))
+
+    assert last_when == WATERMARK
+    assert (supplies.count(), sales.count()) == (2, 2)
+
+    for date_to in [WATERMARK, datetime(2024, 10, 4, 12), datetime(2024, 10, 6)]:
+        expected = AvailabilityRetriever(date_to).available_items
+        assert get_available_items(date_to) == expected
+
+
+@pytest.mark.django_db
+def test_transactions_up_to_watermark_are_rejected(
+    daily_history_factory, supply_request, sales_request
+):
+    daily_history_factory()
+    compaction.compact(WATERMARK)
+
+    early = supply_request(
+        {
+            "data": [
+                {"when": "2024-10-03T13:00:00", "sku": "A", "qty": 1, "price": 5},
+                {"when": "2024-10-03T10:00:00", "sku": "A", "qty": 1, "price": 5},
+            ]
+        }
+    )
+    at_watermark = sales_request(
+        {"data": [{"when": WATERMARK.isoformat(), "sku": "B", "qty": 1, "price": 20}]}
+    )
+
+    assert early.status_code == at_watermark.status_code == 422
+    assert early.json()["errors"][0] == {}
+    assert list(early.json()["errors"][1]) == ["when"]
+
+    late = supply_request(
+        {"data": [{"when": "2024-10-03T13:00:00", "sku": "A", "qty": 1, "price": 5}]}
+    )
+
+    assert late.status_code == 201
+    assert snapshots.get_watermark() == WATERMARK
+    assert ledger.get_stock_levels() == AvailabilityRetriever().available_items
+    assert (
+        get_available_items(datetime(2024, 10, 4))
+        == AvailabilityRetriever(datetime(2024, 10, 4)).available_items
+    )
+
+
+@pytest.mark.django_db
+def test_import_skips_compacted_items(daily_history_factory):
+    daily_history_factory()
+    compaction.compact(WATERMARK)
+    errors = []
+
+    counts = imports.import_items(
+        [
+            (
+                1,
+                {
+                    "type": "supply",
+                    "when": "2024-10-01",
+                    "sku": "A",
+                    "qty": 1,
+                    "price": 5,
+                },
+            ),
+            (
+                2,
+                {
+                    "type": "supply",
+                    "when": "2024-10-07",
+                    "sku": "A",
+                    "qty": 1,
+                    "price": 5,
+                },
+            ),
+        ],
+        on_error=lambda line_num, item_errors: errors.append(line_num),
+    )
+
+    assert counts["supply"] == 1
+    assert errors == [1]
+
+
+@pytest.mark.django_db
+def test_compact_ledger_command(daily_history_factory):
+    daily_history_factory()
+
+    call_command("compact_ledger", keep_days=2)
+    watermark = datetime(2024, 10, 3, 18)
+    assert snapshots.get_watermark() == watermark
+
+    # An earlier watermark keeps the current one
+    call_command("compact_ledger", watermark=datetime(2024, 10, 2))
+    assert snapshots.get_watermark() == watermark
+
+    call_command("rebuild_ledger")
+    assert snapshots.get_watermark() == watermark
+    assert not Allocation.objects.filter(sale__when__lte=watermark).exists()
+    assert ledger.get_stock_levels() == AvailabilityRetriever().available_items
@@ -0,0 +1,111 @@
+import json
+from datetime import datetime
+
+import pytest
+from django.urls import reverse
+
+from transactions.models import Checkpoint, StockLevel
+from transactions.services import filters
+
+
+@pytest.fixture
+def history_factory(history_request):
+    def wrapper():
+        history_request(
+            [
+                {"when": f"2024-10-0{day}T10:00:00", "sku": sku, "qty": 2, "price": 10}
+                for day in range(1, 4)
+                for sku in ["B-1", "A-1", "a-2", "A-2", "C"]
+            ],
+            [
+                {"when": f"2024-10-0{day}T18:00:00", "sku": sku, "qty": 3, "price": 5}
+                for day in range(1, 4)
+                for sku in ["A-1", "A-2", "C", "D"]
+            ],
+        )
+
+    return wrapper
+
+
+@pytest.fixture
+def filtered_request(api_client):
+    def wrapper(name, **params):
+        url = reverse(f"api:{name}")
+        response = api_client.get(url, params)
+        assert response.status_code == 200
+
+        if response.streaming:
+            return json.loads(b"".join(response.streaming_content))["data"]
+
+        return response.json()["data"]
+
+    return wrapper
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("to", [None, "2024-10-02T12:00:00"])
+@pytest.mark.parametrize(
+    "params, skus",
+    [
+        ({"sku": ["C", "A-1"]}, {"C", "A-1"}),
+        ({"sku_prefix": "A-"}, {"A-1", "A-2"}),
+        ({"sku_prefix": "a"}, {"a-2"}),
+        ({"sku": ["A-1", "C"], "sku_prefix": "A"}, {"A-1"}),
+    ],
+)
+def test_filtered_availability(
+    settings, history_factory, filtered_request, to, params, skus
+):
+    settings.SNAPSHOT_INTERVAL = 4
+    history_factory()
+    dates = {"to": to} if to else {}
+
+    expected = [
+        item
+        for item in filtered_request("availability", **dates)
+        if item["sku"] in skus
+    ]
+    Checkpoint.objects.all().delete()
+
+    assert filtered_request("availability", **dates, **params) == expected
+    # Checkpoints of a few SKUs would be incomplete
+    assert not Checkpoint.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params, skus",
+    [
+        ({"sku": ["D", "A-2"]}, {"D", "A-2"}),
+        ({"sku_prefix": "A-"}, {"A-1", "A-2"}),
+    ],
+)
+def test_filtered_issues(history_factory, filtered_request, params, skus):
+    history_factory()
+    date_from = datetime(2024, 10, 2).isoformat()
+
+    expected = [
+        item
+        for item in filtered_request("issues", **{"from": date_from})
+        if item["sku"] in skus
+    ]
+
+    assert expected
+    assert filtered_request("issues", **{"from": date_from}, **params) == expected
+    assert filtered_request("issues", **{"from": date_from}, stream=1, **params) == (
+        expected
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("by_code_point", [True, False])
+def test_prefix_range_needs_code_point_collation(monkeypatch, by_code_point):
+    monkeypatch.setattr(filters, "compares_by_code_point", lambda alias: by_code_point)
+    StockLevel.objects.bulk_create(
+        [StockLevel(sku=sku) for sku in ["A-1", "A-10", "A.", "B"]]
+    )
+
+    queryset = filters.filter_skus(StockLevel.objects.order_by("sku"), None, "A-")
+
+    assert list(queryset.values_list("sku", flat=True)) == ["A-1", "A-10"]
+    assert (" < " in str(queryset.query)) == by_code_point
@@ -0,0 +1,220 @@
+import json
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+
+from transactions.models import Issue, SkuStats
+from transactions.serializers import SupplySerializer
+from transactions.services import ledger
+from transactions.services.imports import import_items
+from transactions.validation import parse_transaction, validate_transaction
+
+ITEMS = [
+    {"when": "2024-10-28T17:41:38", "sku": "A", "qty": 2, "price": 100},
+    {"when": "2024-10-28 17:41:38.5", "sku": " A ", "qty": "2", "price": "10.5"},
+    {"when": "2024-10-28", "sku": "A", "qty": 1, "price": 0.1},
+    {"when": "2024-10-28T17:41:38Z", "sku": "A", "qty": 1, "price": 1},
+    {"when": datetime(2024, 10, 28), "sku": "A", "qty": 1, "price": "99999999.99"},
+    {"when": "2024-10-28T17:41:38", "sku": "A", "qty": "2.0", "price": 1},
+    {"when": "2024-10-28T17:41:38", "sku": "A", "qty": 1, "price": "1e2"},
+    {"when": "2024-10-28T17:41:38", "sku": "A", "qty": 1, "price": "100000000"},
+    {"when": "2024-10-28T17:41:38", "sku": "A", "qty": 1, "price": "0.001"},
+    {"when": "2024-10-28T17:41:38", "sku": "A", "qty": 1, "price": "-1"},
+    {"when": "2024-10-28T17:41:38", "sku": "A", "qty": 1, "price": "NaN"},
+    {"when": "2024-10-28T17:41:38", "sku": "A", "qty": 0, "price": 1},
+    {"when": "2024-10-28T17:41:38", "sku": "A", "qty": True, "price": 1},
+    {"when": "2024-10-28T17:41:38", "sku": "  ", "qty": 1, "price": 1},
+    {"when": "2024-10-28T17:41:38", "sku": 5, "qty": 1, "price": 1},
+    {"when": "yesterday", "sku": "A", "qty": 1, "price": 1},
+    {"when": "2024-10-28T17:41:38", "sku": "A", "qty": 1},
+    ["2024-10-28T17:41:38", "A", 1, 1],
+]
+
+
+@pytest.mark.parametrize("item", ITEMS)
+def test_validation_matches_serializer(item):
+    serializer = SupplySerializer(data=item)
+    expected = serializer.is_valid() and dict(serializer.validated_data)
+
+    data = parse_transaction(item)
+
+    if data is not None:
+        assert data == expected
+        assert data["price"].as_tuple() == expected["price"].as_tuple()
+
+    data, errors = validate_transaction(item)
+
+    assert data == (expected or None)
+    assert errors == (None if expected else serializer.errors)
+
+
+def test_fast_path_covers_regular_items():
+    assert parse_transaction(ITEMS[0]) == {
+        "when": datetime(2024, 10, 28, 17, 41, 38),
+        "sku": "A",
+        "qty": 2,
+        "price": Decimal("100.00"),
+    }
+    assert parse_transaction(ITEMS[1]) is not None
+
+
+@pytest.fixture
+def history():
+    supplies = [
+        {"when": "2024-10-28T10:00:00", "sku": "A", "qty": 5, "price": 10},
+        {"when": "2024-10-28T11:00:00", "sku": "B", "qty": 2, "price": 30},
+    ]
+    sales = [
+        {"when": "2024-10-29T10:00:00", "sku": "A", "qty": 3, "price": 20},
+        {"when": "2024-10-29T11:00:00", "sku": "B", "qty": 3, "price": 40},
+        {"when": "2024-10-27T11:00:00", "sku": "A", "qty": 1, "price": 40},
+    ]
+    return supplies, sales
+
+
+@pytest.fixture
+def expected_state(
+    history, supply_request, sales_request, availability_request, flush_request
+):
+    def wrapper(issues_request):
+        supplies, sales = history
+        supply_request({"data": supplies})
+        sales_request({"data": sales})
+
+        state = availability_request().data, issues_request().data
+        flush_request()
+        return state
+
+    return wrapper
+
+
+@pytest.mark.django_db
+def test_import_csv(
+    tmp_path, history, expected_state, availability_request, issues_request
+):
+    expected = expected_state(issues_request)
+    supplies, sales = history
+
+    path = tmp_path / "transactions.csv"
+    lines = ["type,when,sku,qty,price"]
+    lines += [
+        f"supply,{s['when']},{s['sku']},{s['qty']},{s['price']}" for s in supplies
+    ]
+    lines += [f"sale,{s['when']},{s['sku']},{s['qty']},{s['price']}" for s in sales]
+    lines += ["sale,2024-10-29T12:00:00,C,0,1"]
+    path.write_text("\n".join(lines) + "\n")
+
+    call_command("import_transactions", str(path), chunk_size=2)
+
+    assert (availability_request().data, issues_request().data) == expected
+
+
+@pytest.mark.django_db
+def test_import_ndjson(
+    tmp_path, history, expected_state, availability_request, issues_request
+):
+    expected = expected_state(issues_request)
+    supplies, sales = history
+
+    supplies_path = tmp_path / "supplies.ndjson"
+    supplies_path.write_text("".join(json.dumps(item) + "\n" for item in supplies))
+    sales_path = tmp_path / "sales.ndjson"
+    sales_path.write_text(
+        "".join(json.dumps(item) + "\n" for item in sales) + "{invalid\n"
+    )
+
+    call_command("import_transactions", str(supplies_path), type="supply")
+    call_command("import_transactions", str(sales_path), type="sale")
+
+    assert (availability_request().data, issues_request().data) == expected
+
+
+@pytest.mark.django_db
+def test_import_matches_api_over_chunks(
+    supply_request,
+    sales_request,
+    availability_request,
+    issues_request,
+    profit_request,
+    flush_request,
+):
+    rng = random.Random(0)
+    start = datetime(2024, 10, 1)
+    items = [
+        {
+            "type": rng.choice(["supply", "supply", "sale"]),
+            "when": (start + timedelta(minutes=17 * i)).isoformat(),
+            "sku": rng.choice("ABCD"),
+            "qty": rng.randint(1, 5),
+            "price": rng.randint(1, 50),
+        }
+        for i in range(200)
+    ]
+    late = [
+        dict(item, when=item["when"].replace("2024-10", "2024-09"))
+        for item in items[:20]
+    ]
+
+    def get_state():
+        return (
+            availability_request().data,
+            issues_request().data,
+            profit_request().data,
+            sorted(
+                SkuStats.objects.values_list(
+                    "granularity",
+                    "sku",
+                    "bucket",
+                    "supplied",
+                    "revenue",
+                    "cost",
+                    "profit",
+                    "qty",
+                    "issues",
+                )
+            ),
+        )
+
+    expected = []
+
+    for batch in [items, late]:
+        for item_type, request in [("supply", supply_request), ("sale", sales_request)]:
+            request({"data": [item for item in batch if item["type"] == item_type]})
+
+        expected.append(get_state())
+
+    flush_request()
+
+    import_items(enumerate(items), chunk_size=25)
+    assert get_state() == expected[0]
+
+    import_items(enumerate(late), chunk_size=25)
+    assert get_state() == expected[1]
+
+
+@pytest.mark.django_db
+def test_supply_in_later_chunk_rewinds_sale_at_same_time():
+    items = [
+        {
+            "type": "sale",
+            "when": "2024-01-01T10:00:00",
+            "sku": "A",
+            "qty": 1,
+            "price": 20,
+        },
+        {
+            "type": "supply",
+            "when": "2024-01-01T10:00:00",
+            "sku": "A",
+            "qty": 5,
+            "price": 10,
+        },
+    ]
+
+    import_items(enumerate(items), chunk_size=1)
+
+    assert not Issue.objects.exists()
+    assert ledger.get_stock_levels() == {"A": {"qty": 4, "cost": Decimal("40.00")}}
@@ -0,0 +1,163 @@
+from datetime import datetime
+
+import pytest
+from django.urls import reverse
+
+from transactions.models import Allocation, Issue, Lot, StockLevel
+from transactions.services import ledger
+from transactions.services.custom import AvailabilityRetriever
+
+
+@pytest.fixture
+def supply_factory(supply_request):
+    def wrapper():
+        body = {
+            "data": [
+                {"when": "2024-10-28T17:41:38", "sku": "A", "qty": 2, "price": 100},
+                {"when": "2024-10-29T12:22:11", "sku": "A", "qty": 2, "price": 105},
+                {"when": "2024-10-29T12:22:11", "sku": "B", "qty": 5, "price": 110},
+            ]
+        }
+        return supply_request(body)
+
+    return wrapper
+
+
+@pytest.mark.django_db
+def test_consecutive_sales_across_lots(
+    supply_factory, sales_request, availability_request
+):
+    supply_factory()
+    sales = {
+        "data": [
+            {"when": "2024-10-30T10:00:00", "sku": "A", "qty": 3, "price": 120},
+            {"when": "2024-10-30T11:00:00", "sku": "A", "qty": 1, "price": 120},
+        ]
+    }
+    sales_request(sales)
+    response = availability_request()
+    expected_response = {
+        "data": [
+            {"sku": "A", "qty": 0, "cost": 0},
+            {"sku": "B", "qty": 5, "cost": 550},
+        ]
+    }
+    assert response.data == expected_response
+    assert not Lot.objects.filter(remaining__gt=0, sku="A").exists()
+
+
+@pytest.mark.django_db
+def test_out_of_order_supply_rewinds_sales(
+    supply_factory, supply_request, sales_request, issues_request
+):
+    supply_factory()
+    sales = {
+        "data": [
+            {"when": "2024-10-30T10:00:00", "sku": "A", "qty": 6, "price": 120},
+        ]
+    }
+    sales_request(sales)
+    assert Issue.objects.count() == 1
+
+    supplies = {
+        "data": [
+            {"when": "2024-10-29T08:00:00", "sku": "A", "qty": 2, "price": 90},
+        ]
+    }
+    supply_request(supplies)
+
+    assert issues_request().data == {"data": []}
+    assert StockLevel.objects.get(sku="A").qty == 0
+    assert Allocation.objects.filter(sale__sku="A").count() == 3
+
+
+@pytest.mark.django_db
+def test_out_of_order_sale(
+    supply_factory, sales_request, availability_request, assert_success_crud_response
+):
+    supply_factory()
+    sales = {
+        "data": [
+            {"when": "2024-10-30T10:00:00", "sku": "A", "qty": 3, "price": 120},
+        ]
+    }
+    sales_request(sales)
+    sales = {
+        "data": [
+            {"when": "2024-10-29T09:00:00", "sku": "A", "qty": 2, "price": 100},
+        ]
+    }
+    response = sales_request(sales)
+    assert_success_crud_response(response, 201, 1, 0)
+
+    response = availability_request(datetime(2024, 10, 29, 10))
+    assert response.data == {"data": [{"sku": "A", "qty": 0, "cost": 0}]}
+
+    response = availability_request()
+    assert response.data["data"][0] == {"sku": "A", "qty": 2, "cost": 210}
+    assert Issue.objects.get().sale.when == datetime(2024, 10, 30, 10)
+
+
+@pytest.mark.django_db
+def test_ledger_matches_replay(supply_factory, supply_request, sales_request):
+    supply_factory()
+    sales_request(
+        {
+            "data": [
+                {"when": "2024-10-30T10:00:00", "sku": "B", "qty": 4, "price": 100},
+                {"when": "2024-10-29T13:00:00", "sku": "A", "qty": 1, "price": 150},
+                {"when": "2024-10-30T09:00:00", "sku": "B", "qty": 2, "price": 120},
+            ]
+        }
+    )
+    supply_request(
+        {
+            "data": [
+                {"when": "2024-10-29T12:00:00", "sku": "B", "qty": 1, "price": 95},
+            ]
+        }
+    )
+
+    retriever = AvailabilityRetriever()
+    expected_issues = [[sale.id, message] for sale, message in retriever.get_issues()]
+    issues = list(Issue.objects.order_by("when").values_list("sale_id", "message"))
+
+    assert ledger.get_stock_levels() == retriever.available_items
+    assert [list(issue) for issue in issues] == expected_issues
+
+    ledger.rebuild()
+
+    assert ledger.get_stock_levels() == retriever.available_items
+
+
+@pytest.mark.django_db
+def test_current_availability_does_not_replay(
+    supply_factory, sales_request, api_client, django_assert_num_queries
+):
+    supply_factory()
+    url = reverse("api:availability")
+
+    # Ledger version before and after computing the response, latest date and
+    # the stock levels
+    with django_assert_num_queries(4):
+        short = api_client.get(url).json()
+
+    sales_request(
+        {
+            "data": [
+                {
+                    "when": f"2024-10-30T{hour:02d}:00:00",
+                    "sku": "B",
+                    "qty": 1,
+                    "price": 200,
+                }
+                for hour in range(20)
+            ]
+        }
+    )
+
+    with django_assert_num_queries(4):
+        long = api_client.get(url).json()
+
+    assert short["data"][1] == {"sku": "B", "qty": 5, "cost": 550}
+    assert long["data"][1] == {"sku": "B", "qty": 0, "cost": 0}
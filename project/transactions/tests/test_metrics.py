@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import pytest
+from django.urls import reverse
+
+from transactions import metrics
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    metrics.reset()
+
+
+def get_timings(response) -> dict:
+    timings = {}
+
+    for timing in response["Server-Timing"].split(", "):
+        name, duration = timing.split(";")[:2]
+        timings[name] = float(duration.removeprefix("dur="))
+
+    return timings
+
+
+def test_histogram_is_rendered_cumulative():
+    for value in (0.001, 0.02, 0.02, 100):
+        metrics.observe("http_request_duration_seconds", value, view='a"b')
+
+    lines = metrics.render().splitlines()
+
+    assert "# TYPE http_request_duration_seconds histogram" in lines
+    assert 'http_request_duration_seconds_bucket{view="a\\"b",le="0.005"} 1' in lines
+    assert 'http_request_duration_seconds_bucket{view="a\\"b",le="0.025"} 3' in lines
+    assert 'http_request_duration_seconds_bucket{view="a\\"b",le="30"} 3' in lines
+    assert 'http_request_duration_seconds_bucket{view="a\\"b",le="+Inf"} 4' in lines
+    assert 'http_request_duration_seconds_count{view="a\\"b"} 4' in lines
+
+
+@pytest.mark.django_db
+def test_request_stages_are_timed(supply_request, availability_request):
+    supplies = [
+        {"when": "2024-10-28T10:00:00", "sku": "A", "qty": 5, "price": 10},
+        {"when": "2024-10-30T10:00:00", "sku": "A", "qty": 5, "price": 10},
+    ]
+
+    write = get_timings(supply_request({"data": supplies}))
+    current = get_timings(availability_request(datetime(2024, 10, 31)))
+    past = get_timings(availability_request(datetime(2024, 10, 29)))
+
+    assert {"validate", "write", "ledger", "render", "db", "total"} <= set(write)
+    assert {"stock-levels", "render", "db", "total"} <= set(current)
+    assert {"querysets", "replay", "fetch", "render", "db", "total"} <= set(past)
+    assert past["fetch"] <= past["replay"] <= past["total"]
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(api_client, supply_request, availability_request):
+    supply = {"when": "2024-10-28T10:00:00", "sku": "A", "qty": 5, "price": 10}
+    supply_request({"data": [supply]})
+    availability_request(datetime(2024, 10, 27))
+
+    response = api_client.get(reverse("api:metrics"))
+    lines = response.content.decode().splitlines()
+
+    assert response["Content-Type"] == metrics.CONTENT_TYPE
+    assert (
+        'http_requests_total{view="availability",method="GET",status="200"} 1' in lines
+    )
+    assert 'http_request_duration_seconds_count{view="availability"} 1' in lines
+    assert any(
+        line.startswith('http_request_queries_bucket{view="availability"')
+        for line in lines
+    )
+    assert any(
+        line.startswith(
+            'http_request_stage_duration_seconds_count{view="availability",stage="replay"}'
+        )
+        for line in lines
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("enabled", [True, False])
+def test_profile_report(api_client, settings, enabled):
+    settings.REQUEST_PROFILING = enabled
+    url = reverse("api:availability")
+
+    by_param = api_client.get(url, {"profile": "1"})
+    by_header = api_client.get(url, HTTP_X_PROFILE="1")
+
+    for response in (by_param, by_header):
+        if enabled:
+            assert response["Content-Type"].startswith("text/plain")
+            assert "function calls" in response.content.decode()
+
+        else:
+            assert response.json() == {"data": []}
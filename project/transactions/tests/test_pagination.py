@@ -0,0 +1,96 @@
+import json
+
+import pytest
+from django.urls import reverse
+
+
+@pytest.fixture
+def history_factory(history_request):
+    def wrapper():
+        history_request(
+            [
+                {"when": "2024-10-28T10:00:00", "sku": sku, "qty": 2, "price": 10}
+                for sku in ["D", "B", "A", "C"]
+            ],
+            [
+                {"when": "2024-10-29T10:00:00", "sku": sku, "qty": 3, "price": 5}
+                for sku in ["A", "B", "C", "D", "E"]
+            ]
+            + [{"when": "2024-10-30T10:00:00", "sku": "A", "qty": 5, "price": 1}],
+        )
+
+    return wrapper
+
+
+@pytest.fixture
+def page_request(api_client):
+    def wrapper(name, **params):
+        url = reverse(f"api:{name}")
+        response = api_client.get(url, params)
+        return response
+
+    return wrapper
+
+
+def read_pages(page_request, name, limit, **params):
+    items, cursor = [], None
+
+    while True:
+        extra = {"cursor": cursor} if cursor else {}
+        response = page_request(name, limit=limit, **params, **extra)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert len(data["data"]) <= limit
+        items += data["data"]
+        cursor = data["next"]
+
+        if cursor is None:
+            return items
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("limit", [1, 2, 6, 7])
+def test_issue_pages(history_factory, issues_request, page_request, limit):
+    history_factory()
+
+    expected = issues_request().json()["data"]
+
+    assert len(expected) == 6
+    assert read_pages(page_request, "issues", limit) == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("to", [None, "2024-10-28T12:00:00"])
+def test_availability_pages(history_factory, page_request, to):
+    history_factory()
+    params = {"to": to} if to else {}
+
+    expected = page_request("availability", **params).json()["data"]
+    items = read_pages(page_request, "availability", 3, **params)
+
+    assert items == sorted(expected, key=lambda item: item["sku"])
+    assert [item["sku"] for item in items] == ["A", "B", "C", "D"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", ["issues", "availability"])
+def test_ndjson_export(api_client, history_factory, name):
+    history_factory()
+    url = reverse(f"api:{name}")
+
+    expected = api_client.get(url).json()["data"]
+    response = api_client.get(url, HTTP_ACCEPT="application/x-ndjson")
+
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line) for line in lines] == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", ["issues", "availability"])
+def test_invalid_cursor(page_request, name):
+    response = page_request(name, limit=2, cursor="invalid")
+
+    assert response.status_code == 422
+    assert "cursor" in response.json()["errors"]
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+
+from transactions.services import parallel
+from transactions.services.custom import AvailabilityRetriever
+
+
+@pytest.fixture
+def history_factory(history_request):
+    def wrapper():
+        history_request(
+            [
+                {"when": f"2024-10-0{day}T09:00:00", "sku": sku, "qty": 3, "price": 10}
+                for day in range(1, 4)
+                for sku in ["E", "D", "C", "B"]
+            ],
+            [
+                {"when": f"2024-10-0{day}T09:00:00", "sku": sku, "qty": 4, "price": 12}
+                for day in range(1, 4)
+                for sku in ["A", "B", "C", "D", "E"]
+            ],
+        )
+
+    return wrapper
+
+
+@pytest.mark.django_db
+def test_get_partitions(history_factory):
+    history_factory()
+
+    assert parallel.get_partitions(None, 2) == [("A", "D"), ("D", None)]
+    assert parallel.get_partitions(None, 10) == [
+        ("A", "B"),
+        ("B", "C"),
+        ("C", "D"),
+        ("D", "E"),
+        ("E", None),
+    ]
+
+
+@pytest.mark.django_db
+def test_parallel_replay_matches_serial(history_factory):
+    history_factory()
+    date_to = datetime(2024, 10, 2, 12)
+
+    serial = AvailabilityRetriever(date_to)
+    items, issues = parallel.replay(date_to, 3, map_partitions=map)
+
+    assert [(sku, qty) for sku, qty, _ in items] == [
+        (sku, item["qty"]) for sku, item in serial.available_items.items()
+    ]
+    assert [row[1] for row, _ in issues] == [sale.id for sale, _ in serial.get_issues()]
+    assert len(issues) == 6
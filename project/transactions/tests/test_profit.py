@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+SUPPLIES = [
+    {"when": "2024-10-28T17:41:38", "sku": "A", "qty": 2, "price": 100},
+    {"when": "2024-10-29T12:22:11", "sku": "A", "qty": 2, "price": 105},
+    {"when": "2024-10-29T12:22:11", "sku": "B", "qty": 5, "price": 110},
+    {"when": "2024-10-29T12:33:33", "sku": "B", "qty": 5, "price": 115},
+]
+
+SALES = [
+    {"when": "2024-10-29T19:45:00", "sku": "A", "qty": 3, "price": 120},
+    {"when": "2024-10-30T19:45:01", "sku": "B", "qty": 7, "price": 125},
+    {"when": "2024-10-30T19:45:21", "sku": "C", "qty": 2, "price": 150},
+]
+
+
+@pytest.mark.django_db
+def test_profit(profit_request, history_request):
+    history_request(SUPPLIES, SALES)
+
+    response = profit_request()
+
+    expected_response = {"data": {"revenue": 1235, "cost": 1085, "profit": 150}}
+
+    assert response.status_code == 200
+    assert response.data == expected_response
+
+
+@pytest.mark.django_db
+def test_profit_window(profit_request, history_request):
+    history_request(SUPPLIES, SALES)
+
+    response = profit_request(datetime(2024, 10, 30), datetime(2024, 10, 31))
+
+    expected_response = {"data": {"revenue": 875, "cost": 780, "profit": 95}}
+
+    assert response.data == expected_response
+
+
+@pytest.mark.django_db
+def test_profit_after_out_of_order_supply(
+    profit_request, history_request, supply_request
+):
+    history_request(SUPPLIES, SALES)
+    supply_request(
+        {"data": [{"when": "2024-10-28T08:00:00", "sku": "B", "qty": 1, "price": 50}]}
+    )
+
+    response = profit_request(datetime(2024, 10, 30))
+
+    expected_response = {"data": {"revenue": 875, "cost": 715, "profit": 160}}
+
+    assert response.data == expected_response
@@ -0,0 +1,47 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from transactions.services.custom import AvailabilityRetriever, stream_rows
+
+
+@pytest.mark.django_db
+def test_replay_keeps_prices_exact(supply_request, sales_request):
+    supply_request(
+        {
+            "data": [
+                {"when": "2024-10-01T09:00:00", "sku": "A", "qty": 3, "price": 1.15},
+                {"when": "2024-10-01T09:00:00", "sku": "A", "qty": 3, "price": 0.1},
+            ]
+        }
+    )
+    sales_request(
+        {"data": [{"when": "2024-10-02T09:00:00", "sku": "A", "qty": 4, "price": 2}]}
+    )
+
+    retriever = AvailabilityRetriever(datetime(2024, 10, 3))
+
+    assert retriever.available_items == {"A": {"qty": 2, "cost": Decimal("0.20")}}
+
+    assert [row[-1] for row in stream_rows(retriever.supplies, 0)] == [115, 10]
+
+
+@pytest.mark.django_db
+def test_replay_sale_across_many_lots(supply_request, sales_request):
+    supply_request(
+        {
+            "data": [
+                {"when": f"2024-10-01T09:00:0{idx}", "sku": "A", "qty": 1, "price": 1}
+                for idx in range(5)
+            ]
+        }
+    )
+    sales_request(
+        {"data": [{"when": "2024-10-02T09:00:00", "sku": "A", "qty": 4, "price": 2}]}
+    )
+
+    retriever = AvailabilityRetriever()
+
+    assert retriever.available_items == {"A": {"qty": 1, "cost": Decimal("1.00")}}
+    assert retriever.get_issues() == []
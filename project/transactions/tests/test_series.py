@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+import pytest
+from django.urls import reverse
+
+from transactions.models import Transaction
+
+
+@pytest.fixture
+def series_request(api_client):
+    def wrapper(**params):
+        return api_client.get(reverse("api:availability-series"), params)
+
+    return wrapper
+
+
+@pytest.fixture
+def history_factory(history_request):
+    def wrapper():
+        history_request(
+            [
+                {"when": "2024-10-28T09:00:00", "sku": "A", "qty": 4, "price": 10},
+                {"when": "2024-10-28T12:00:00", "sku": "B", "qty": 5, "price": 20},
+                {"when": "2024-10-29T09:00:00", "sku": "A", "qty": 2, "price": 15},
+            ],
+            [
+                {"when": "2024-10-28T10:00:00", "sku": "A", "qty": 3, "price": 50},
+                {"when": "2024-10-28T13:00:00", "sku": "B", "qty": 9, "price": 50},
+                {"when": "2024-10-29T10:00:00", "sku": "A", "qty": 2, "price": 50},
+                {"when": "2024-10-29T11:00:00", "sku": "B", "qty": 1, "price": 50},
+            ],
+        )
+
+    return wrapper
+
+
+def get_expected(availability_request, points):
+    return [
+        {
+            "to": point.isoformat(),
+            "items": availability_request(point).json()["data"],
+        }
+        for point in points
+    ]
+
+
+@pytest.mark.django_db
+def test_series_matches_availability(
+    series_request, availability_request, history_factory
+):
+    history_factory()
+    points = [
+        datetime(2024, 10, 27),
+        datetime(2024, 10, 28, 10),
+        datetime(2024, 10, 28, 12, 30),
+        datetime(2024, 10, 29, 9, 0, 0, 1),
+        datetime(2024, 10, 30),
+    ]
+
+    response = series_request(to=[point.isoformat() for point in reversed(points)])
+
+    assert response.status_code == 200
+    assert response.json()["data"] == get_expected(availability_request, points)
+
+
+@pytest.mark.django_db
+def test_series_range(series_request, availability_request, history_factory):
+    history_factory()
+    date_from = datetime(2024, 10, 28, 8)
+    points = [date_from + timedelta(hours=hours) for hours in range(0, 28, 3)]
+
+    response = series_request(
+        **{"from": date_from.isoformat(), "to": "2024-10-29T12:00:00", "step": "PT3H"}
+    )
+
+    assert response.json()["data"] == get_expected(availability_request, points)
+
+
+@pytest.mark.django_db
+def test_series_sku_filter(series_request, history_factory):
+    history_factory()
+
+    response = series_request(to="2024-10-29T12:00:00", sku=["B"])
+
+    assert response.json()["data"] == [
+        {"to": "2024-10-29T12:00:00", "items": [{"sku": "B", "qty": 4, "cost": 80}]}
+    ]
+
+
+@pytest.mark.django_db
+def test_series_is_one_replay(
+    series_request, history_factory, django_assert_num_queries
+):
+    history_factory()
+    last = Transaction.objects.order_by("-when").first().when
+
+    # The series is replayed from the nearest snapshot and the archived months
+    # of the window, whatever its length
+    with django_assert_num_queries(6):
+        series_request(
+            **{"from": "2024-10-28T00:00:00", "to": last.isoformat(), "step": "PT1M"}
+        )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"to": "2024-10-28T00:00:00", "step": "PT1H"},
+        {"from": "2024-10-28T00:00:00", "to": "2024-10-29T00:00:00"},
+        {"from": "2024-10-29T00:00:00", "to": "2024-10-28T00:00:00", "step": "PT1H"},
+        {"from": "2024-10-28T00:00:00", "to": "2024-12-28T00:00:00", "step": "PT1M"},
+        {"from": "2024-10-28T00:00:00", "to": "2024-10-29T00:00:00", "step": "PT0S"},
+    ],
+)
+def test_series_invalid_query(series_request, params):
+    response = series_request(**params)
+
+    assert response.status_code == 422
+    assert response.data.get("errors")
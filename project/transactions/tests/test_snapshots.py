@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+from django.core.management import call_command
+
+from transactions.models import Checkpoint
+from transactions.services.custom import AvailabilityRetriever, get_available_items
+
+
+@pytest.mark.django_db
+def test_historical_availability_saves_snapshots(settings, daily_history_factory):
+    settings.SNAPSHOT_INTERVAL = 4
+    daily_history_factory()
+    date_to = datetime(2024, 10, 4, 12)
+
+    expected = AvailabilityRetriever(date_to).available_items
+    assert get_available_items(date_to) == expected
+    assert Checkpoint.objects.filter(when__lte=date_to).count() == 2
+
+    assert get_available_items(date_to) == expected
+    assert (
+        get_available_items(datetime(2024, 10, 3))
+        == AvailabilityRetriever(datetime(2024, 10, 3)).available_items
+    )
+
+
+@pytest.mark.django_db
+def test_out_of_order_insert_invalidates_snapshots(
+    settings, daily_history_factory, supply_request
+):
+    settings.SNAPSHOT_INTERVAL = 4
+    daily_history_factory()
+    date_to = datetime(2024, 10, 5, 12)
+    get_available_items(date_to)
+    assert Checkpoint.objects.filter(when__gt=datetime(2024, 10, 2)).exists()
+
+    supply_request(
+        {"data": [{"when": "2024-10-02T10:00:00", "sku": "C", "qty": 1, "price": 5}]}
+    )
+
+    assert not Checkpoint.objects.filter(when__gte=datetime(2024, 10, 2, 10)).exists()
+    assert (
+        get_available_items(date_to) == AvailabilityRetriever(date_to).available_items
+    )
+    assert get_available_items(date_to)["C"] == {"qty": 1, "cost": 5}
+
+
+@pytest.mark.django_db
+def test_backfill_snapshots_command(daily_history_factory):
+    daily_history_factory()
+    call_command("backfill_snapshots", interval=5)
+
+    assert Checkpoint.objects.count() == 2
+    snapshot = Checkpoint.objects.order_by("when").last().snapshots.get(sku="A")
+    assert (snapshot.qty, snapshot.cost) == (7, 70)
@@ -0,0 +1,54 @@
+import json
+from datetime import datetime
+
+import pytest
+from django.urls import reverse
+
+from transactions.streaming import stream_json
+
+
+@pytest.fixture
+def streamed_issues_request(api_client):
+    def wrapper(**params):
+        url = reverse("api:issues")
+        response = api_client.get(url, {"stream": "1", **params})
+        return response
+
+    return wrapper
+
+
+@pytest.mark.django_db
+def test_streamed_issues_match_issues(
+    supply_request, sales_request, issues_request, streamed_issues_request
+):
+    supply_request(
+        {"data": [{"when": "2024-10-28T10:00:00", "sku": "Ä", "qty": 5, "price": 10}]}
+    )
+    sales_request(
+        {
+            "data": [
+                {"when": "2024-10-29T10:00:00", "sku": "Ä", "qty": 3, "price": 5.5},
+                {"when": "2024-10-29T11:00:00", "sku": "B", "qty": 1, "price": 0.1},
+                {"when": "2024-10-30T11:00:00.5", "sku": "Ä", "qty": 9, "price": 3},
+            ]
+        }
+    )
+
+    response = streamed_issues_request()
+
+    assert response.streaming
+    assert json.loads(b"".join(response.streaming_content)) == issues_request().json()
+
+    date_from = datetime(2024, 10, 29, 10, 30)
+    response = streamed_issues_request(**{"from": date_from.isoformat()})
+    content = json.loads(b"".join(response.streaming_content))
+
+    assert content == issues_request(date_from).json()
+    assert len(content["data"]) == 2
+
+
+def test_stream_json_encodes_by_chunks():
+    chunks = list(stream_json(iter(range(5)), chunk_size=2))
+
+    assert chunks == ['{"data":[', "0,1", ",2,3", ",4", "]}"]
+    assert "".join(stream_json([])) == '{"data":[]}'
@@ -0,0 +1,171 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+from django.urls import reverse
+
+from transactions.models import GranularityChoices, Issue, Margin, Transaction
+from transactions.services import ledger
+from transactions.services.stats import get_bucket, get_segments
+
+
+@pytest.fixture
+def summary_request(api_client):
+    def wrapper(date_from=None, date_to=None, **params):
+        if date_from:
+            params["from"] = date_from.isoformat()
+
+        if date_to:
+            params["to"] = date_to.isoformat()
+
+        return api_client.get(reverse("api:summary"), params)
+
+    return wrapper
+
+
+@pytest.fixture
+def history_factory(batches_request):
+    def wrapper():
+        rng = random.Random(0)
+        start = datetime(2024, 1, 30)
+        items = [
+            {
+                "type": rng.choice(["supply", "sale", "sale"]),
+                "when": start + timedelta(minutes=rng.randrange(60 * 24 * 70)),
+                "sku": rng.choice("ABC"),
+                "qty": rng.randint(1, 5),
+                "price": rng.randint(5, 30),
+            }
+            for _ in range(300)
+        ]
+        items.sort(key=lambda item: item["when"])
+
+        # Batches in time order, then late items that rewind the ledger
+        batches = [items[start : start + 50] for start in range(0, 250, 50)]
+        batches.append(items[250:])
+        batches.append(rng.sample(items[:250], 10))
+        batches_request(batches)
+
+    return wrapper
+
+
+def get_expected(date_from, date_to, granularity):
+    window = {"when__gte": date_from, "when__lte": date_to}
+    totals = defaultdict(
+        lambda: dict.fromkeys(
+            ("supplied", "qty", "revenue", "cost", "profit", "issues"), 0
+        )
+    )
+
+    for supply in Transaction.objects.filter(transaction_type="supply", **window):
+        totals[get_bucket(supply.when, granularity), supply.sku][
+            "supplied"
+        ] += supply.qty
+
+    for margin in Margin.objects.filter(**window).select_related("sale"):
+        item = totals[get_bucket(margin.when, granularity), margin.sku]
+        item["qty"] += margin.sale.qty
+        item["revenue"] += margin.revenue
+        item["cost"] += margin.cost
+        item["profit"] += margin.profit
+
+    for issue in Issue.objects.filter(**window):
+        totals[get_bucket(issue.when, granularity), issue.sku]["issues"] += 1
+
+    return [
+        {
+            "bucket": bucket.isoformat(),
+            "sku": sku,
+            **{key: float(value) for key, value in values.items()},
+        }
+        for (bucket, sku), values in sorted(totals.items())
+    ]
+
+
+def normalize(data):
+    return [
+        {
+            key: value if key in ("bucket", "sku") else float(value)
+            for key, value in item.items()
+        }
+        for item in data
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("granularity", ["hour", "day", "month"])
+@pytest.mark.parametrize(
+    "date_from, date_to",
+    [
+        (datetime(2024, 1, 1), datetime(2024, 12, 31)),
+        (datetime(2024, 2, 10, 13, 27), datetime(2024, 3, 4, 8, 5, 30)),
+        (datetime(2024, 2, 29, 23, 10), datetime(2024, 3, 1, 0, 50)),
+        (datetime(2024, 2, 12, 10, 5), datetime(2024, 2, 12, 10, 40)),
+    ],
+)
+def test_summary_matches_transactions(
+    summary_request, history_factory, granularity, date_from, date_to
+):
+    history_factory()
+
+    response = summary_request(date_from, date_to, granularity=granularity)
+
+    assert response.status_code == 200
+    assert normalize(response.json()["data"]) == get_expected(
+        date_from, date_to, granularity
+    )
+
+
+@pytest.mark.django_db
+def test_summary_after_rebuild(summary_request, history_factory):
+    history_factory()
+    before = summary_request(granularity="month").json()
+
+    ledger.rebuild()
+
+    assert summary_request(granularity="month").json() == before
+    assert normalize(before["data"]) == get_expected(
+        datetime.min, datetime.max, "month"
+    )
+
+
+@pytest.mark.django_db
+def test_summary_sku_filter(summary_request, history_factory):
+    history_factory()
+
+    response = summary_request(sku=["B"], granularity="month")
+    expected = [
+        item
+        for item in get_expected(datetime.min, datetime.max, "month")
+        if item["sku"] == "B"
+    ]
+
+    assert normalize(response.json()["data"]) == expected
+
+
+@pytest.mark.django_db
+def test_summary_invalid_granularity(summary_request):
+    response = summary_request(granularity="week")
+
+    assert response.status_code == 422
+    assert response.data.get("errors")
+
+
+def test_year_is_read_from_month_buckets():
+    month, day, hour = (
+        GranularityChoices.MONTH,
+        GranularityChoices.DAY,
+        GranularityChoices.HOUR,
+    )
+
+    assert get_segments(datetime(2024, 1, 1), datetime(2025, 1, 1)) == [
+        (month, datetime(2024, 1, 1), datetime(2025, 1, 1))
+    ]
+    assert get_segments(datetime(2024, 1, 30, 22, 30), datetime(2024, 3, 2)) == [
+        (None, datetime(2024, 1, 30, 22, 30), datetime(2024, 1, 30, 23)),
+        (hour, datetime(2024, 1, 30, 23), datetime(2024, 1, 31)),
+        (day, datetime(2024, 1, 31), datetime(2024, 2, 1)),
+        (month, datetime(2024, 2, 1), datetime(2024, 3, 1)),
+        (day, datetime(2024, 3, 1), datetime(2024, 3, 2)),
+    ]
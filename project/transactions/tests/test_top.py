@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+
+from transactions.models import GranularityChoices, SkuStats
+
+
+@pytest.fixture
+def history_factory(history_request):
+    def wrapper():
+        history_request(
+            [
+                {"when": "2024-10-28T09:00:00", "sku": "A", "qty": 10, "price": 10},
+                {"when": "2024-10-28T09:00:00", "sku": "B", "qty": 10, "price": 10},
+                {"when": "2024-10-28T09:00:00", "sku": "C", "qty": 10, "price": 10},
+            ],
+            [
+                {"when": "2024-10-28T10:15:00", "sku": "A", "qty": 1, "price": 50},
+                {"when": "2024-10-28T11:30:00", "sku": "B", "qty": 5, "price": 12},
+                {"when": "2024-10-28T12:45:00", "sku": "C", "qty": 2, "price": 20},
+                {"when": "2024-10-28T13:00:00", "sku": "C", "qty": 20, "price": 20},
+                {"when": "2024-10-28T13:30:00", "sku": "A", "qty": 1, "price": 50},
+            ],
+        )
+
+    return wrapper
+
+
+@pytest.mark.django_db
+def test_top_by_profit(top_request, history_factory):
+    history_factory()
+
+    response = top_request(top=2)
+
+    expected_response = {
+        "data": [
+            {"sku": "A", "profit": 80, "revenue": 100, "qty": 2, "issues": 0},
+            {"sku": "C", "profit": 20, "revenue": 40, "qty": 2, "issues": 1},
+        ]
+    }
+
+    assert response.status_code == 200
+    assert response.data == expected_response
+    hours = SkuStats.objects.filter(granularity=GranularityChoices.HOUR)
+
+    assert hours.exclude(qty=0, issues=0).count() == 5
+
+
+@pytest.mark.django_db
+def test_top_window_edges(top_request, history_factory):
+    history_factory()
+
+    response = top_request(
+        datetime(2024, 10, 28, 11, 30), datetime(2024, 10, 28, 13), by="qty"
+    )
+
+    assert [item["sku"] for item in response.data["data"]] == ["B", "C"]
+    assert response.data["data"][1]["issues"] == 1
+
+    response = top_request(
+        datetime(2024, 10, 28, 10, 20), datetime(2024, 10, 28, 10, 40), by="revenue"
+    )
+
+    assert response.data == {"data": []}
+
+
+@pytest.mark.django_db
+def test_top_invalid_metric(top_request):
+    response = top_request(by="margin")
+
+    assert response.status_code == 422
+    assert response.data.get("errors")
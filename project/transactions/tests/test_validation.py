@@ -0,0 +1,108 @@
+import random
+
+import pytest
+from rest_framework.exceptions import ValidationError
+
+from transactions.serializers import SaleSerializer, SupplySerializer
+from transactions.validation import validate_batch
+
+PRICES = [
+    0,
+    0.0,
+    -0.0,
+    0.1 + 0.2,
+    1.005,
+    1e-5,
+    12.3,
+    12.345,
+    99999999.99,
+    1e8,
+    7,
+    "12.30",
+    " 7 ",
+    "0.",
+    ".5",
+    "000000000.5",
+    "1e2",
+    "-1",
+    "NaN",
+    True,
+    None,
+]
+
+
+def get_expected(data, serializer_class):
+    serializer = serializer_class(data=data, many=True)
+
+    if serializer.is_valid():
+        return [dict(item) for item in serializer.validated_data], None
+
+    return None, serializer.errors
+
+
+def get_result(data, serializer_class):
+    try:
+        return validate_batch(data, serializer_class), None
+
+    except ValidationError as exc:
+        return None, exc.detail
+
+
+@pytest.mark.parametrize("price", PRICES)
+def test_batch_matches_serializer(price):
+    data = [
+        {"when": "2024-10-28T10:00:00", "sku": "A", "qty": 1, "price": 5.5},
+        {"when": "2024-10-28T11:00:00", "sku": "B", "qty": 2, "price": price},
+    ]
+
+    assert get_result(data, SupplySerializer) == get_expected(data, SupplySerializer)
+
+
+def test_random_batch_matches_serializer():
+    rng = random.Random(0)
+    data = [
+        {
+            "when": f"2024-10-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:15:00",
+            "sku": f"SKU-{rng.randint(1, 50)}",
+            "qty": rng.choice([rng.randint(1, 9), str(rng.randint(1, 9))]),
+            "price": rng.choice(
+                [
+                    round(rng.uniform(0, 1000), rng.randint(0, 3)),
+                    str(round(rng.uniform(0, 1000), 2)),
+                    rng.randint(1, 100),
+                ]
+            ),
+        }
+        for _ in range(1000)
+    ]
+    valid = [item for item in data if get_expected([item], SaleSerializer)[0]]
+
+    assert get_result(data, SaleSerializer) == get_expected(data, SaleSerializer)
+    assert get_result(valid, SaleSerializer) == get_expected(valid, SaleSerializer)
+
+
+@pytest.mark.parametrize("data", [{}, "sales", [[1, 2]], [{"sku": "A"}], []])
+def test_unusual_batch_matches_serializer(data):
+    assert get_result(data, SaleSerializer) == get_expected(data, SaleSerializer)
+
+
+@pytest.mark.django_db
+def test_invalid_batch_response(supply_request):
+    data = [
+        {"when": "2024-10-28T10:00:00", "sku": "A", "qty": 1, "price": 5},
+        {"when": "2024-10-28T10:00:00", "sku": " ", "qty": 0, "price": -1},
+    ]
+
+    response = supply_request({"data": data})
+
+    assert response.status_code == 422
+    assert response.json() == {
+        "errors": [
+            {},
+            {
+                "sku": ["This field may not be blank."],
+                "qty": ["Quantity must be a positive integer"],
+                "price": ["Price must be a non-negative number"],
+            },
+        ]
+    }
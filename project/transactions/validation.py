@@ -0,0 +1,421 @@
+import functools
+import re
+from datetime import datetime
+from decimal import Decimal
+from itertools import repeat
+from operator import attrgetter, itemgetter, methodcaller, truediv
+
+from rest_framework import ISO_8601, fields, serializers
+from rest_framework.settings import api_settings
+
+from transactions.serializers import SaleSerializer, SupplySerializer
+
+SERIALIZERS = {"supply": SupplySerializer, "sale": SaleSerializer}
+
+INT_PATTERN = re.compile(r"\d{1,18}", re.ASCII)
+
+# Raised by parsers for anything the fast path leaves to the serializer
+FALLBACK_ERRORS = (
+    KeyError,
+    TypeError,
+    ValueError,
+    serializers.ValidationError,
+)
+
+
+def parse_datetime(value) -> datetime:
+    """
+    Fast path of DateTimeField with ISO 8601 input and naive dates
+    :param value: str or datetime
+    :return: datetime
+    """
+    if type(value) is str:
+        value = datetime.fromisoformat(value)
+
+    elif type(value) is not datetime:
+        raise TypeError("Unsupported date")
+
+    if value.tzinfo is not None:
+        raise ValueError("Aware date")
+
+    return value
+
+
+def parse_datetime_column(values: list) -> list:
+    """
+    parse_datetime for a column of values, looping in C for ISO strings
+    :param values: Column
+    :return: list of datetime
+    """
+    if not set(map(type, values)) <= {str}:
+        return list(map(parse_datetime, values))
+
+    values = list(map(datetime.fromisoformat, values))
+
+    if not set(map(attrgetter("tzinfo"), values)) <= {None}:
+        raise ValueError("Aware date")
+
+    return values
+
+
+def parse_str(value) -> str:
+    """
+    Fast path of CharField with the default options
+    :param value: str
+    :return: Stripped str
+    """
+    if type(value) is not str or not value.isascii() or "\x00" in value:
+        raise TypeError("Unsupported string")
+
+    value = value.strip()
+
+    if not value:
+        raise ValueError("Blank string")
+
+    return value
+
+
+def parse_str_column(values: list) -> list:
+    """
+    parse_str for a column of values, looping in C
+    :param values: Column
+    :return: list of stripped str
+    """
+    if not set(map(type, values)) <= {str}:
+        raise TypeError("Unsupported string")
+
+    text = "".join(values)
+
+    if not text.isascii() or "\x00" in text:
+        raise TypeError("Unsupported string")
+
+    values = list(map(str.strip, values))
+
+    if not all(values):
+        raise ValueError("Blank string")
+
+    return values
+
+
+def parse_int(value) -> int:
+    """
+    Fast path of IntegerField with the default options
+    :param value: int or str of up to 18 ASCII digits
+    :return: int
+    """
+    if type(value) is int:
+        return value
+
+    if type(value) is str and INT_PATTERN.fullmatch(value):
+        return int(value)
+
+    raise TypeError("Unsupported integer")
+
+
+def parse_int_column(values: list) -> list:
+    """
+    parse_int for a column of values, looping in C for int values
+    :param values: Column
+    :return: list of int
+    """
+    if set(map(type, values)) <= {int}:
+        return values
+
+    return list(map(parse_int, values))
+
+
+def get_decimal_parsers(max_digits: int, decimal_places: int):
+    """
+    Fast path of DecimalField for non-negative values in plain notation, with at
+    most max_digits - decimal_places digits before the point and decimal_places
+    after it. Such values pass validate_precision, anything else is left to the
+    serializer.
+    :param max_digits: DecimalField.max_digits
+    :param decimal_places: DecimalField.decimal_places
+    :return: [item parser, column parser] or None
+    """
+    if max_digits <= decimal_places:
+        return None
+
+    pattern = re.compile(
+        rf"\d{{1,{max_digits - decimal_places}}}(?:\.\d{{0,{decimal_places}}})?",
+        re.ASCII,
+    )
+    quantize = methodcaller("quantize", Decimal(1).scaleb(-decimal_places))
+    scale = methodcaller("scaleb", -decimal_places)
+    factor = 10**decimal_places
+    limit = 10 ** (max_digits - decimal_places)
+
+    def parse_decimal(value) -> Decimal:
+        if type(value) is float or type(value) is int:
+            text = repr(value)
+
+        elif type(value) is str:
+            text = value.strip()
+
+        else:
+            raise TypeError("Unsupported decimal")
+
+        if not pattern.fullmatch(text):
+            raise ValueError("Unsupported decimal")
+
+        return quantize(Decimal(text))
+
+    def parse_number_column(values: list) -> list:
+        # A float has at most decimal_places digits after the point when it is
+        # the closest float to its scaled integer, checked without repr
+        if 0 < min(values) <= max(values) < limit:
+            units = [round(value * factor) for value in values]
+
+            if list(map(truediv, units, repeat(factor))) == values:
+                return list(map(scale, map(Decimal, units)))
+
+        return parse_text_column(list(map(repr, values)))
+
+    def parse_text_column(texts: list) -> list:
+        if not all(map(pattern.fullmatch, texts)):
+            raise ValueError("Unsupported decimal")
+
+        return list(map(quantize, map(Decimal, texts)))
+
+    def parse_decimal_column(values: list) -> list:
+        if not values:
+            return []
+
+        types = set(map(type, values))
+
+        if types <= {float, int}:
+            return parse_number_column(values)
+
+        if types <= {str}:
+            return parse_text_column(list(map(str.strip, values)))
+
+        return list(map(parse_decimal, values))
+
+    return parse_decimal, parse_decimal_column
+
+
+def get_parsers(field: fields.Field):
+    """
+    Fast parsers of a serializer field
+    :param field: Bound serializer field
+    :return: [item parser, column parser] or None when the field options have
+        no fast path
+    """
+    if (
+        field.read_only
+        or not field.required
+        or field.allow_null
+        or field.source != field.field_name
+    ):
+        return None
+
+    if type(field) is fields.DateTimeField:
+        input_formats = getattr(
+            field, "input_formats", api_settings.DATETIME_INPUT_FORMATS
+        )
+
+        if list(input_formats) == [ISO_8601] and field.default_timezone() is None:
+            return parse_datetime, parse_datetime_column
+
+    elif type(field) is fields.CharField:
+        if (
+            not field.allow_blank
+            and field.trim_whitespace
+            and field.max_length is None
+            and field.min_length is None
+        ):
+            return parse_str, parse_str_column
+
+    elif type(field) is fields.IntegerField:
+        if field.max_value is None and field.min_value is None:
+            return parse_int, parse_int_column
+
+    elif type(field) is fields.DecimalField:
+        if (
+            field.max_digits is not None
+            and field.decimal_places is not None
+            and field.max_value is None
+            and field.min_value is None
+            and field.rounding is None
+            and not field.localize
+        ):
+            return get_decimal_parsers(field.max_digits, field.decimal_places)
+
+    return None
+
+
+def chain(parser, validate):
+    """
+    Runs a serializer validate_<field> method after the item parser
+    :param parser: Item parser
+    :param validate: Bound validate_<field> method
+    :return: function
+    """
+
+    def parse_and_validate(value):
+        return validate(parser(value))
+
+    return parse_and_validate
+
+
+def chain_column(parser, validate):
+    """
+    Runs a serializer validate_<field> method after the column parser
+    :param parser: Column parser
+    :param validate: Bound validate_<field> method
+    :return: function
+    """
+
+    def parse_and_validate_column(values: list) -> list:
+        return list(map(validate, parser(values)))
+
+    return parse_and_validate_column
+
+
+@functools.cache
+def compile_serializer(serializer_class) -> tuple:
+    """
+    Compiles a flat serializer to parsing functions per field, which also run
+    the validate_<field> method: one for single items and one for whole columns
+    of a batch, so that a batch is validated in a few tight loops instead of
+    through the DRF field tree of every item
+    :param serializer_class: Serializer class
+    :return: ((field name, item parser, column parser), ...) or None when the
+        serializer has no fast path
+    """
+    serializer = serializer_class()
+
+    if type(serializer).validate is not serializers.Serializer.validate:
+        return None
+
+    compiled = []
+
+    for name, field in serializer.fields.items():
+        parsers = get_parsers(field)
+
+        if parsers is None:
+            return None
+
+        parser, column_parser = parsers
+        validate = getattr(serializer, f"validate_{name}", None)
+
+        if validate:
+            parser = chain(parser, validate)
+            column_parser = chain_column(column_parser, validate)
+
+        compiled.append((name, parser, column_parser))
+
+    return tuple(compiled)
+
+
+def parse_item(item, compiled: tuple) -> dict:
+    """
+    Validates an item with a compiled serializer
+    :param item: Input item
+    :param compiled: Result of compile_serializer
+    :return: Validated data or None when the item needs the serializer
+    """
+    try:
+        return {name: parse(item[name]) for name, parse, _ in compiled}
+
+    except FALLBACK_ERRORS:
+        return None
+
+
+def parse_batch(data: list, compiled: tuple) -> list:
+    """
+    Validates a list of items column by column with a compiled serializer
+    :param data: Input list
+    :param compiled: Result of compile_serializer
+    :return: Validated items
+    :raises FALLBACK_ERRORS: when an item needs the serializer
+    """
+    if not set(map(type, data)) <= {dict}:
+        raise TypeError("Unsupported item")
+
+    columns = [
+        parse_column(list(map(itemgetter(name), data)))
+        for name, _, parse_column in compiled
+    ]
+    names = [name for name, _, _ in compiled]
+
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+def parse_transaction(item, serializer_class=SupplySerializer) -> dict:
+    """
+    Fast path of SupplySerializer and SaleSerializer for well-formed items.
+    Accepts a subset of what the serializers accept and gives the same result,
+    anything unusual is left to the serializers.
+    :param item: Input item
+    :param serializer_class: SupplySerializer or SaleSerializer
+    :return: {when, sku, qty, price} or None when the item needs a serializer
+    """
+    compiled = compile_serializer(serializer_class)
+
+    if compiled is None:
+        return None
+
+    return parse_item(item, compiled)
+
+
+def validate_transaction(item, serializer_class=SupplySerializer) -> [dict, dict]:
+    """
+    Validates an item like the serializer, through the fast path when possible
+    :param item: Input item
+    :param serializer_class: SupplySerializer or SaleSerializer
+    :return: [validated data or None, errors or None]
+    """
+    data = parse_transaction(item, serializer_class)
+
+    if data is not None:
+        return data, None
+
+    serializer = serializer_class(data=item)
+
+    if serializer.is_valid():
+        return dict(serializer.validated_data), None
+
+    return None, serializer.errors
+
+
+def validate_batch(data, serializer_class) -> list:
+    """
+    Validates a list of items like ``serializer_class(data=data, many=True)``.
+    Well-formed batches are parsed column by column, otherwise items are parsed
+    one by one and the serializer only sees the items the fast path rejects.
+    :param data: Input list
+    :param serializer_class: SupplySerializer or SaleSerializer
+    :return: Validated items
+    :raises ValidationError: with the errors of every item, {} for valid items
+    """
+    compiled = compile_serializer(serializer_class)
+
+    if compiled is None or type(data) is not list:
+        serializer = serializer_class(data=data, many=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    try:
+        return parse_batch(data, compiled)
+
+    except FALLBACK_ERRORS:
+        items = [parse_item(item, compiled) for item in data]
+
+    errors = []
+    invalid = False
+
+    for idx, item in enumerate(items):
+        if item is None:
+            items[idx], item_errors = validate_transaction(data[idx], serializer_class)
+            invalid = invalid or bool(item_errors)
+            errors.append(item_errors or {})
+
+        else:
+            errors.append({})
+
+    if invalid:
+        raise serializers.ValidationError(errors)
+
+    return items
@@ -1,18 +1,63 @@
 from datetime import datetime
 
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import generics, status
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from transactions.models import Transaction
+from transactions import metrics
+from transactions.models import Batch
+from transactions.pagination import encode_cursor
 from transactions.serializers import (
     SupplySerializer,
     SaleSerializer,
+    AvailabilityPageQuerySerializer,
+    AvailabilitySeriesQuerySerializer,
     AvailabilityResponseSerializer,
+    BatchResponseSerializer,
+    IssuesPageQuerySerializer,
     IssuesResponseSerializer,
+    ProfitResponseSerializer,
+    SummaryQuerySerializer,
+    SummaryResponseSerializer,
+    TopQuerySerializer,
+    TopResponseSerializer,
 )
 
-from transactions.services.crud import add_supplies, add_sales
-from transactions.services.custom import get_available_items, get_issues
+from transactions.services import batches, cache
+from transactions.services.compaction import check_watermark
+from transactions.services.crud import add_supplies, add_sales, flush
+from transactions.services.stats import get_summary, get_top
+from transactions.services.custom import (
+    get_available_items,
+    get_available_page,
+    get_available_series,
+    get_issues,
+    get_profit,
+    iter_issues,
+)
+from transactions.validation import validate_batch
+from transactions.streaming import (
+    NDJSONRenderer,
+    available_item_to_json,
+    issue_to_json,
+    stream_json,
+    stream_ndjson,
+)
+
+
+def get_sku_filters(query: dict) -> dict:
+    """
+    SKU filters of a validated list query
+    :param query: Validated data of a SkuQuerySerializer
+    :return: {skus, sku_prefix}
+    """
+    skus = query.get("sku")
+
+    return {
+        "skus": tuple(sorted(set(skus))) if skus else None,
+        "sku_prefix": query.get("sku_prefix"),
+    }
 
 
 class SupplyAPIView(generics.CreateAPIView):
@@ -20,11 +65,12 @@ class SupplyAPIView(generics.CreateAPIView):
 
     def post(self, request, *args, **kwargs):
         data = request.data.get("data", [])
-        serializer = self.get_serializer(data=data, many=True)
-        serializer.is_valid(raise_exception=True)
 
-        supplies = serializer.validated_data
-        success = add_supplies(supplies)
+        with metrics.timer("validate"):
+            supplies = validate_batch(data, self.serializer_class)
+
+        with metrics.timer("write"):
+            success = add_supplies(supplies)
 
         response = {"data": {"success": success}}
 
@@ -36,12 +82,20 @@ class SalesAPIView(generics.CreateAPIView):
 
     def post(self, request, *args, **kwargs):
         data = request.data.get("data", [])
-        serializer = self.get_serializer(data=data, many=True)
-        serializer.is_valid(raise_exception=True)
 
-        sales = serializer.validated_data
+        with metrics.timer("validate"):
+            sales = validate_batch(data, self.serializer_class)
+
+        if request.query_params.get("async") == "1":
+            check_watermark(sales)
+            batch = batches.enqueue(data)
+            response = {"data": {"batch": batch.id}}
+
+            return Response(response, status=status.HTTP_202_ACCEPTED)
+
+        with metrics.timer("write"):
+            success, issues = add_sales(sales)
 
-        success, issues = add_sales(sales)
         response = {"data": {"success": success, "issues": issues}}
 
         return Response(response, status=status.HTTP_201_CREATED)
@@ -49,6 +103,7 @@ class SalesAPIView(generics.CreateAPIView):
 
 class AvailabilityAPIView(generics.ListAPIView):
     serializer_class = AvailabilityResponseSerializer
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
 
     def get(self, request, *args, **kwargs):
         to = request.query_params.get("to")
@@ -59,20 +114,115 @@ class AvailabilityAPIView(generics.ListAPIView):
         else:
             to = datetime.now()
 
+        page = AvailabilityPageQuerySerializer(data=request.query_params)
+        page.is_valid(raise_exception=True)
+        sku_after = page.validated_data.get("cursor")
+        limit = page.validated_data.get("limit")
+        filters = get_sku_filters(page.validated_data)
+
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            if limit or sku_after is not None:
+                items = get_available_page(to, sku_after, limit, **filters)
+
+            else:
+                items = get_available_items(to, **filters).items()
+
+            return StreamingHttpResponse(
+                stream_ndjson(map(available_item_to_json, items)),
+                content_type=NDJSONRenderer.media_type,
+            )
+
+        if limit:
+            response = cache.get_or_compute(
+                "availability",
+                lambda: self.get_page(to, sku_after, limit, **filters),
+                date_to=to,
+                sku_after=sku_after,
+                limit=limit,
+                **filters,
+            )
+
+        else:
+            response = cache.get_or_compute(
+                "availability",
+                lambda: self.get_response(to, **filters),
+                date_to=to,
+                **filters,
+            )
+
+        return Response(response, status=status.HTTP_200_OK)
+
+    @classmethod
+    def get_response(
+        cls, to: datetime, skus: tuple = None, sku_prefix: str = None
+    ) -> dict:
         available_items = [
             {"sku": sku, "qty": item["qty"], "cost": item["cost"]}
-            for sku, item in get_available_items(to).items()
+            for sku, item in get_available_items(to, skus, sku_prefix).items()
         ]
 
-        serializer = self.get_serializer(instance=available_items, many=True)
+        serializer = cls.serializer_class(instance=available_items, many=True)
 
-        response = {"data": serializer.data}
+        return {"data": serializer.data}
+
+    @classmethod
+    def get_page(
+        cls,
+        to: datetime,
+        sku_after: str,
+        limit: int,
+        skus: tuple = None,
+        sku_prefix: str = None,
+    ) -> dict:
+        items = get_available_page(to, sku_after, limit + 1, skus, sku_prefix)
+        next_cursor = None
+
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1][0])
+
+        return {
+            "data": [available_item_to_json(item) for item in items],
+            "next": next_cursor,
+        }
+
+
+class AvailabilitySeriesAPIView(generics.ListAPIView):
+    def get(self, request, *args, **kwargs):
+        query = AvailabilitySeriesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        points = tuple(query.validated_data["points"])
+        filters = get_sku_filters(query.validated_data)
+
+        response = cache.get_or_compute(
+            "availability-series",
+            lambda: self.get_response(points, **filters),
+            points=points,
+            **filters,
+        )
 
         return Response(response, status=status.HTTP_200_OK)
 
+    @classmethod
+    def get_response(
+        cls, points: tuple, skus: tuple = None, sku_prefix: str = None
+    ) -> dict:
+        series = get_available_series(points, skus, sku_prefix)
+
+        return {
+            "data": [
+                {
+                    "to": point.isoformat(),
+                    "items": [available_item_to_json(item) for item in items.items()],
+                }
+                for point, items in zip(points, series)
+            ]
+        }
+
 
 class IssuesAPIView(generics.ListAPIView):
     serializer_class = IssuesResponseSerializer
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
 
     def get(self, request, *args, **kwargs):
         date_from = request.query_params.get("from")
@@ -84,7 +234,59 @@ class IssuesAPIView(generics.ListAPIView):
         if date_to:
             date_to = datetime.fromisoformat(date_to)
 
-        issues = get_issues(date_from, date_to)
+        page = IssuesPageQuerySerializer(data=request.query_params)
+        page.is_valid(raise_exception=True)
+        after = page.validated_data.get("cursor")
+        limit = page.validated_data.get("limit")
+        filters = get_sku_filters(page.validated_data)
+
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            rows = iter_issues(date_from, date_to, after, limit, **filters)
+            issues = map(issue_to_json, rows)
+
+            return StreamingHttpResponse(
+                stream_ndjson(issues), content_type=NDJSONRenderer.media_type
+            )
+
+        if request.query_params.get("stream") == "1":
+            rows = iter_issues(date_from, date_to, after, limit, **filters)
+            issues = map(issue_to_json, rows)
+
+            return StreamingHttpResponse(
+                stream_json(issues), content_type="application/json"
+            )
+
+        if limit:
+            response = cache.get_or_compute(
+                "issues",
+                lambda: self.get_page(date_from, date_to, after, limit, **filters),
+                date_from=date_from,
+                date_to=date_to,
+                after=after,
+                limit=limit,
+                **filters,
+            )
+
+        else:
+            response = cache.get_or_compute(
+                "issues",
+                lambda: self.get_response(date_from, date_to, **filters),
+                date_from=date_from,
+                date_to=date_to,
+                **filters,
+            )
+
+        return Response(response, status=status.HTTP_200_OK)
+
+    @classmethod
+    def get_response(
+        cls,
+        date_from: datetime,
+        date_to: datetime,
+        skus: tuple = None,
+        sku_prefix: str = None,
+    ) -> dict:
+        issues = get_issues(date_from, date_to, skus, sku_prefix)
 
         result = []
         for issue in issues:
@@ -98,7 +300,137 @@ class IssuesAPIView(generics.ListAPIView):
                 }
             )
 
-        serializer = self.get_serializer(instance=result, many=True)
+        serializer = cls.serializer_class(instance=result, many=True)
+
+        return {"data": serializer.data}
+
+    @classmethod
+    def get_page(
+        cls,
+        date_from: datetime,
+        date_to: datetime,
+        after: tuple,
+        limit: int,
+        skus: tuple = None,
+        sku_prefix: str = None,
+    ) -> dict:
+        rows = iter_issues(date_from, date_to, after, limit + 1, skus, sku_prefix)
+        rows = list(rows)
+        next_cursor = None
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            when, sale_id = rows[-1][:2]
+            next_cursor = encode_cursor(when.isoformat(), sale_id)
+
+        return {"data": [issue_to_json(row) for row in rows], "next": next_cursor}
+
+
+class ProfitAPIView(generics.RetrieveAPIView):
+    serializer_class = ProfitResponseSerializer
+
+    def get(self, request, *args, **kwargs):
+        date_from = request.query_params.get("from")
+        date_to = request.query_params.get("to")
+
+        if date_from:
+            date_from = datetime.fromisoformat(date_from)
+
+        if date_to:
+            date_to = datetime.fromisoformat(date_to)
+
+        response = self.get_response(get_profit(date_from, date_to))
+
+        return Response(response, status=status.HTTP_200_OK)
+
+    @classmethod
+    def get_response(cls, profit: dict) -> dict:
+        serializer = cls.serializer_class(instance=profit)
+
+        return {"data": serializer.data}
+
+
+class TopAPIView(generics.ListAPIView):
+    serializer_class = TopResponseSerializer
+
+    def get(self, request, *args, **kwargs):
+        date_from = request.query_params.get("from")
+        date_to = request.query_params.get("to")
+
+        if date_from:
+            date_from = datetime.fromisoformat(date_from)
+
+        if date_to:
+            date_to = datetime.fromisoformat(date_to)
+
+        query = TopQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        response = self.get_response(date_from, date_to, **query.validated_data)
+
+        return Response(response, status=status.HTTP_200_OK)
+
+    @classmethod
+    def get_response(
+        cls, date_from: datetime, date_to: datetime, top: int, by: str
+    ) -> dict:
+        serializer = cls.serializer_class(
+            instance=get_top(date_from, date_to, top, by), many=True
+        )
+
+        return {"data": serializer.data}
+
+
+class SummaryAPIView(generics.ListAPIView):
+    serializer_class = SummaryResponseSerializer
+
+    def get(self, request, *args, **kwargs):
+        date_from = request.query_params.get("from")
+        date_to = request.query_params.get("to")
+
+        if date_from:
+            date_from = datetime.fromisoformat(date_from)
+
+        if date_to:
+            date_to = datetime.fromisoformat(date_to)
+
+        query = SummaryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        granularity = query.validated_data["granularity"]
+        filters = get_sku_filters(query.validated_data)
+
+        response = cache.get_or_compute(
+            "summary",
+            lambda: self.get_response(date_from, date_to, granularity, **filters),
+            date_from=date_from,
+            date_to=date_to,
+            granularity=granularity,
+            **filters,
+        )
+
+        return Response(response, status=status.HTTP_200_OK)
+
+    @classmethod
+    def get_response(
+        cls,
+        date_from: datetime,
+        date_to: datetime,
+        granularity: str,
+        skus: tuple = None,
+        sku_prefix: str = None,
+    ) -> dict:
+        summary = get_summary(date_from, date_to, granularity, skus, sku_prefix)
+        serializer = cls.serializer_class(instance=summary, many=True)
+
+        return {"data": serializer.data}
+
+
+class BatchAPIView(generics.RetrieveAPIView):
+    serializer_class = BatchResponseSerializer
+    queryset = Batch.objects.defer("payload")
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(instance=self.get_object())
 
         response = {"data": serializer.data}
 
@@ -107,8 +439,13 @@ class IssuesAPIView(generics.ListAPIView):
 
 class FlushAPIView(generics.DestroyAPIView):
     def delete(self, request, *args, **kwargs):
-        num_deleted, _ = Transaction.objects.all().delete()
+        num_deleted = flush()
 
         return Response(
             {"data": {"success": num_deleted}}, status=status.HTTP_204_NO_CONTENT
         )
+
+
+class MetricsAPIView(generics.GenericAPIView):
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)